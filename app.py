@@ -1,18 +1,24 @@
 # app.py (robust, auto-download fallback)
 import streamlit as st
 import pandas as pd
-import joblib
 import os
 import io
 import requests
 from src.data_loader import load_raw, build_consolidated
-from src.recommenders import simple_svd_recommender
+from src.cleaning import optimize_dtypes
+from src.recommenders import simple_svd_recommender, SVDRecommender, PopularityRecommender, TieredRecommender
+from src.serving import PredictionService
+from src.cubes import PopularityCubes
 
 st.set_page_config(layout="wide", page_title="Tourism Analytics")
 st.title("Tourism Experience Analytics")
 
 @st.cache_data
 def get_data():
+    # narrow dtypes / categorical strings: st.cache_data hands out a copy on every rerun
+    return optimize_dtypes(_get_data())
+
+def _get_data():
     # 1) try loader (local data/ files)
     try:
         dfs = load_raw("data")
@@ -54,8 +60,51 @@ def get_data():
     ])
     return sample
 
+@st.cache_resource
+def get_recommender():
+    # prebuilt by train.py: SVD for known users, cached popularity lists for new/sparse ones.
+    # None means fall back to fitting per request
+    svd, popular = None, None
+    try:
+        if os.path.exists("models/svd_recommender.pkl"):
+            svd = SVDRecommender.load("models/svd_recommender.pkl")
+        if os.path.exists("models/popular_recs.pkl"):
+            popular = PopularityRecommender.load("models/popular_recs.pkl")
+    except Exception as e:
+        st.write("Recommender loading warning (safe):", str(e))
+    if svd is None and popular is None:
+        return None
+    return TieredRecommender(svd, popular)
+
+# one service per process, shared across sessions/reruns; models load on first prediction
+@st.cache_resource
+def get_prediction_service():
+    try:
+        return PredictionService("models")
+    except Exception as e:
+        st.write("Model loading warning (safe):", str(e))
+        return None
+
+# popularity/trend cubes + attraction metadata; built from the data once if train.py hasn't saved them
+@st.cache_resource
+def get_cubes():
+    path = "models/cubes.pkl"
+    if os.path.exists(path):
+        try:
+            return PopularityCubes.load(path)
+        except Exception as e:
+            st.write("Cubes loading warning (safe):", str(e))
+    data = get_data()
+    if data is None or data.empty or "AttractionId" not in data.columns:
+        return None
+    return PopularityCubes.from_frame(data)
+
 # load data
 df = get_data()
+recommender = get_recommender()
+service = get_prediction_service()
+cubes = get_cubes()
+aggregates = service.aggregates if service is not None else None
 
 # Data preview button
 st.sidebar.header("Actions")
@@ -76,53 +125,105 @@ else:
     except Exception:
         sample_uid = int(df['UserId'].dropna().iloc[0])
     user_id = int(st.sidebar.number_input("UserId for recommendations", value=sample_uid, step=1))
+    segment = {}
+    if recommender is not None and recommender.tier(user_id) == "popular":
+        # new or sparse user: popularity tier, narrowed by whatever segment is given
+        st.sidebar.caption("New or sparse user: showing popular attractions for the segment.")
+        seg_cols = {"continent": "UserContinent", "country": "UserCountry", "visit_mode": "VisitModeName"}
+        for key, col in seg_cols.items():
+            if col in df.columns:
+                value = st.sidebar.selectbox(col, ["Any"] + sorted(df[col].dropna().astype(str).unique().tolist()))
+                segment[key] = None if value == "Any" else value
     if st.sidebar.button("Get SVD recommendations"):
-        recs = simple_svd_recommender(df, user_id, top_k=10)
+        if recommender is not None:
+            recs = recommender.recommend(user_id, top_k=10, **segment)
+        else:
+            recs = simple_svd_recommender(df, user_id, top_k=10)
         if not recs:
             st.sidebar.write("No recommendations found for this user.")
         else:
             st.sidebar.write("Recommended AttractionIds:", recs)
-            st.write(df[df["AttractionId"].isin(recs)][["AttractionId","Attraction","AttractionType","AttractionCityName"]].drop_duplicates())
+            if cubes is not None:
+                st.write(cubes.attraction_info(recs)[["AttractionId","Attraction","AttractionType","AttractionCityName","visits","avg_rating"]])
+            else:
+                st.write(df[df["AttractionId"].isin(recs)][["AttractionId","Attraction","AttractionType","AttractionCityName"]].drop_duplicates())
+
+# Popular attractions: answered from the precomputed cubes, never from the visit table
+if cubes is not None and len(cubes.cube):
+    st.header("Popular attractions")
+    f1, f2, f3 = st.columns(3)
+    mode_sel = f1.selectbox("Visit mode", ["All"] + cubes.levels("VisitModeName"))
+    continent_sel = f2.selectbox("User continent", ["All"] + cubes.levels("UserContinent"))
+    year_sel = f3.selectbox("Year", ["All"] + cubes.levels("VisitYear"))
+    filters = {
+        "visit_mode": None if mode_sel == "All" else mode_sel,
+        "continent": None if continent_sel == "All" else continent_sel,
+        "year": None if year_sel == "All" else year_sel,
+    }
+    top = cubes.top_attractions(10, **filters)
+    st.dataframe(top[["AttractionId","Attraction","AttractionType","AttractionCityName","visits","avg_rating"]])
+    if not top.empty:
+        trend_id = st.selectbox("Monthly trend for", top["AttractionId"].tolist(),
+                                format_func=lambda a: f"{a} - {top.set_index('AttractionId').at[a, 'Attraction']}")
+        trend = cubes.trend(trend_id, **{k: v for k, v in filters.items() if k != "year"})
+        trend.index = [f"{int(y)}-{int(m):02d}" for y, m in trend.index]
+        st.line_chart(trend["visits"])
 
 # Prediction UI (models optional)
 st.header("Predict rating & visit mode (simple)")
+# optional ids: aggregates are looked up in the store instead of typed in
+user_avg, attr_avg = 0.0, 0.0
+user_visits_default, attr_visits_default = 1, 1
+if aggregates is not None:
+    id_col1, id_col2 = st.columns(2)
+    lookup_uid = int(id_col1.number_input("UserId (optional)", value=0, step=1))
+    lookup_aid = int(id_col2.number_input("AttractionId (optional)", value=0, step=1))
+    if lookup_uid:
+        u = aggregates.user_stats([lookup_uid]).iloc[0]
+        user_visits_default = int(u["user_total_visits"])
+        user_avg = 0.0 if pd.isna(u["user_avg_rating"]) else float(u["user_avg_rating"])
+    if lookup_aid:
+        a = aggregates.attraction_stats([lookup_aid]).iloc[0]
+        attr_visits_default = int(a["attraction_total_visits"])
+        attr_avg = 0.0 if pd.isna(a["attraction_avg_rating"]) else float(a["attraction_avg_rating"])
 col1, col2, col3 = st.columns(3)
 year = col1.number_input("VisitYear", value=2023, step=1)
 month = col2.number_input("VisitMonth", value=7, min_value=1, max_value=12)
-user_visits = col3.number_input("User total visits", value=1, min_value=0)
-attr_visits = st.number_input("Attraction total visits", value=1, min_value=0)
-
-# load models safely if present
-reg = None
-clf = None
-le = None
-try:
-    if os.path.exists("models/regressor_joblib.pkl"):
-        reg = joblib.load("models/regressor_joblib.pkl")
-    if os.path.exists("models/classifier_joblib.pkl"):
-        clf = joblib.load("models/classifier_joblib.pkl")
-    if os.path.exists("models/label_encoder.pkl"):
-        le = joblib.load("models/label_encoder.pkl")
-except Exception as e:
-    st.write("Model loading warning (safe):", str(e))
+user_visits = col3.number_input("User total visits", value=user_visits_default, min_value=0)
+attr_visits = st.number_input("Attraction total visits", value=attr_visits_default, min_value=0)
+# categorical fields the trained artifacts one-hot encode (the shipped numeric-only models ignore them)
+categorical = {}
+for box, col in zip(st.columns(4), ["AttractionType", "UserContinent", "UserCountry", "VisitModeName"]):
+    options = sorted(df[col].dropna().astype(str).unique().tolist()) if df is not None and col in df.columns else []
+    value = box.selectbox(col, ["Unknown"] + options, key=f"predict_{col}")
+    categorical[col] = None if value == "Unknown" else value
+
+def _request(task, **overrides):
+    # one prediction request: the numeric fields plus the categoricals, passed through the model's encoder
+    return {"task": task, "VisitYear": year, "VisitMonth": month, "user_total_visits": user_visits,
+            "attraction_total_visits": attr_visits, "user_avg_rating": user_avg, "attraction_avg_rating": attr_avg,
+            **categorical, **overrides}
+
+def _predict(request):
+    # through the shared service's micro-batcher, so concurrent sessions share one model call
+    res = service.submit(request).result()
+    if "error" in res:
+        st.error(res["error"])
+    return res
 
 if st.button("Predict rating"):
-    import pandas as _pd
-    X = _pd.DataFrame([[year, month, user_visits, attr_visits, 0, 0]],
-                      columns=["VisitYear","VisitMonth","user_total_visits","attraction_total_visits","user_avg_rating","attraction_avg_rating"])
-    if reg is None:
+    if service is None or not service.has("reg"):
         st.error("No regressor model found. Run `python train.py` locally and add models/ to repo or host models remotely.")
     else:
-        pred = reg.predict(X)[0]
-        st.success(f"Predicted rating: {pred:.2f}")
+        res = _predict(_request("rating"))
+        if "rating" in res:
+            st.success(f"Predicted rating: {res['rating']:.2f}")
 
 if st.button("Predict visit mode"):
-    import pandas as _pd
-    Xc = _pd.DataFrame([[year, month, user_visits, attr_visits, 0, 0]],
-                       columns=["VisitYear","VisitMonth","user_total_visits","attraction_total_visits","user_avg_rating","attraction_avg_rating"])
-    if clf is None or le is None:
+    if service is None or not service.has("clf") or service.le is None:
         st.error("No classifier/label encoder found. Run `python train.py` locally and add models/ to repo or host models remotely.")
     else:
-        pred_c = clf.predict(Xc)[0]
-        st.success(f"Predicted Visit Mode: {le.inverse_transform([pred_c])[0]}")
-
+        # the visit mode is what is being predicted, so it is left out of the inputs
+        res = _predict(_request("visit_mode", VisitModeName=None))
+        if "visit_mode" in res:
+            st.success(f"Predicted Visit Mode: {res['visit_mode']}")
@@ -0,0 +1,51 @@
+# benchmarks/bench_column_profile.py
+import argparse
+import tempfile
+import time
+from pathlib import Path
+from src.cleaning import drop_low_information_cols
+from benchmarks.synthetic import make_consolidated
+
+def _value_counts_baseline(df, threshold=0.98):
+    # the previous per-column value_counts implementation, kept here for comparison
+    to_drop = []
+    for col in df.columns:
+        top_freq = df[col].value_counts(normalize=True, dropna=False).values[0]
+        if top_freq >= threshold:
+            to_drop.append(col)
+    return df.drop(columns=to_drop)
+
+def _time(fn):
+    t0 = time.perf_counter()
+    out = fn()
+    return time.perf_counter() - t0, out
+
+def main():
+    parser = argparse.ArgumentParser(description="Time drop_low_information_cols against the value_counts baseline.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000_000, 5_000_000])
+    parser.add_argument("--threshold", type=float, default=0.98)
+    parser.add_argument("--jobs", type=int, default=None)
+    args = parser.parse_args()
+
+    for n in args.sizes:
+        df = make_consolidated(n)
+        df["Constant"] = 1  # one column that should go
+        with tempfile.TemporaryDirectory() as tmp:
+            profile = Path(tmp) / "profile.json"
+            runs = [
+                ("value_counts baseline", lambda: _value_counts_baseline(df, args.threshold)),
+                ("profiled", lambda: drop_low_information_cols(df, args.threshold, n_jobs=args.jobs)),
+                ("profiled, cold profile", lambda: drop_low_information_cols(df, args.threshold, profile_path=profile,
+                                                                               data_key=f"synthetic-{n}", n_jobs=args.jobs)),
+                ("profiled, reused profile", lambda: drop_low_information_cols(df, args.threshold, profile_path=profile,
+                                                                                 data_key=f"synthetic-{n}", n_jobs=args.jobs)),
+            ]
+            kept = None
+            for name, fn in runs:
+                t, out = _time(fn)
+                same = "" if kept is None else ("" if list(out.columns) == kept else "  COLUMNS DIFFER")
+                kept = kept or list(out.columns)
+                print(f"n={n:>10} {name:<26} {t:7.2f} s  kept {out.shape[1]}/{df.shape[1]}{same}")
+
+if __name__ == "__main__":
+    main()
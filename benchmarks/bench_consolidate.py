@@ -0,0 +1,56 @@
+# benchmarks/bench_consolidate.py
+import argparse
+import time
+import tracemalloc
+import pandas as pd
+from src.data_loader import build_consolidated
+from benchmarks.synthetic import make_raw_tables
+
+def _merge_baseline(dfs):
+    # the previous dict/.map + two merges implementation, kept here for comparison
+    tx, users, items = dfs["tx"].copy(), dfs["users"].copy(), dfs["items"].copy()
+    city, country, region = dfs["city"], dfs["country"], dfs["region"]
+    continent, atype, mode = dfs["continent"], dfs["type"], dfs["mode"]
+    city_name = dict(zip(city["CityId"], city["CityName"]))
+    country_name = dict(zip(country["CountryId"], country["Country"]))
+    city_to_country = dict(zip(city["CityId"], city["CountryId"]))
+    users["UserCityName"] = users["CityId"].map(city_name)
+    users["UserCountry"] = users["CountryId"].map(country_name)
+    users["UserRegion"] = users["RegionId"].map(dict(zip(region["RegionId"], region["Region"])))
+    users["UserContinent"] = users["ContinentId"].map(dict(zip(continent["ContinentId"], continent["Continent"])))
+    items["AttractionCityName"] = items["AttractionCityId"].map(city_name)
+    items["AttractionCountryId"] = items["AttractionCityId"].map(city_to_country)
+    items["AttractionCountry"] = items["AttractionCountryId"].map(country_name)
+    items["AttractionType"] = items["AttractionTypeId"].map(dict(zip(atype["AttractionTypeId"], atype["AttractionType"])))
+    tx["VisitModeName"] = tx["VisitMode"].map(dict(zip(mode["VisitModeId"], mode["VisitMode"])))
+    df = tx.merge(users, on="UserId", how="left").merge(items, on="AttractionId", how="left")
+    df = df.dropna(subset=["UserId", "AttractionId", "Rating"])
+    df["Rating"] = pd.to_numeric(df["Rating"], errors="coerce")
+    return df.dropna(subset=["Rating"])
+
+def _measure(fn, dfs):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    out = fn(dfs)
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 2**20, len(out)
+
+def main():
+    parser = argparse.ArgumentParser(description="Time and peak memory of build_consolidated.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000_000, 10_000_000])
+    parser.add_argument("--skip-baseline", action="store_true")
+    args = parser.parse_args()
+
+    for n in args.sizes:
+        dfs = make_raw_tables(n)
+        runs = [("build_consolidated", build_consolidated)]
+        if not args.skip_baseline:
+            runs.append(("merge baseline", _merge_baseline))
+        for name, fn in runs:
+            t, mb, rows = _measure(fn, dfs)
+            print(f"n_tx={n:>10} {name:<20} {t:7.2f} s  peak {mb:9.1f} MiB  rows={rows}")
+
+if __name__ == "__main__":
+    main()
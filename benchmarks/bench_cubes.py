@@ -0,0 +1,45 @@
+# benchmarks/bench_cubes.py
+import argparse
+import time
+from src.cubes import PopularityCubes
+from benchmarks.synthetic import make_consolidated
+
+def _time(fn, repeat=5):
+    # best of repeat, in milliseconds
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description="Time dashboard queries on the visit table vs the popularity cubes.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[200_000, 1_000_000])
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    for n in args.sizes:
+        df = make_consolidated(n)
+        t0 = time.perf_counter()
+        cubes = PopularityCubes.from_frame(df)
+        build = time.perf_counter() - t0
+        recs = df["AttractionId"].value_counts().index[:args.top].tolist()
+        mode, continent = df["VisitModeName"].mode()[0], df["UserContinent"].mode()[0]
+        runs = [
+            ("info: isin + drop_duplicates", lambda: df[df["AttractionId"].isin(recs)][
+                ["AttractionId", "Attraction", "AttractionType", "AttractionCityName"]].drop_duplicates()),
+            ("info: cubes", lambda: cubes.attraction_info(recs)),
+            ("top filtered: groupby", lambda: df[(df["VisitModeName"] == mode) & (df["UserContinent"] == continent)]
+                .groupby("AttractionId").size().nlargest(args.top)),
+            ("top filtered: cubes", lambda: cubes.top_attractions(args.top, visit_mode=mode, continent=continent)),
+            ("trend: groupby", lambda: df[df["AttractionId"] == recs[0]].groupby(["VisitYear", "VisitMonth"])["Rating"]
+                .agg(["size", "mean"])),
+            ("trend: cubes", lambda: cubes.trend(recs[0])),
+        ]
+        print(f"n={n:>10} build {build:6.2f} s  cells {len(cubes.cube)}")
+        for name, fn in runs:
+            print(f"n={n:>10} {name:<30} {_time(fn):8.2f} ms")
+
+if __name__ == "__main__":
+    main()
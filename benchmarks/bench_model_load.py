@@ -0,0 +1,81 @@
+# benchmarks/bench_model_load.py
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+# run as: python -m benchmarks.bench_model_load
+# runs in a fresh interpreter per mode so RSS and timings are not shared
+_PROBE = r"""
+import json, resource, sys, time
+def rss_mb():
+    # current RSS; ru_maxrss would include the parent's high-water mark inherited across exec
+    try:
+        with open("/proc/self/status") as fh:
+            return next(int(l.split()[1]) for l in fh if l.startswith("VmRSS")) / 1024
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+t0 = time.perf_counter()
+from src.serving import PredictionService
+import pandas as pd
+models_dir, mode = sys.argv[1], sys.argv[2]
+t1 = time.perf_counter()
+rss0 = rss_mb()
+svc = PredictionService(models_dir, mmap=(mode == "artifact-mmap"))
+if mode == "legacy":
+    svc._artifacts = {}
+reg = svc.reg
+t2 = time.perf_counter()
+svc.predict_rating(pd.DataFrame([{"VisitYear": 2020, "VisitMonth": 5}]))
+t3 = time.perf_counter()
+print(json.dumps({"mode": mode, "import_s": t1 - t0, "load_s": t2 - t1, "first_predict_s": t3 - t2,
+                  "import_rss_mb": rss0, "rss_mb": rss_mb()}))
+"""
+
+def _build_models(models_dir, rows):
+    # a 200-tree forest like train.py's, saved both as legacy pickle and as artifact
+    import joblib
+    from src.artifacts import save_artifact
+    from src.features import AggregateStore, create_basic_feature_matrix, feature_names, DEFAULT_NUMERIC_COLS
+    from src.modeling import train_regression
+    from benchmarks.synthetic import make_consolidated
+    df = make_consolidated(rows)
+    df = AggregateStore.from_frame(df).attach(df)
+    X, enc = create_basic_feature_matrix(df, sparse=True)
+    model, _ = train_regression(X, df["Rating"], save_path=str(Path(models_dir) / "regressor_joblib.pkl"), dense=True)
+    joblib.dump(enc, Path(models_dir) / "onehot_enc.pkl")
+    save_artifact(model, Path(models_dir) / "regressor", feature_names=feature_names(DEFAULT_NUMERIC_COLS, enc),
+                  encoder=enc, numeric_cols=DEFAULT_NUMERIC_COLS, compact=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-start time and RSS: legacy pickle vs model artifact.")
+    parser.add_argument("--models-dir", default=None, help="existing models dir (default: train a synthetic one)")
+    parser.add_argument("--rows", type=int, default=20_000, help="training rows for the synthetic model")
+    args = parser.parse_args()
+
+    tmp = None
+    models_dir = args.models_dir
+    if models_dir is None:
+        tmp = tempfile.TemporaryDirectory(prefix="bench_model_load_")
+        models_dir = tmp.name
+        _build_models(models_dir, args.rows)
+    legacy = Path(models_dir) / "regressor_joblib.pkl"
+    artifact = Path(models_dir) / "regressor"
+    if legacy.exists() and artifact.exists():
+        size = sum(f.stat().st_size for f in artifact.rglob("*") if f.is_file())
+        print(f"on disk: legacy {legacy.stat().st_size / 2**20:.1f} MiB, artifact {size / 2**20:.1f} MiB")
+    try:
+        for mode in ("legacy", "artifact", "artifact-mmap"):
+            out = subprocess.run([sys.executable, "-W", "ignore", "-c", _PROBE, models_dir, mode],
+                                 capture_output=True, text=True, check=True)
+            r = json.loads(out.stdout.strip().splitlines()[-1])
+            print(f"{r['mode']:<15} load {r['load_s']:.3f} s  first predict {r['first_predict_s']:.3f} s  "
+                  f"RSS {r['rss_mb']:.0f} MiB (+{r['rss_mb'] - r['import_rss_mb']:.0f} over imports)")
+    finally:
+        if tmp is not None:
+            tmp.cleanup()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+# benchmarks/bench_recommender.py
+import argparse
+import time
+import numpy as np
+from src.recommenders import simple_svd_recommender, SVDRecommender
+from benchmarks.synthetic import make_visits
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-request refit vs prebuilt SVDRecommender.")
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--requests", type=int, default=20)
+    args = parser.parse_args()
+
+    df = make_visits(args.rows)
+    users = np.random.default_rng(0).choice(df["UserId"].unique(), args.requests)
+
+    t0 = time.perf_counter()
+    for u in users:
+        simple_svd_recommender(df, u)
+    per_call = (time.perf_counter() - t0) / len(users)
+
+    t0 = time.perf_counter()
+    rec = SVDRecommender().fit(df)
+    fit_time = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    for u in users:
+        rec.recommend(u)
+    per_lookup = (time.perf_counter() - t0) / len(users)
+
+    print(f"rows={args.rows} users={len(rec.user_ids)} items={len(rec.item_ids)}")
+    print(f"simple_svd_recommender: {per_call*1e3:.1f} ms/request")
+    print(f"SVDRecommender: fit {fit_time:.2f} s once, {per_lookup*1e3:.3f} ms/request")
+
+if __name__ == "__main__":
+    main()
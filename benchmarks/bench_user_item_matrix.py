@@ -0,0 +1,32 @@
+# benchmarks/bench_user_item_matrix.py
+import argparse
+import time
+import tracemalloc
+from src.recommenders import user_item_matrix, sparse_user_item_matrix
+from benchmarks.synthetic import make_visits
+
+def _measure(fn, *args):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    fn(*args)
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 2**20
+
+def main():
+    parser = argparse.ArgumentParser(description="Peak memory of dense pivot vs CSR user-item matrix.")
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--skip-dense", action="store_true", help="dense pivot can exhaust RAM at large sizes")
+    args = parser.parse_args()
+
+    df = make_visits(args.rows)
+    print(f"rows={args.rows} users={df['UserId'].nunique()} items={df['AttractionId'].nunique()}")
+    if not args.skip_dense:
+        t, mb = _measure(user_item_matrix, df)
+        print(f"pivot_table (dense): {t:.2f} s, peak {mb:.1f} MiB")
+    t, mb = _measure(sparse_user_item_matrix, df)
+    print(f"sparse_user_item_matrix (CSR): {t:.2f} s, peak {mb:.1f} MiB")
+
+if __name__ == "__main__":
+    main()
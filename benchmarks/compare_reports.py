@@ -0,0 +1,26 @@
+# benchmarks/compare_reports.py
+import argparse
+import json
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two StageProfiler JSON reports stage by stage.")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--metric", default="wall_s", choices=["wall_s", "cpu_s", "max_rss_mb", "peak_traced_mb"])
+    args = parser.parse_args()
+
+    with open(args.baseline) as fh:
+        base = {s["stage"]: s for s in json.load(fh)["stages"]}
+    with open(args.candidate) as fh:
+        cand = {s["stage"]: s for s in json.load(fh)["stages"]}
+
+    print(f"{'stage':<28}{'baseline':>12}{'candidate':>12}{'change':>10}")
+    for name in list(base) + [n for n in cand if n not in base]:
+        b = base.get(name, {}).get(args.metric)
+        c = cand.get(name, {}).get(args.metric)
+        change = f"{(c - b) / b * 100:+.1f}%" if b and c is not None else ""
+        fmt = lambda v: "-" if v is None else f"{v:.3f}"
+        print(f"{name:<28}{fmt(b):>12}{fmt(c):>12}{change:>10}")
+
+if __name__ == "__main__":
+    main()
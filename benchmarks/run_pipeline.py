@@ -0,0 +1,115 @@
+# benchmarks/run_pipeline.py
+import argparse
+import sys
+from pathlib import Path
+import pandas as pd
+from src.cleaning import basic_clean
+from src.data_loader import ChunkedParquetWriter, build_consolidated
+from src.features import AggregateStore, create_basic_feature_matrix, label_encode_visitmode
+from src.modeling import train_regression, train_classification
+from src.profiling import StageProfiler, row_count
+from src.recommenders import SVDRecommender
+from benchmarks.synthetic import make_consolidated, make_raw_tables, write_consolidated
+
+def run(n_rows, from_raw=False, train_rows=None, trace_memory=False, seed=42):
+    """
+    Run the train.py stages on synthetic data and return the StageProfiler.
+    train_rows caps the rows passed to the two random forests (None = all, 0 = skip),
+    since 200-tree forests dominate everything else at large n_rows.
+    """
+    prof = StageProfiler(trace_memory=trace_memory,
+                         meta={"benchmark": "pipeline", "n_rows": n_rows, "from_raw": from_raw, "seed": seed})
+    with prof.stage("generate", rows=n_rows):
+        if from_raw:
+            dfs = make_raw_tables(n_rows, seed=seed)
+        else:
+            df = make_consolidated(n_rows, seed=seed)
+    if from_raw:
+        with prof.stage("build_consolidated", rows=n_rows) as rec:
+            df = build_consolidated(dfs)
+            rec["rows"] = len(df)
+        del dfs
+    with prof.stage("basic_clean", rows=len(df)):
+        df = basic_clean(df)
+    with prof.stage("add_aggregates", rows=len(df)):
+        df = AggregateStore.from_frame(df).attach(df)
+    _fit(prof, df, train_rows)
+    return prof
+
+def run_stream(n_rows, path, chunk_size=1_000_000, train_rows=None, trace_memory=False, seed=42):
+    """
+    The train.py --stream stages, for sizes that do not fit in memory. The synthetic frame
+    is written to Parquet at path chunk by chunk (kept and reused when it already holds
+    n_rows), then cleaned and folded into an AggregateStore one row group at a time with
+    the cleaned chunks spilled to Parquet. Only the training columns are read back.
+    """
+    import pyarrow.parquet as pq
+    prof = StageProfiler(trace_memory=trace_memory, meta={"benchmark": "pipeline", "mode": "stream", "n_rows": n_rows,
+                                                          "chunk_size": chunk_size, "seed": seed})
+    path = Path(path)
+    with prof.stage("generate", rows=n_rows) as rec:
+        rec["reused"] = path.exists() and pq.ParquetFile(path).metadata.num_rows == n_rows
+        if not rec["reused"]:
+            write_consolidated(path, n_rows, chunk_size=chunk_size, seed=seed)
+    spill = path.with_name(path.stem + ".clean.parquet")
+    store = AggregateStore()
+    with prof.stage("stream_clean") as rec:
+        with ChunkedParquetWriter(spill) as writer:
+            for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+                chunk = basic_clean(batch.to_pandas())
+                store.update(chunk)
+                writer.write(chunk)
+        rec["rows"] = writer.rows
+    with prof.stage("read_cleaned") as rec:
+        df = pd.read_parquet(spill, columns=["UserId", "AttractionId", "Rating", "VisitYear", "VisitMonth",
+                                             "AttractionType", "UserContinent", "UserCountry", "VisitModeName"])
+        rec["rows"] = len(df)
+    spill.unlink()
+    with prof.stage("add_aggregates", rows=len(df)):
+        df = store.attach(df)
+    _fit(prof, df, train_rows)
+    return prof
+
+def _fit(prof, df, train_rows):
+    # feature matrix, the two forests (on at most train_rows rows) and the SVD recommender
+    with prof.stage("create_basic_feature_matrix", rows=len(df)):
+        X, enc = create_basic_feature_matrix(df, sparse=True)
+    if train_rows != 0:
+        n = len(df) if train_rows is None else min(train_rows, len(df))
+        with prof.stage("train_regression", rows=n):
+            train_regression(X[:n], df["Rating"].iloc[:n])
+        df_mode, _ = label_encode_visitmode(df.iloc[:n])
+        Xc = X[:n][df["VisitModeName"].iloc[:n].notna().to_numpy()]
+        with prof.stage("train_classification", rows=row_count(Xc)):
+            train_classification(Xc, df_mode["visit_mode_label"])
+    with prof.stage("fit_recommender", rows=len(df)):
+        SVDRecommender().fit(df)
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile the training pipeline on synthetic data.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000])
+    parser.add_argument("--from-raw", action="store_true", help="start from raw tables and include build_consolidated")
+    parser.add_argument("--train-rows", type=int, default=100_000, help="rows used for model fitting (0 skips it)")
+    parser.add_argument("--trace-memory", action="store_true")
+    parser.add_argument("--stream-to", default=None,
+                        help="write the synthetic data to this Parquet path ({rows} is replaced; reused if present) "
+                             "and run the chunked stages, for sizes that do not fit in memory")
+    parser.add_argument("--chunk-size", type=int, default=1_000_000, help="rows per generated/cleaned chunk with --stream-to")
+    parser.add_argument("--out", default=None, help="JSON report path; {rows} is replaced per size")
+    args = parser.parse_args()
+
+    for n in args.rows:
+        if args.stream_to:
+            prof = run_stream(n, args.stream_to.format(rows=n), chunk_size=args.chunk_size, train_rows=args.train_rows,
+                              trace_memory=args.trace_memory)
+        else:
+            prof = run(n, from_raw=args.from_raw, train_rows=args.train_rows, trace_memory=args.trace_memory)
+        print(f"# rows={n}")
+        print(prof.summary())
+        if args.out:
+            path = args.out.format(rows=n)
+            prof.write(path)
+            print(f"report: {path}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+# benchmarks/synthetic.py
+import numpy as np
+import pandas as pd
+
+def make_visits(n_rows, n_users=None, n_items=None, seed=42):
+    """
+    Random visit-level frame with the UserId/AttractionId/Rating columns the recommenders use.
+    Attraction popularity is Zipf-like so the interaction matrix looks like the real one.
+    """
+    rng = np.random.default_rng(seed)
+    n_users = n_users or max(10, n_rows // 3)
+    n_items = n_items or max(10, min(1000, n_rows // 50))
+    weights = 1.0 / np.arange(1, n_items + 1)
+    weights /= weights.sum()
+    return pd.DataFrame({
+        "TransactionId": np.arange(1, n_rows + 1),
+        "UserId": rng.integers(1, n_users + 1, n_rows),
+        "AttractionId": rng.choice(np.arange(1, n_items + 1), size=n_rows, p=weights),
+        "Rating": rng.integers(1, 6, n_rows),
+        "VisitYear": rng.integers(2013, 2023, n_rows),
+        "VisitMonth": rng.integers(1, 13, n_rows),
+    })
+
+def make_raw_tables(n_tx, n_users=None, n_items=None, seed=42):
+    """
+    Synthetic version of the dict returned by load_raw(), with the same table and column names.
+    """
+    rng = np.random.default_rng(seed)
+    visits = make_visits(n_tx, n_users=n_users, n_items=n_items, seed=seed)
+    n_users = int(visits["UserId"].max())
+    n_items = int(visits["AttractionId"].max())
+    n_cities, n_countries, n_regions = 1000, 150, 20
+
+    tx = visits.assign(VisitMode=rng.integers(1, 6, n_tx))
+    users = pd.DataFrame({
+        "UserId": np.arange(1, n_users + 1),
+        "ContinentId": rng.integers(1, 6, n_users),
+        "RegionId": rng.integers(1, n_regions + 1, n_users),
+        "CountryId": rng.integers(1, n_countries + 1, n_users),
+        "CityId": rng.integers(1, n_cities + 1, n_users).astype(float),
+    })
+    items = pd.DataFrame({
+        "AttractionId": np.arange(1, n_items + 1),
+        "AttractionCityId": rng.integers(1, n_cities + 1, n_items),
+        "AttractionTypeId": rng.integers(1, 18, n_items),
+        "Attraction": [f"Attraction {i}" for i in range(1, n_items + 1)],
+        "AttractionAddress": [f"{i} Main Street" for i in range(1, n_items + 1)],
+    })
+    return {
+        "tx": tx, "users": users, "items": items,
+        "city": pd.DataFrame({"CityId": np.arange(1, n_cities + 1),
+                              "CityName": [f"City {i}" for i in range(1, n_cities + 1)],
+                              "CountryId": rng.integers(1, n_countries + 1, n_cities)}),
+        "country": pd.DataFrame({"CountryId": np.arange(1, n_countries + 1),
+                                 "Country": [f"Country {i}" for i in range(1, n_countries + 1)],
+                                 "RegionId": rng.integers(1, n_regions + 1, n_countries)}),
+        "continent": pd.DataFrame({"ContinentId": np.arange(1, 6),
+                                   "Continent": ["Africa", "America", "Asia", "Australia & Oceania", "Europe"]}),
+        "region": pd.DataFrame({"RegionId": np.arange(1, n_regions + 1),
+                                "Region": [f"Region {i}" for i in range(1, n_regions + 1)]}),
+        "type": pd.DataFrame({"AttractionTypeId": np.arange(1, 18),
+                              "AttractionType": [f"Type {i}" for i in range(1, 18)]}),
+        "mode": pd.DataFrame({"VisitModeId": np.arange(1, 6),
+                              "VisitMode": ["Business", "Couples", "Family", "Friends", "Solo"]}),
+    }
+
+SAMPLE_PATH = "data/cleaned_small.csv"
+USER_COLS = ["ContinentId", "RegionId", "CountryId", "CityId", "UserCityName", "UserCountry", "UserRegion", "UserContinent"]
+ITEM_COLS = ["AttractionCityId", "AttractionTypeId", "Attraction", "AttractionAddress", "AttractionCityName",
+             "AttractionCountryId", "AttractionCountry", "AttractionType"]
+AGGREGATE_COLS = ["user_total_visits", "user_avg_rating", "attraction_total_visits", "attraction_avg_rating"]
+
+def _draw_attributes(rng, sample, n_users, n_items):
+    user_rows = sample[USER_COLS].drop_duplicates().reset_index(drop=True)
+    item_rows = sample[ITEM_COLS].drop_duplicates().reset_index(drop=True)
+    return {
+        "users": user_rows.iloc[rng.integers(0, len(user_rows), n_users)].reset_index(drop=True),
+        "items": item_rows.iloc[rng.integers(0, len(item_rows), n_items)].reset_index(drop=True),
+        "modes": sample[["VisitMode", "VisitModeName"]].drop_duplicates().reset_index(drop=True),
+    }
+
+def make_attributes(n_users, n_items, seed=42, sample_path=SAMPLE_PATH):
+    """
+    User and attraction attribute rows (row i describes id i + 1) and the visit-mode table,
+    resampled from the sample. Pass the result to make_consolidated(attributes=...) so
+    independently generated chunks agree on each UserId's and AttractionId's attributes.
+    """
+    return _draw_attributes(np.random.default_rng(seed), pd.read_csv(sample_path), n_users, n_items)
+
+def make_consolidated(n_rows, n_users=None, n_items=None, seed=42, sample_path=SAMPLE_PATH, start_id=1, attributes=None):
+    """
+    Consolidated visit frame with the schema of data/cleaned_small.csv, scaled to n_rows.
+    User and attraction attributes are resampled from the sample's rows, so categorical
+    cardinalities and string widths match the real data; attributes (see make_attributes)
+    supplies them instead, covering ids up to n_users / n_items. The aggregate columns are
+    left out; the pipeline under test computes them. start_id offsets TransactionId so
+    chunks can be generated independently.
+    """
+    rng = np.random.default_rng(seed)
+    visits = make_visits(n_rows, n_users=n_users, n_items=n_items, seed=seed)
+    if attributes is None:
+        attributes = _draw_attributes(rng, pd.read_csv(sample_path),
+                                      int(visits["UserId"].max()), int(visits["AttractionId"].max()))
+    user_attr, item_attr, modes = attributes["users"], attributes["items"], attributes["modes"]
+    mode_rows = modes.iloc[rng.integers(0, len(modes), n_rows)].reset_index(drop=True)
+
+    u = visits["UserId"].to_numpy() - 1
+    a = visits["AttractionId"].to_numpy() - 1
+    out = {
+        "TransactionId": visits["TransactionId"].to_numpy() + (start_id - 1),
+        "UserId": visits["UserId"].to_numpy(),
+        "VisitYear": visits["VisitYear"].to_numpy(),
+        "VisitMonth": visits["VisitMonth"].to_numpy(),
+        "VisitMode": mode_rows["VisitMode"].to_numpy(),
+        "AttractionId": visits["AttractionId"].to_numpy(),
+        "Rating": visits["Rating"].to_numpy(),
+        "VisitModeName": mode_rows["VisitModeName"].to_numpy(),
+    }
+    for c in USER_COLS:
+        out[c] = user_attr[c].to_numpy()[u]
+    for c in ITEM_COLS:
+        out[c] = item_attr[c].to_numpy()[a]
+    return pd.DataFrame(out)
+
+def write_consolidated(path, n_rows, chunk_size=1_000_000, seed=42, n_users=None, n_items=None, sample_path=SAMPLE_PATH):
+    """
+    Write make_consolidated output to Parquet in chunks, for sizes (e.g. 50M rows) that
+    should not be materialized at once. Id ranges and the user/attraction attribute
+    tables are drawn once and shared by every chunk; only the visits differ per chunk.
+    Returns path.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    n_users = n_users or max(10, n_rows // 3)
+    n_items = n_items or max(10, min(1000, n_rows // 50))
+    attributes = make_attributes(n_users, n_items, seed=seed, sample_path=sample_path)
+    writer = None
+    try:
+        for i, start in enumerate(range(0, n_rows, chunk_size)):
+            n = min(chunk_size, n_rows - start)
+            chunk = make_consolidated(n, n_users=n_users, n_items=n_items, seed=seed + i + 1, start_id=start + 1,
+                                      attributes=attributes)
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(str(path), table.schema)
+            writer.write_table(table.cast(writer.schema))
+    finally:
+        if writer is not None:
+            writer.close()
+    return path
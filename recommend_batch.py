@@ -0,0 +1,28 @@
+# recommend_batch.py
+from src.recommenders import SVDRecommender, write_batch_recommendations
+import argparse
+import time
+
+def main():
+    parser = argparse.ArgumentParser(description="Top-k recommendations for many users in one pass.")
+    parser.add_argument("--model", default="models/svd_recommender.pkl")
+    parser.add_argument("--out", default="data/recommendations.parquet", help=".parquet or .csv")
+    parser.add_argument("--users", default=None, help="optional file with one UserId per line (default: all users)")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--chunk-size", type=int, default=2048)
+    parser.add_argument("--include-seen", action="store_true", help="do not exclude already-visited attractions")
+    args = parser.parse_args()
+
+    rec = SVDRecommender.load(args.model)
+    user_ids = None
+    if args.users:
+        with open(args.users) as fh:
+            user_ids = [int(line) for line in fh if line.strip()]
+
+    t0 = time.perf_counter()
+    n = write_batch_recommendations(rec, args.out, user_ids=user_ids, top_k=args.top_k,
+                                    exclude_seen=not args.include_seen, chunk_size=args.chunk_size)
+    print(f"Wrote {n} recommendations to {args.out} in {time.perf_counter() - t0:.2f} s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+# src/artifacts.py
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+import joblib
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+import sklearn
+
+FORMAT_VERSION = 1
+
+def data_hash(X, y=None):
+    """Short content hash of the training matrix (DataFrame, ndarray or sparse) and target."""
+    h = hashlib.sha1()
+    for obj in (X, y):
+        if obj is None:
+            continue
+        if isinstance(obj, (pd.DataFrame, pd.Series)):
+            h.update(pd.util.hash_pandas_object(obj, index=False).to_numpy().tobytes())
+        elif sp.issparse(obj):
+            obj = obj.tocsr()
+            for part in (obj.data, obj.indices, obj.indptr):
+                h.update(np.ascontiguousarray(part).tobytes())
+        else:
+            h.update(np.ascontiguousarray(obj).tobytes())
+    return h.hexdigest()[:16]
+
+class CompactForest:
+    """
+    Random forest flattened into a handful of node arrays, loadable with np.load(mmap_mode="r").
+
+    All trees' nodes are concatenated; children are global node indices (-1 at leaves).
+    Prediction walks every (row, tree) pair down one level per step with array gathers,
+    so it costs max_depth vectorized steps regardless of the number of trees. Rows are
+    compared as float32 against float64 thresholds, exactly as sklearn trees do.
+    Regressors store the leaf mean, classifiers the leaf class distribution.
+    """
+
+    ARRAYS = ("roots", "left", "right", "feature", "threshold", "value")
+
+    def __init__(self, arrays, n_features_in_, classes_=None):
+        for name in self.ARRAYS:
+            setattr(self, name, arrays[name])
+        self.n_features_in_ = n_features_in_
+        self.classes_ = classes_
+
+    @classmethod
+    def supports(cls, model):
+        trees = getattr(model, "estimators_", None)
+        return (isinstance(trees, list) and len(trees) > 0 and getattr(model, "n_outputs_", 1) == 1
+                and all(hasattr(t, "tree_") for t in trees))
+
+    @classmethod
+    def from_sklearn(cls, model):
+        roots, left, right, feature, threshold, value = [], [], [], [], [], []
+        offset = 0
+        is_clf = hasattr(model, "classes_")
+        for est in model.estimators_:
+            t = est.tree_
+            leaf = t.children_left == -1
+            roots.append(offset)
+            left.append(np.where(leaf, -1, t.children_left + offset))
+            right.append(np.where(leaf, -1, t.children_right + offset))
+            feature.append(np.where(leaf, 0, t.feature))
+            threshold.append(t.threshold)
+            v = t.value[:, 0, :]
+            if is_clf:
+                v = v / np.maximum(v.sum(axis=1, keepdims=True), 1e-12)
+            value.append(v if is_clf else v[:, 0])
+            offset += t.node_count
+        arrays = {
+            "roots": np.asarray(roots, dtype=np.int64),
+            "left": np.concatenate(left).astype(np.int32),
+            "right": np.concatenate(right).astype(np.int32),
+            "feature": np.concatenate(feature).astype(np.int32),
+            "threshold": np.concatenate(threshold).astype(np.float64),
+            "value": np.concatenate(value).astype(np.float64),
+        }
+        return cls(arrays, model.n_features_in_, getattr(model, "classes_", None))
+
+    def save(self, path):
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        for name in self.ARRAYS:
+            np.save(path / f"{name}.npy", getattr(self, name))
+        if self.classes_ is not None:
+            np.save(path / "classes.npy", np.asarray(self.classes_))
+
+    @classmethod
+    def load(cls, path, n_features_in_, mmap=True):
+        path = Path(path)
+        mode = "r" if mmap else None
+        arrays = {name: np.load(path / f"{name}.npy", mmap_mode=mode) for name in cls.ARRAYS}
+        classes = np.load(path / "classes.npy", allow_pickle=True) if (path / "classes.npy").exists() else None
+        return cls(arrays, n_features_in_, classes)
+
+    def _leaves(self, X):
+        X = X.toarray() if sp.issparse(X) else np.asarray(X)
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        n_rows, n_trees = X.shape[0], len(self.roots)
+        node = np.tile(np.asarray(self.roots, dtype=np.int32), n_rows)
+        # flat (row, tree) pairs still inside the trees; finished pairs drop out each level
+        pos = np.arange(node.size)
+        cur = node.copy()
+        row_offset = (pos // n_trees) * X.shape[1]
+        flat = X.ravel()
+        while pos.size:
+            left = self.left[cur]
+            inner = left != -1
+            node[pos[~inner]] = cur[~inner]
+            pos, cur, left, row_offset = pos[inner], cur[inner], left[inner], row_offset[inner]
+            go_left = flat[row_offset + self.feature[cur]] <= self.threshold[cur]
+            cur = np.where(go_left, left, self.right[cur])
+        return node.reshape(n_rows, n_trees)
+
+    def _mean_leaf_value(self, X, block=1024):
+        # blocks bound the (rows x trees) index arrays; large inputs fan out over threads
+        # since the gathers release the GIL
+        def run(start):
+            return self.value[self._leaves(X[start:start + block])].mean(axis=1)
+        starts = range(0, X.shape[0], block)
+        if len(starts) > 1:
+            with ThreadPoolExecutor(max_workers=min(len(starts), os.cpu_count() or 1)) as pool:
+                out = list(pool.map(run, starts))
+        else:
+            out = [run(s) for s in starts]
+        return np.concatenate(out) if out else np.empty((0,) + self.value.shape[1:])
+
+    def predict_proba(self, X):
+        return self._mean_leaf_value(X)
+
+    def predict(self, X):
+        mean = self._mean_leaf_value(X)
+        if self.classes_ is None:
+            return mean
+        return np.asarray(self.classes_).take(mean.argmax(axis=1))
+
+def save_artifact(model, path, feature_names=None, encoder=None, numeric_cols=None, label_encoder=None,
+                  train_hash=None, extra=None, compact=False):
+    """
+    Write a model artifact directory:
+        model.joblib     the estimator, uncompressed so its numpy arrays can be mmapped, or
+        forest/*.npy     with compact=True, random forests as CompactForest node arrays:
+                         much faster cold start and lower RSS, but bulk prediction runs
+                         several times slower than sklearn's, so opt in for latency-bound,
+                         small-batch serving only
+        encoder.joblib   fitted OneHotEncoder, if any
+        labels.joblib    fitted LabelEncoder, if any
+        metadata.json    feature column order, numeric columns, training-data hash, versions
+    """
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    if compact and CompactForest.supports(model):
+        CompactForest.from_sklearn(model).save(path / "forest")
+        stored = "compact_forest"
+    else:
+        joblib.dump(model, path / "model.joblib")
+        stored = "joblib"
+    if encoder is not None:
+        joblib.dump(encoder, path / "encoder.joblib")
+    if label_encoder is not None:
+        joblib.dump(label_encoder, path / "labels.joblib")
+    meta = {
+        "format_version": FORMAT_VERSION,
+        "storage": stored,
+        "model_class": f"{type(model).__module__}.{type(model).__name__}",
+        "sklearn_version": sklearn.__version__,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "feature_names": list(feature_names) if feature_names is not None else None,
+        "n_features": getattr(model, "n_features_in_", None),
+        "numeric_cols": list(numeric_cols) if numeric_cols is not None else None,
+        "train_data_hash": train_hash,
+        **(extra or {}),
+    }
+    with open(path / "metadata.json", "w") as fh:
+        json.dump(meta, fh, indent=2, default=str)
+    return path
+
+class ModelArtifact:
+    """
+    Lazily loaded artifact: metadata is read eagerly (tiny), the model and encoders on
+    first attribute access. With mmap=True the model's numpy arrays are memory-mapped
+    read-only, so processes loading the same artifact share the pages. Forests come
+    back as CompactForest when saved with compact=True; it has the
+    predict/predict_proba/n_features_in_ surface.
+    """
+
+    def __init__(self, path, mmap=True):
+        self.path = Path(path)
+        self.mmap = mmap
+        with open(self.path / "metadata.json") as fh:
+            self.metadata = json.load(fh)
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def _get(self, name, filename, mmap=False):
+        if name not in self._cache:
+            with self._lock:
+                if name not in self._cache:
+                    f = self.path / filename
+                    self._cache[name] = joblib.load(f, mmap_mode="r" if mmap else None) if f.exists() else None
+        return self._cache[name]
+
+    @property
+    def model(self):
+        if self.metadata.get("storage") == "compact_forest":
+            if "model" not in self._cache:
+                with self._lock:
+                    if "model" not in self._cache:
+                        self._cache["model"] = CompactForest.load(self.path / "forest", self.metadata["n_features"],
+                                                                  mmap=self.mmap)
+            return self._cache["model"]
+        return self._get("model", "model.joblib", mmap=self.mmap)
+
+    @property
+    def encoder(self):
+        return self._get("encoder", "encoder.joblib")
+
+    @property
+    def label_encoder(self):
+        return self._get("labels", "labels.joblib")
+
+    @property
+    def loaded(self):
+        return "model" in self._cache
+
+def is_artifact(path):
+    return (Path(path) / "metadata.json").exists()
+
+def load_artifact(path, mmap=True):
+    return ModelArtifact(path, mmap=mmap)
@@ -1,18 +1,31 @@
 # src/cleaning.py
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import numpy as np
 import pandas as pd
 
+PLACEHOLDERS = ['-', '']
+
 def basic_clean(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
-    # strip column names and standardize
-    df.columns = [c.strip() for c in df.columns]
-    # replace common placeholder values with NaN
-    df = df.replace({'-': pd.NA, '': pd.NA})
-    # try infer_objects with copy=False if available, else fallback
-    try:
-        # pandas >= some versions accept copy arg; used to avoid the FutureWarning
-        df = df.infer_objects(copy=False)
-    except TypeError:
-        df = df.infer_objects()
+    """
+    Strip column names, turn placeholder strings into NA and coerce dates/ids to integers.
+    The result is assembled column by column: only text columns are scanned for
+    placeholders and only changed columns are rebuilt, the rest are shared with the
+    input (which is left untouched) instead of being copied.
+    """
+    cols = {}
+    for name, s in df.items():
+        name = name.strip() if isinstance(name, str) else name
+        if s.dtype == object or pd.api.types.is_string_dtype(s.dtype):
+            # replace common placeholder values with NaN
+            if s.isin(PLACEHOLDERS).any():
+                s = s.replace({p: pd.NA for p in PLACEHOLDERS})
+            s = s.infer_objects()
+        cols[name] = s
+    df = pd.DataFrame(cols, index=df.index, copy=False)
 
     # date sanity: VisitMonth/VisitYear -> numeric
     if "VisitMonth" in df.columns:
@@ -25,15 +38,182 @@ def basic_clean(df: pd.DataFrame) -> pd.DataFrame:
             df[col] = pd.to_numeric(df[col], errors="coerce").astype("Int64")
     return df
 
-def drop_low_information_cols(df, threshold=0.98):
-    to_drop = []
-    for col in df.columns:
-        try:
-            top_freq = df[col].value_counts(normalize=True, dropna=False).values[0]
-            if top_freq >= threshold:
-                to_drop.append(col)
-        except Exception:
-            continue
-    return df.drop(columns=to_drop, errors="ignore")
+def _narrow_integer(s: pd.Series):
+    """
+    s as the narrowest integer dtype when every non-null value is integral, else None.
+    Columns without nulls become numpy ints (int8/16/32/64), others nullable Int8..Int64.
+    """
+    if pd.api.types.is_bool_dtype(s.dtype):
+        return None
+    if pd.api.types.is_float_dtype(s.dtype):
+        values = s.to_numpy(dtype="float64", na_value=np.nan)
+        present = values[~np.isnan(values)]
+        if not (np.isfinite(present).all() and np.array_equal(present, np.floor(present))):
+            return None
+    elif not pd.api.types.is_integer_dtype(s.dtype):
+        return None
+    lo, hi = s.min(), s.max()
+    if pd.isna(lo):
+        return None
+    for dtype in (np.int8, np.int16, np.int32, np.int64):
+        info = np.iinfo(dtype)
+        if info.min <= lo and hi <= info.max:
+            if s.isna().any():
+                return s.astype(f"Int{info.bits}")
+            return s.astype(dtype)
+    return None
+
+def optimize_dtypes(df: pd.DataFrame, categorical_max_ratio: float = 0.5, exclude=()) -> pd.DataFrame:
+    """
+    Shrink the frame's memory without changing its values:
+      - integer-valued numeric columns (ids, ratings, year/month; float64 or Int64 in the
+        consolidated frame) become the narrowest integer type, nullable only if needed;
+      - text columns with at most categorical_max_ratio distinct values per row
+        (country, type, attraction and city names, ...) become categoricals.
+    Non-integral floats are left as they are. Converted columns are built once each and
+    the rest are shared with the input; nothing is copied wholesale.
+    """
+    cols = {}
+    n = len(df)
+    for name, s in df.items():
+        if name in exclude or n == 0:
+            cols[name] = s
+        elif pd.api.types.is_numeric_dtype(s.dtype):
+            narrowed = _narrow_integer(s)
+            cols[name] = s if narrowed is None else narrowed
+        elif s.dtype == object or pd.api.types.is_string_dtype(s.dtype):
+            if s.nunique(dropna=True) <= categorical_max_ratio * n:
+                try:
+                    s = s.astype("category")
+                except TypeError:
+                    pass  # unorderable mixed types; keep as is
+            cols[name] = s
+        else:
+            cols[name] = s
+    return pd.DataFrame(cols, index=df.index, copy=False)
+
+def memory_usage_mb(df: pd.DataFrame) -> float:
+    # deep: counts the Python string objects behind object columns
+    return float(df.memory_usage(deep=True).sum()) / 2**20
+
+def _codes(s: pd.Series):
+    # integer codes (-1 = missing) and number of distinct non-null values, in one hash pass
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        codes = s.cat.codes.to_numpy()
+        used = np.bincount(codes[codes >= 0], minlength=len(s.cat.categories))
+        return codes, used
+    codes, uniques = pd.factorize(s, use_na_sentinel=True)
+    return codes, np.bincount(codes[codes >= 0], minlength=len(uniques))
+
+def _stats(codes, counts):
+    n = len(codes)
+    nulls = int(n - counts.sum())
+    top = max(int(counts.max()) if len(counts) else 0, nulls)
+    return {
+        "null_ratio": nulls / n if n else 0.0,
+        "cardinality": int((counts > 0).sum()),
+        # value_counts(normalize=True, dropna=False).iloc[0]: missing counts as a value
+        "top_freq": top / n if n else 0.0,
+    }
+
+def profile_column(s: pd.Series, threshold: float = None, sample_size: int = 10_000, z: float = 4.0,
+                   random_state: int = 0) -> dict:
+    """
+    Top-value frequency, null ratio and cardinality of one column from a single
+    factorize + bincount pass.
+
+    With a threshold, a random sample of sample_size rows is profiled first. If even a
+    z-sigma upper bound on the sample's top frequency stays below threshold, the column
+    cannot be low-information and the full pass is skipped; the result is then marked
+    exact=False with sample estimates (cardinality is a lower bound). top_freq_upper is
+    the bound the decision was based on (equal to top_freq when exact).
+    """
+    n = len(s)
+    if threshold is not None and n > 2 * sample_size:
+        rows = np.random.default_rng(random_state).choice(n, size=sample_size, replace=False)
+        est = _stats(*_codes(s.iloc[rows]))
+        p = est["top_freq"]
+        upper = min(1.0, p + z * np.sqrt(max(p * (1 - p), 1.0 / sample_size) / sample_size))
+        if upper < threshold:
+            return {"column": s.name, "dtype": str(s.dtype), "rows": n, **est,
+                    "top_freq_upper": upper, "exact": False}
+    stats = _stats(*_codes(s))
+    return {"column": s.name, "dtype": str(s.dtype), "rows": n, **stats,
+            "top_freq_upper": stats["top_freq"], "exact": True}
+
+def profile_columns(df: pd.DataFrame, threshold: float = None, sample_size: int = 10_000, n_jobs: int = None,
+                    columns=None) -> pd.DataFrame:
+    """
+    profile_column for every column (or the given columns), one row each, indexed by
+    column name. Columns are profiled concurrently on n_jobs threads (default: one per
+    CPU); factorizing numeric columns releases the GIL, and threads avoid copying the
+    columns into other processes.
+    """
+    columns = list(df.columns if columns is None else columns)
+    workers = min(len(columns), n_jobs or os.cpu_count() or 1)
+
+    def run(col):
+        return profile_column(df[col], threshold=threshold, sample_size=sample_size)
+
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            rows = list(pool.map(run, columns))
+    else:
+        rows = [run(c) for c in columns]
+    return pd.DataFrame(rows, columns=PROFILE_COLUMNS).set_index("column")
+
+PROFILE_COLUMNS = ["column", "dtype", "rows", "null_ratio", "cardinality", "top_freq", "top_freq_upper", "exact"]
+
+def frame_fingerprint(df: pd.DataFrame, data_key) -> str:
+    """
+    Identity of a frame for profile reuse: row count, column names/dtypes and data_key,
+    a caller-supplied identity of the contents (e.g. the source workbooks' cache keys).
+    The cells themselves are not hashed; hashing every cell costs more than profiling.
+    """
+    h = hashlib.sha1()
+    h.update(repr((len(df), [(str(c), str(t)) for c, t in df.dtypes.items()], str(data_key))).encode())
+    return h.hexdigest()[:16]
+
+def save_profile(profile: pd.DataFrame, path, fingerprint: str = None):
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as fh:
+        json.dump({"fingerprint": fingerprint, "columns": profile.reset_index().to_dict(orient="records")},
+                  fh, indent=2, default=str)
 
+def load_profile(path, fingerprint: str = None):
+    """Stored profile, or None when missing or saved for a different frame fingerprint."""
+    path = Path(path)
+    if not path.exists():
+        return None
+    with open(path) as fh:
+        data = json.load(fh)
+    if fingerprint is not None and data.get("fingerprint") != fingerprint:
+        return None
+    return pd.DataFrame(data["columns"], columns=PROFILE_COLUMNS).set_index("column")
 
+def drop_low_information_cols(df, threshold=0.98, profile_path=None, data_key=None, sample_size=10_000, n_jobs=None):
+    """
+    Drop columns whose most frequent value (missing included) covers at least threshold
+    of the rows. Decisions come from profile_columns, so clearly varied columns such as
+    addresses exit after a sample. With profile_path, the profile is written there; it
+    is reused only when the caller passes the data_key it was saved with (see
+    frame_fingerprint) and it is still conclusive for this threshold. Without data_key
+    the frame is always profiled afresh.
+    """
+    fingerprint = frame_fingerprint(df, data_key) if profile_path else None
+    reuse = profile_path is not None and data_key is not None
+    profile = load_profile(profile_path, fingerprint) if reuse else None
+    if profile is not None:
+        # sample-only entries are conclusive only for thresholds above their bound
+        stale = [c for c in df.columns if c not in profile.index or
+                 (not profile.at[c, "exact"] and profile.at[c, "top_freq_upper"] >= threshold)]
+        if stale:
+            fresh = profile_columns(df, threshold=threshold, sample_size=sample_size, n_jobs=n_jobs, columns=stale)
+            profile = pd.concat([profile.drop(index=[c for c in stale if c in profile.index]), fresh])
+            save_profile(profile, profile_path, fingerprint)
+    else:
+        profile = profile_columns(df, threshold=threshold, sample_size=sample_size, n_jobs=n_jobs)
+        if profile_path:
+            save_profile(profile, profile_path, fingerprint)
+    to_drop = [c for c in df.columns if profile.at[c, "exact"] and profile.at[c, "top_freq"] >= threshold]
+    return df.drop(columns=to_drop)
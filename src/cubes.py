@@ -0,0 +1,276 @@
+# src/cubes.py
+import joblib
+import numpy as np
+import pandas as pd
+from src.recommenders import top_k_indices
+
+CUBE_DIMS = ["AttractionId", "VisitYear", "VisitMonth", "VisitModeName", "UserContinent"]
+MEASURES = ["visits", "rating_sum", "rating_count"]
+ATTRACTION_COLS = ["Attraction", "AttractionType", "AttractionAddress", "AttractionCityName", "AttractionCountry"]
+# query keyword -> cube dimension
+FILTERS = {"attraction_id": "AttractionId", "year": "VisitYear", "month": "VisitMonth",
+           "visit_mode": "VisitModeName", "continent": "UserContinent"}
+
+def _partial_cube(df: pd.DataFrame) -> pd.DataFrame:
+    # visits / rating sum / rating count per observed (attraction, year, month, mode, continent)
+    rating = pd.to_numeric(df["Rating"], errors="coerce") if "Rating" in df.columns else pd.Series(np.nan, index=df.index)
+    keys = {d: df[d] if d in df.columns else pd.Series(np.nan, index=df.index) for d in CUBE_DIMS}
+    frame = pd.DataFrame({
+        **keys,
+        "visits": np.ones(len(df), dtype=np.int64),
+        "rating_sum": rating.fillna(0.0).to_numpy(dtype=np.float64),
+        "rating_count": rating.notna().to_numpy(dtype=np.int64),
+    }, index=df.index)
+    # observed=True: categorical dims (optimize_dtypes) group by the values present only
+    part = frame.groupby(CUBE_DIMS, dropna=False, sort=False, observed=True)[MEASURES].sum().reset_index()
+    for d in CUBE_DIMS:
+        if isinstance(part[d].dtype, pd.CategoricalDtype):
+            part[d] = part[d].astype(object)
+    return part
+
+class PopularityCubes:
+    """
+    Precomputed visit/rating cube over attraction x VisitYear x VisitMonth x VisitModeName
+    x UserContinent, plus an attraction metadata table keyed by AttractionId.
+
+    Like AggregateStore it keeps mergeable sums (visits, rating sum, rating count) in
+    arrays grown by doubling, with a dict from cell (tuple of per-dimension codes) to row,
+    so update() costs O(chunk): the chunk is grouped on its own and its cells are added
+    in place. finalize() rebuilds the query views once (sorted levels, codes, the cube
+    frame, attraction totals); queries and save() call it after updates. Queries never
+    touch the visit table: a query is a mask over the cube cells plus one np.bincount per
+    measure, and attraction_info() is an index lookup. Cost follows the number of
+    distinct cells, not the number of visits.
+    """
+
+    def __init__(self):
+        # per dimension: value -> code, values in code order (-1 codes a missing value)
+        self._dim_pos = {d: {} for d in CUBE_DIMS}
+        self._dim_values = {d: [] for d in CUBE_DIMS}
+        # cell -> row, (capacity x dims) codes and (capacity x measures) sums, rows in use
+        self._cell_pos = {}
+        self._cell_codes = np.zeros((0, len(CUBE_DIMS)), dtype=np.int64)
+        self._cell_values = np.zeros((0, len(MEASURES)))
+        self._n = 0
+        # AttractionId -> metadata row; the first one seen wins
+        self._meta = {}
+        self.finalize()
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame):
+        return cls().update(df)
+
+    def update(self, delta: pd.DataFrame):
+        if delta is None or delta.empty:
+            return self
+        self._add_cells(_partial_cube(delta))
+        if "AttractionId" in delta.columns:
+            cols = [c for c in ATTRACTION_COLS if c in delta.columns]
+            self._add_meta(delta.drop_duplicates("AttractionId")[["AttractionId"] + cols].dropna(subset=["AttractionId"]))
+        self._stale = True
+        return self
+
+    def _encode(self, dim, values):
+        # global codes for a column, appending values never seen before
+        local, uniques = pd.factorize(values, use_na_sentinel=True)
+        pos, known = self._dim_pos[dim], self._dim_values[dim]
+        codes = np.empty(len(uniques) + 1, dtype=np.int64)
+        for i, v in enumerate(pd.Index(uniques).tolist()):
+            code = pos.get(v)
+            if code is None:
+                code = pos[v] = len(known)
+                known.append(v)
+            codes[i] = code
+        codes[-1] = -1  # factorize's -1 (missing) picks the last slot
+        return codes[local]
+
+    def _add_cells(self, part):
+        codes = np.column_stack([self._encode(d, part[d]) for d in CUBE_DIMS]) if len(part) else \
+            np.zeros((0, len(CUBE_DIMS)), dtype=np.int64)
+        if self._cell_pos is None:
+            # dropped when pickled; rebuilt on the first update after loading
+            self._cell_pos = {k: i for i, k in enumerate(map(tuple, self._cell_codes[:self._n].tolist()))}
+        pos_of = self._cell_pos
+        keys = list(map(tuple, codes.tolist()))
+        rows = np.fromiter((pos_of.get(k, -1) for k in keys), dtype=np.int64, count=len(keys))
+        new = np.flatnonzero(rows < 0)
+        if len(new):
+            n, need = self._n, self._n + len(new)
+            if need > len(self._cell_values):
+                cap = max(need, 2 * len(self._cell_values), 1024)
+                grow = cap - len(self._cell_values)
+                self._cell_codes = np.vstack([self._cell_codes, np.zeros((grow, len(CUBE_DIMS)), dtype=np.int64)])
+                self._cell_values = np.vstack([self._cell_values, np.zeros((grow, len(MEASURES)))])
+            rows[new] = np.arange(n, need)
+            for i in new:
+                pos_of[keys[i]] = rows[i]
+            self._cell_codes[n:need] = codes[new]
+            self._n = need
+        # groupby cells are unique, so a fancy-indexed += is safe
+        self._cell_values[rows] += part[MEASURES].to_numpy(dtype=np.float64)
+
+    def _add_meta(self, meta):
+        ids = meta["AttractionId"]
+        cols = [meta[c].astype(object).tolist() if c in meta.columns else [np.nan] * len(meta) for c in ATTRACTION_COLS]
+        for i, a in enumerate(ids.tolist()):
+            if a not in self._meta:
+                self._meta[a] = tuple(col[i] for col in cols)
+
+    def finalize(self):
+        """
+        Rebuild the query views from the accumulated cells: levels sorted per dimension,
+        cells in dimension order, and attraction metadata with overall visits / avg rating.
+        Costs O(cells); called once after a run of update() calls (queries do it lazily).
+        """
+        n = self._n
+        codes = self._cell_codes[:n]
+        ranked = np.empty_like(codes)
+        self._levels = {}
+        for j, d in enumerate(CUBE_DIMS):
+            values = pd.Index(self._dim_values[d])
+            order = values.argsort()
+            rank = np.empty(len(values) + 1, dtype=np.int64)
+            rank[order] = np.arange(len(values))
+            rank[-1] = -1
+            ranked[:, j] = rank[codes[:, j]]
+            self._levels[d] = values.take(order)
+        # cells sorted by dimension, missing values last (as groupby(sort=True, dropna=False))
+        sort_keys = np.where(ranked < 0, np.iinfo(np.int64).max, ranked)
+        order = np.lexsort(sort_keys.T[::-1]) if n else np.zeros(0, dtype=np.int64)
+        self._codes = {d: ranked[order, j] for j, d in enumerate(CUBE_DIMS)}
+        values = self._cell_values[:n][order]
+        self._measures = {m: values[:, j] for j, m in enumerate(MEASURES)}
+        self._stale = False
+
+        cube = {}
+        for d in CUBE_DIMS:
+            lv, c = self._levels[d], self._codes[d]
+            cube[d] = lv.insert(len(lv), np.nan).take(np.where(c < 0, len(lv), c)) if (c < 0).any() else lv.take(c)
+        cube.update({m: self._measures[m].astype("int64" if m != "rating_sum" else "float64") for m in MEASURES})
+        self._cube = pd.DataFrame({k: np.asarray(v) for k, v in cube.items()})
+
+        attractions = pd.DataFrame.from_dict(self._meta, orient="index", columns=ATTRACTION_COLS)
+        totals = self.rollup("AttractionId").reindex(attractions.index)
+        self._attractions = attractions.assign(
+            visits=totals["visits"].fillna(0).astype("int64").to_numpy(), avg_rating=totals["avg_rating"].to_numpy()
+        ).rename_axis("AttractionId")
+        return self
+
+    def _ready(self):
+        if self._stale:
+            self.finalize()
+
+    @property
+    def cube(self) -> pd.DataFrame:
+        # one row per observed cell: the dimensions plus visits / rating_sum / rating_count
+        self._ready()
+        return self._cube
+
+    @property
+    def attractions(self) -> pd.DataFrame:
+        self._ready()
+        return self._attractions
+
+    def __getstate__(self):
+        self._ready()
+        state = self.__dict__.copy()
+        # the cell dict is the bulk of a pickle and only update() needs it
+        state["_cell_pos"] = None
+        return state
+
+    def __setstate__(self, state):
+        # cubes pickled before incremental updates held just the cube and attraction frames
+        if "cube" in state:
+            self.__init__()
+            self._add_cells(state["cube"])
+            meta = state["attractions"]
+            self._add_meta(meta.reset_index().rename(columns={meta.index.name or "index": "AttractionId"}))
+            self.finalize()
+        else:
+            self.__dict__.update(state)
+
+    def levels(self, dim):
+        # distinct non-null values of a dimension, e.g. for dashboard filter widgets
+        self._ready()
+        return self._levels[dim].tolist()
+
+    def _mask(self, filters):
+        mask = np.ones(self._n, dtype=bool)
+        for key, value in filters.items():
+            if value is None:
+                continue
+            if key not in FILTERS:
+                raise TypeError(f"unknown filter {key!r}; expected one of {sorted(FILTERS)}")
+            dim = FILTERS[key]
+            values = value if isinstance(value, (list, tuple, set, np.ndarray, pd.Index)) else [value]
+            pos = self._levels[dim].get_indexer(list(values))
+            # lookup table over codes; the extra last slot is where missing (-1) lands
+            allowed = np.zeros(len(self._levels[dim]) + 1, dtype=bool)
+            allowed[pos[pos >= 0]] = True
+            mask &= allowed[self._codes[dim]]
+        return mask
+
+    def rollup(self, by, **filters):
+        """
+        Visits and average rating grouped by one or more cube dimensions over the cells
+        matching the filters (attraction_id, year, month, visit_mode, continent; each a
+        value or a list). Returns a DataFrame indexed by the by-dimensions.
+        """
+        self._ready()
+        by = [by] if isinstance(by, str) else list(by)
+        mask = self._mask(filters)
+        codes = [self._codes[d][mask] for d in by]
+        sizes = [len(self._levels[d]) + 1 for d in by]  # +1: slot for missing (-1 -> last)
+        key = np.ravel_multi_index([np.where(c < 0, s - 1, c) for c, s in zip(codes, sizes)], sizes) if by else \
+            np.zeros(int(mask.sum()), dtype=np.int64)
+        n_keys = int(np.prod(sizes))
+        if n_keys <= max(1 << 20, 4 * len(key)):
+            # small key space (attractions, periods, segments): dense bincount, no sort
+            dense = {m: np.bincount(key, weights=self._measures[m][mask], minlength=n_keys) for m in MEASURES}
+            cells = np.flatnonzero(dense["visits"])
+            sums = {m: v[cells] for m, v in dense.items()}
+        else:
+            cells, inverse = np.unique(key, return_inverse=True)
+            sums = {m: np.bincount(inverse, weights=self._measures[m][mask], minlength=len(cells)) for m in MEASURES}
+        parts = np.unravel_index(cells, sizes)
+        labels = []
+        for d, p, s in zip(by, parts, sizes):
+            lv = self._levels[d]
+            labels.append((lv.insert(len(lv), np.nan) if (p == s - 1).any() else lv).take(p))
+        index = pd.MultiIndex.from_arrays(labels, names=by)
+        count = sums["rating_count"]
+        out = pd.DataFrame({
+            "visits": sums["visits"].astype(np.int64),
+            "avg_rating": np.divide(sums["rating_sum"], count, out=np.full(len(cells), np.nan), where=count > 0),
+        }, index=index if len(by) > 1 else index.get_level_values(0))
+        return out
+
+    def top_attractions(self, n=10, by="visits", min_visits=1, **filters):
+        """
+        The n attractions with the most visits (or best avg_rating, by="avg_rating",
+        among those with at least min_visits) in the filtered slice, with metadata.
+        """
+        stats = self.rollup("AttractionId", **filters)
+        stats = stats[stats["visits"] >= min_visits]
+        key = stats[by].to_numpy(dtype=np.float64)
+        top = top_k_indices(np.where(np.isnan(key), -np.inf, key), n)
+        stats = stats.iloc[top]
+        meta = self.attractions.reindex(stats.index)[ATTRACTION_COLS]
+        return pd.concat([stats, meta], axis=1).rename_axis("AttractionId").reset_index()
+
+    def trend(self, attraction_id=None, by=("VisitYear", "VisitMonth"), **filters):
+        # visits / avg rating per period for one attraction (or all), sorted by period;
+        # visits with a missing year/month (NA after basic_clean) have no period and are left out
+        out = self.rollup(list(by), attraction_id=attraction_id, **filters)
+        return out[out.index.to_frame(index=False).notna().all(axis=1).to_numpy()].sort_index()
+
+    def attraction_info(self, attraction_ids):
+        """Metadata and overall visits/avg_rating for the given ids, in order (NaN rows for unknown ids)."""
+        return self.attractions.reindex(pd.Index(attraction_ids)).rename_axis("AttractionId").reset_index()
+
+    def save(self, path):
+        joblib.dump(self, path)
+
+    @staticmethod
+    def load(path):
+        return joblib.load(path)
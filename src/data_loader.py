@@ -1,63 +1,232 @@
 # src/data_loader.py
 from pathlib import Path
 import pandas as pd
+import numpy as np
 import zipfile
 import tempfile
+import hashlib
+import argparse
 import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 
-def _load_excel_safe(path: Path):
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:  # cache is optional; fall back to plain Excel reads
+    pa = None
+    feather = None
+
+CACHE_DIRNAME = ".cache"
+
+RAW_FILES = [
+    "Transaction.xlsx", "User.xlsx", "Item.xlsx", "Updated_Item.xlsx", "Item_merged.xlsx",
+    "City.xlsx", "Country.xlsx", "Continent.xlsx", "Region.xlsx", "Type.xlsx", "Mode.xlsx",
+]
+
+def _cache_key(path: Path) -> str:
+    # source identity + mtime + size: any edit to the workbook invalidates its cache entry
+    st = path.stat()
+    raw = f"{path.resolve()}|{st.st_mtime_ns}|{st.st_size}".encode()
+    return hashlib.sha1(raw).hexdigest()[:16]
+
+def _cache_path(path: Path, cache_dir: Path) -> Path:
+    return cache_dir / f"{path.stem}-{_cache_key(path)}.arrow"
+
+def _write_cache(df: pd.DataFrame, path: Path, cache_dir: Path):
+    """
+    Store df as an uncompressed Arrow IPC file so later loads can memory-map it.
+    Stale entries for the same workbook are removed. Failures are non-fatal.
+    """
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        target = _cache_path(path, cache_dir)
+        tmp = target.with_suffix(".tmp")
+        feather.write_feather(df, tmp, compression="uncompressed")
+        os.replace(tmp, target)
+        for old in cache_dir.glob(f"{path.stem}-*.arrow"):
+            if old != target:
+                old.unlink(missing_ok=True)
+    except Exception:
+        # e.g. mixed-type object columns arrow cannot represent; just skip caching
+        pass
+
+def _read_cache(path: Path, cache_dir: Path):
+    target = _cache_path(path, cache_dir)
+    if not target.exists():
+        return None
+    try:
+        table = feather.read_table(target, memory_map=True)
+        return table.to_pandas()
+    except Exception:
+        return None
+
+def _iter_excel_chunks(path: Path, chunk_size: int = 100_000):
+    """
+    Stream the first sheet through openpyxl's read-only mode, chunk_size rows per DataFrame.
+    Rows are never held as a full list-of-lists the way pd.read_excel does, so peak memory
+    tracks one chunk. The first row is the header; fully empty rows are skipped.
+    """
+    from openpyxl import load_workbook
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = wb.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [f"Unnamed: {i}" if h is None else h for i, h in enumerate(header)]
+        n = len(columns)
+        batch = []
+        for row in rows:
+            if all(v is None for v in row):
+                continue
+            batch.append(row[:n] if len(row) >= n else row + (None,) * (n - len(row)))
+            if len(batch) >= chunk_size:
+                yield pd.DataFrame.from_records(batch, columns=columns)
+                batch = []
+        if batch:
+            yield pd.DataFrame.from_records(batch, columns=columns)
+    finally:
+        wb.close()
+
+def _read_excel(path: Path, streaming: bool = False):
+    if not streaming:
+        return pd.read_excel(path)
+    chunks = list(_iter_excel_chunks(path))
+    return pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame()
+
+def _load_excel_safe(path: Path, use_cache: bool = False, cache_dir: Path = None, streaming: bool = False):
     if path.exists():
+        cache_dir = Path(cache_dir) if cache_dir is not None else path.parent / CACHE_DIRNAME
+        use_cache = use_cache and feather is not None
+        if use_cache:
+            cached = _read_cache(path, cache_dir)
+            if cached is not None:
+                return cached
         try:
-            return pd.read_excel(path)
+            df = _read_excel(path, streaming)
         except Exception:
             return pd.DataFrame()
+        if use_cache:
+            _write_cache(df, path, cache_dir)
+        return df
     return pd.DataFrame()
 
-def merge_updated_item(data_dir: str = "data", write_merged: bool = True):
+def _parse_worker(path: Path, use_cache: bool, cache_dir: Path, streaming: bool):
+    # runs in a pool process; when the cache entry gets written the parent memory-maps it
+    # instead of receiving the whole frame pickled back
+    df = _load_excel_safe(path, use_cache=use_cache, cache_dir=cache_dir, streaming=streaming)
+    if use_cache and _cache_path(path, cache_dir).exists():
+        return None
+    return df
+
+def _load_many(paths, use_cache: bool, cache_dir: Path, n_jobs: int = None, streaming=()):
     """
-    Merge Item.xlsx and Updated_Item.xlsx. If the data_dir doesn't exist, create it.
-    If both source files are empty/missing, returns empty DataFrame and does not save.
-    The write_merged flag controls whether to attempt to save Item_merged.xlsx.
+    Load several workbooks, returning {file name: DataFrame}.
+    Cache hits are read in-process (memory-mapped); the remaining workbooks are parsed
+    concurrently on a process pool, largest first. n_jobs=None means one process per
+    CPU; n_jobs=1, or a pool that cannot be started, means plain sequential parsing.
+    The pool forks, so only single-threaded callers (train.py, the cache CLI) opt in.
     """
-    p = Path(data_dir)
-    orig = _load_excel_safe(p / "Item.xlsx")
-    updated = _load_excel_safe(p / "Updated_Item.xlsx")
+    use_cache = use_cache and feather is not None
+    out, todo = {}, []
+    for path in paths:
+        cached = _read_cache(path, cache_dir) if use_cache and path.exists() else None
+        if cached is not None or not path.exists():
+            out[path.name] = cached if cached is not None else pd.DataFrame()
+        else:
+            todo.append(path)
+    todo.sort(key=lambda f: f.stat().st_size, reverse=True)
+
+    workers = min(len(todo), n_jobs or os.cpu_count() or 1)
+    if workers > 1:
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [(path, pool.submit(_parse_worker, path, use_cache, cache_dir, path.name in streaming))
+                           for path in todo]
+                for path, fut in futures:
+                    df = fut.result()
+                    out[path.name] = df if df is not None else _read_cache(path, cache_dir)
+        except (OSError, BrokenProcessPool):
+            pass
+    for path in todo:
+        if out.get(path.name) is None:
+            out[path.name] = _load_excel_safe(path, use_cache=use_cache, cache_dir=cache_dir,
+                                              streaming=path.name in streaming)
+    return out
+
+def _merged_items_path(p: Path, cache_dir: Path) -> Path:
+    # keyed on both source workbooks, so editing either one rebuilds the merge
+    keys = "|".join(_cache_key(p / n) if (p / n).exists() else "-" for n in ("Item.xlsx", "Updated_Item.xlsx"))
+    return cache_dir / f"Item_merged-{hashlib.sha1(keys.encode()).hexdigest()[:16]}.arrow"
 
-    # If both empty, return empty DF
+def _merge_items(orig: pd.DataFrame, updated: pd.DataFrame):
+    # Updated_Item rows replace Item rows with the same AttractionId
     if (orig is None or orig.empty) and (updated is None or updated.empty):
         return pd.DataFrame()
-
     if updated is None or updated.empty:
-        merged = orig.copy()
-    else:
-        if "AttractionId" not in updated.columns:
-            raise ValueError("Updated_Item.xlsx must contain 'AttractionId' column")
-        updated = updated.drop_duplicates(subset=["AttractionId"], keep="last")
-        if not orig.empty and "AttractionId" in orig.columns:
-            orig_without_updated = orig[~orig["AttractionId"].isin(updated["AttractionId"])].copy()
-            merged = pd.concat([orig_without_updated, updated], ignore_index=True, sort=False)
-        else:
-            merged = updated.copy()
+        return orig.copy()
+    if "AttractionId" not in updated.columns:
+        raise ValueError("Updated_Item.xlsx must contain 'AttractionId' column")
+    updated = updated.drop_duplicates(subset=["AttractionId"], keep="last")
+    if not orig.empty and "AttractionId" in orig.columns:
+        orig_without_updated = orig[~orig["AttractionId"].isin(updated["AttractionId"])].copy()
+        return pd.concat([orig_without_updated, updated], ignore_index=True, sort=False)
+    return updated.copy()
 
-    if write_merged:
+def _merged_items(p: Path, cache_dir: Path, use_cache: bool = True, write: bool = True, orig=None, updated=None):
+    use_cache = use_cache and feather is not None
+    target = _merged_items_path(p, cache_dir) if use_cache else None
+    if target is not None and target.exists():
+        try:
+            return feather.read_table(target, memory_map=True).to_pandas()
+        except Exception:
+            pass
+    if orig is None:
+        orig = _load_excel_safe(p / "Item.xlsx", use_cache=use_cache, cache_dir=cache_dir)
+    if updated is None:
+        updated = _load_excel_safe(p / "Updated_Item.xlsx", use_cache=use_cache, cache_dir=cache_dir)
+    merged = _merge_items(orig, updated)
+    if target is not None and write and not merged.empty:
+        try:
+            cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp = target.with_suffix(".tmp")
+            feather.write_feather(merged, tmp, compression="uncompressed")
+            os.replace(tmp, target)
+            for old in cache_dir.glob("Item_merged-*.arrow"):
+                if old != target:
+                    old.unlink(missing_ok=True)
+        except Exception:
+            pass
+    return merged
+
+def merge_updated_item(data_dir: str = "data", write_merged: bool = True, cache_dir: str = None):
+    """
+    Merge Item.xlsx and Updated_Item.xlsx. If the data_dir doesn't exist, create it.
+    If both source files are empty/missing, returns empty DataFrame and does not save.
+    The write_merged flag controls whether the merged table is saved. It is stored as an
+    Arrow file in the cache dir (keyed on both sources) that load_raw memory-maps; without
+    pyarrow it falls back to writing Item_merged.xlsx.
+    """
+    p = Path(data_dir)
+    cache_dir = Path(cache_dir) if cache_dir else p / CACHE_DIRNAME
+    if feather is not None:
+        return _merged_items(p, cache_dir, write=write_merged)
+
+    merged = _merge_items(_load_excel_safe(p / "Item.xlsx"), _load_excel_safe(p / "Updated_Item.xlsx"))
+    if write_merged and not merged.empty:
         # Ensure directory exists, else attempt to save to a safe temp directory
         try:
             p.mkdir(parents=True, exist_ok=True)
-            merged_path = p / "Item_merged.xlsx"
-            merged.to_excel(merged_path, index=False)
-            # return merged and path optionally
-            return merged
-        except Exception as e:
+            merged.to_excel(p / "Item_merged.xlsx", index=False)
+        except Exception:
             # fallback: try to save in the system temporary directory
             try:
-                tmp_path = Path(tempfile.gettempdir()) / "Item_merged.xlsx"
-                merged.to_excel(tmp_path, index=False)
-                return merged
+                merged.to_excel(Path(tempfile.gettempdir()) / "Item_merged.xlsx", index=False)
             except Exception:
                 # final fallback: do not save, just return merged DF
-                return merged
-    else:
-        return merged
+                pass
+    return merged
 
 def unzip_additional_zip(data_dir: str = "data", zip_name: str = None):
     p = Path(data_dir)
@@ -74,49 +243,238 @@ def unzip_additional_zip(data_dir: str = "data", zip_name: str = None):
         z.extractall(p)
     return [f.name for f in p.iterdir() if f.is_file()]
 
-def load_raw(data_dir: str = "data"):
+def _legacy_merged_current(p: Path) -> bool:
+    # Item_merged.xlsx (written by merge_updated_item without pyarrow, or left by older runs)
+    # only stands in for the sources while it is newer than both of them
+    merged = p / "Item_merged.xlsx"
+    if not merged.exists():
+        return False
+    mtime = merged.stat().st_mtime_ns
+    return all(not (p / n).exists() or (p / n).stat().st_mtime_ns <= mtime for n in ("Item.xlsx", "Updated_Item.xlsx"))
+
+LOOKUP_FILES = ["City.xlsx", "Country.xlsx", "Continent.xlsx", "Region.xlsx", "Type.xlsx", "Mode.xlsx"]
+
+def load_raw(data_dir: str = "data", use_cache: bool = True, cache_dir: str = None, include_tx: bool = True,
+             n_jobs: int = 1, stream_tx: bool = False):
+    """
+    Load all source workbooks into a dict of DataFrames.
+    With use_cache, each workbook is parsed once and stored as an Arrow IPC file under
+    <data_dir>/.cache (or cache_dir); later loads memory-map that file instead of going
+    through openpyxl. Entries are keyed on the workbook's path, mtime and size.
+    Workbooks without a cache entry are parsed sequentially by default; n_jobs > 1 (or
+    None for one per CPU) parses them on that many forked processes, meant for
+    single-threaded scripts like train.py, not app.py's threaded server. stream_tx reads
+    Transaction.xlsx through openpyxl's read-only mode in chunks, which lowers the
+    parse's peak memory.
+    Items are Item.xlsx updated by Updated_Item.xlsx (see merge_updated_item). An
+    Item_merged.xlsx in data_dir is used as is only while it is newer than both sources.
+    include_tx=False leaves "tx" empty, for callers that stream it with iter_transactions.
+    """
     p = Path(data_dir)
+    cache_dir = Path(cache_dir) if cache_dir else p / CACHE_DIRNAME
+
     # If no data dir on server, don't fail; create it (safer) but don't assume files exist.
     if not p.exists():
-        # create directory so code that tries to save merged file won't fail
         try:
             p.mkdir(parents=True, exist_ok=True)
         except Exception:
-            # if cannot create (rare), proceed anyway — merge_updated_item will handle fallback
             pass
 
-    # Make sure merged item is present or attempt to create it (no crash)
-    merged_item_path = p / "Item_merged.xlsx"
-    if not merged_item_path.exists():
-        _ = merge_updated_item(data_dir, write_merged=True)
+    legacy_merged = _legacy_merged_current(p)
+    names = (["Transaction.xlsx"] if include_tx else []) + ["User.xlsx"]
+    names += ["Item_merged.xlsx"] if legacy_merged else ["Item.xlsx", "Updated_Item.xlsx"]
+    names += LOOKUP_FILES
+    frames = _load_many([p / n for n in names], use_cache, cache_dir, n_jobs=n_jobs,
+                        streaming={"Transaction.xlsx"} if stream_tx else ())
 
-    tx = _load_excel_safe(p / "Transaction.xlsx")
-    users = _load_excel_safe(p / "User.xlsx")
-    items = _load_excel_safe(merged_item_path) if merged_item_path.exists() else _load_excel_safe(p / "Item_merged.xlsx")
+    if legacy_merged:
+        items = frames["Item_merged.xlsx"]
+    else:
+        items = _merged_items(p, cache_dir, use_cache=use_cache,
+                              orig=frames["Item.xlsx"], updated=frames["Updated_Item.xlsx"])
     # if still empty, fall back to raw files (if any)
-    if (items is None or items.empty):
-        items = _load_excel_safe(p / "Updated_Item.xlsx")
-        if items is None or items.empty:
-            items = _load_excel_safe(p / "Item.xlsx")
-
-    city = _load_excel_safe(p / "City.xlsx")
-    country = _load_excel_safe(p / "Country.xlsx")
-    continent = _load_excel_safe(p / "Continent.xlsx")
-    region = _load_excel_safe(p / "Region.xlsx")
-    atype = _load_excel_safe(p / "Type.xlsx")
-    mode = _load_excel_safe(p / "Mode.xlsx")
+    if items is None or items.empty:
+        for name in ("Updated_Item.xlsx", "Item.xlsx"):
+            items = frames.get(name)
+            if items is None:
+                items = _load_excel_safe(p / name, use_cache=use_cache, cache_dir=cache_dir)
+            if not items.empty:
+                break
 
     return {
-        "tx": tx, "users": users, "items": items, "city": city,
-        "country": country, "continent": continent, "region": region,
-        "type": atype, "mode": mode
+        "tx": frames.get("Transaction.xlsx", pd.DataFrame()), "users": frames["User.xlsx"], "items": items,
+        "city": frames["City.xlsx"], "country": frames["Country.xlsx"], "continent": frames["Continent.xlsx"],
+        "region": frames["Region.xlsx"], "type": frames["Type.xlsx"], "mode": frames["Mode.xlsx"]
     }
 
+def _iter_and_cache(path: Path, cache_dir: Path, chunk_size: int):
+    """
+    Yield the workbook's openpyxl chunks as they are parsed, appending each one to the
+    Arrow IPC cache file, so a cold cache costs one chunk of memory rather than the table.
+    The first chunk fixes the schema; later chunks are cast to it (an int column that
+    turns up NaN becomes nullable). If a chunk does not fit, caching is dropped for this
+    run and the remaining chunks are still yielded. The entry only appears once complete.
+    """
+    target = _cache_path(path, cache_dir)
+    tmp = target.with_suffix(".tmp")
+    writer, schema, caching = None, None, True
+    try:
+        for chunk in _iter_excel_chunks(path, chunk_size):
+            if caching:
+                try:
+                    table = pa.Table.from_pandas(chunk, preserve_index=False)
+                    if writer is None:
+                        cache_dir.mkdir(parents=True, exist_ok=True)
+                        schema = table.schema
+                        writer = pa.ipc.new_file(str(tmp), schema)
+                    elif table.schema.equals(schema):
+                        table = table.replace_schema_metadata(schema.metadata)
+                    else:
+                        arrays = [pa.array(chunk[f.name], from_pandas=True).cast(f.type) for f in schema]
+                        table = pa.Table.from_arrays(arrays, schema=schema)
+                    writer.write_table(table)
+                except Exception:
+                    caching = False
+            yield chunk
+        if writer is not None and caching:
+            writer.close()
+            writer = None
+            os.replace(tmp, target)
+            for old in cache_dir.glob(f"{path.stem}-*.arrow"):
+                if old != target:
+                    old.unlink(missing_ok=True)
+    finally:
+        if writer is not None:
+            writer.close()
+        tmp.unlink(missing_ok=True)
+
+def iter_transactions(data_dir: str = "data", chunk_size: int = 500_000, cache_dir: str = None):
+    """
+    Yield Transaction.xlsx as DataFrames of at most chunk_size rows.
+    Chunks are sliced from the memory-mapped Arrow cache, so only the current chunk is
+    materialized. On a cold cache the workbook is streamed through openpyxl's read-only
+    mode and the cache is written chunk by chunk on the way (see _iter_and_cache); without
+    pyarrow it is just streamed.
+    """
+    p = Path(data_dir)
+    path = p / "Transaction.xlsx"
+    cache_dir = Path(cache_dir) if cache_dir else p / CACHE_DIRNAME
+    if not path.exists():
+        return
+    if feather is None:
+        yield from _iter_excel_chunks(path, chunk_size)
+        return
+    target = _cache_path(path, cache_dir)
+    if not target.exists():
+        yield from _iter_and_cache(path, cache_dir, chunk_size)
+        return
+    table = feather.read_table(target, memory_map=True)
+    for batch in table.to_batches(max_chunksize=chunk_size):
+        yield batch.to_pandas()
+
+class ChunkedParquetWriter:
+    """
+    Append DataFrame chunks to one Parquet file, one row group per chunk.
+
+    The schema is fixed by the first chunk, with relaxations so later chunks still fit:
+    object columns, the given string_cols and columns that are entirely null in the
+    first chunk (an unmatched lookup, which pandas leaves as float64 NaN) are written
+    as strings, and plain int64 columns as float64 (an unmatched join in a later chunk
+    turns them into NaN-carrying floats).
+    """
+
+    def __init__(self, path, string_cols=()):
+        import pyarrow.parquet as pq
+        self._pq = pq
+        self.path = str(path)
+        self.string_cols = set(string_cols)
+        self.schema = None
+        self.writer = None
+        self.rows = 0
+
+    def _normalize(self, df):
+        str_cols = [c for c in df.columns if df[c].dtype == object or c in self.string_cols]
+        if str_cols:
+            df = df.astype({c: "string" for c in str_cols})
+        return df
+
+    def write(self, df: pd.DataFrame):
+        if self.writer is None:
+            self.string_cols |= {c for c in df.columns if df[c].isna().all()}
+        table = pa.Table.from_pandas(self._normalize(df), preserve_index=False)
+        if self.writer is None:
+            fields = [pa.field(f.name, pa.float64()) if pa.types.is_integer(f.type) and
+                      df[f.name].dtype.kind in "iu" else f for f in table.schema]
+            self.schema = pa.schema(fields, metadata=table.schema.metadata)
+            self.writer = self._pq.ParquetWriter(self.path, self.schema)
+        self.writer.write_table(table.select(self.schema.names).cast(self.schema))
+        self.rows += len(df)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def build_cache(data_dir: str = "data", cache_dir: str = None, n_jobs: int = None, stream_tx: bool = False):
+    """
+    Prebuild the columnar cache for every workbook present in data_dir, parsing them in
+    parallel, plus the merged item table.
+    Returns the list of workbook names that now have a valid cache entry.
+    """
+    if feather is None:
+        raise RuntimeError("pyarrow is required to build the cache")
+    p = Path(data_dir)
+    cache_dir = Path(cache_dir) if cache_dir else p / CACHE_DIRNAME
+    paths = [p / name for name in RAW_FILES if (p / name).exists()]
+    _load_many(paths, True, cache_dir, n_jobs=n_jobs, streaming={"Transaction.xlsx"} if stream_tx else ())
+    _merged_items(p, cache_dir)
+    return [path.name for path in paths if _cache_path(path, cache_dir).exists()]
+
+def _key_positions(keys, table: pd.DataFrame, key_col: str, keep: str = "last"):
+    """
+    Row position in table of each value in keys, -1 where absent.
+    keep="last" mirrors a dict(zip(...)) lookup; keep="first" is used for row joins.
+    """
+    tkeys = table[key_col]
+    rows = np.flatnonzero(~tkeys.duplicated(keep=keep).to_numpy())
+    keys = np.asarray(keys)
+    pos = pd.Index(tkeys.to_numpy()[rows]).get_indexer(keys)
+    pos = np.where(pos >= 0, rows[np.maximum(pos, 0)], -1)
+    pos[pd.isna(keys)] = -1
+    return pos
+
+def _take(values, pos):
+    # gather with NaN fill for -1; only upcasts when something is actually missing
+    return pd.api.extensions.take(values, pos, allow_fill=True)
+
+def _lookup(keys, table: pd.DataFrame, key_col: str, val_col: str):
+    # array-indexed replacement for keys.map(dict(zip(table[key_col], table[val_col])))
+    if table.empty or key_col not in table.columns or val_col not in table.columns:
+        return np.full(len(keys), np.nan)
+    return _take(table[val_col].array, _key_positions(keys, table, key_col))
+
+def _append_columns(left: list, right: list):
+    # concatenate (name, values) lists, suffixing clashes the way DataFrame.merge does
+    overlap = {n for n, _ in left} & {n for n, _ in right}
+    return ([(f"{n}_x" if n in overlap else n, v) for n, v in left] +
+            [(f"{n}_y" if n in overlap else n, v) for n, v in right])
+
 def build_consolidated(dfs: dict):
     """
     Join transaction + user + item tables into consolidated visit-level DataFrame.
     This function expects dfs is the dict returned by load_raw(). It is defensive:
     if required tables are missing, it returns an empty DataFrame.
+
+    Lookups and joins are resolved as integer row positions (Index.get_indexer) and
+    every output column is gathered once, already filtered to valid rows, so no
+    intermediate merged frames are built. Input frames are not modified. Users and
+    items are joined on their first row per id.
     """
     tx = dfs.get("tx", pd.DataFrame())
     users = dfs.get("users", pd.DataFrame())
@@ -132,44 +490,79 @@ def build_consolidated(dfs: dict):
         # Nothing to build
         return pd.DataFrame()
 
-    # mapping dicts (defensive)
-    city_name = dict(zip(city["CityId"], city["CityName"])) if not city.empty and "CityId" in city.columns and "CityName" in city.columns else {}
-    country_name = dict(zip(country["CountryId"], country["Country"])) if not country.empty and "CountryId" in country.columns and "Country" in country.columns else {}
-    region_name = dict(zip(region["RegionId"], region["Region"])) if not region.empty and "RegionId" in region.columns and "Region" in region.columns else {}
-    continent_name = dict(zip(continent["ContinentId"], continent["Continent"])) if not continent.empty and "ContinentId" in continent.columns and "Continent" in continent.columns else {}
-    atype_map = dict(zip(atype["AttractionTypeId"], atype["AttractionType"])) if not atype.empty and "AttractionTypeId" in atype.columns else {}
-    mode_map = dict(zip(mode["VisitModeId"], mode["VisitMode"])) if not mode.empty and "VisitModeId" in mode.columns else {}
-    city_to_country = dict(zip(city["CityId"], city["CountryId"])) if not city.empty and "CityId" in city.columns and "CountryId" in city.columns else {}
-
-    # users mapping
-    if not users.empty:
+    # rows kept in the output: decided on tx alone, before anything is gathered
+    rating = None
+    rows = None
+    index = None
+    if "Rating" in tx.columns:
+        rating = pd.to_numeric(tx["Rating"], errors="coerce")
+        valid = (tx["UserId"].notna() & tx["AttractionId"].notna() & rating.notna()).to_numpy()
+        if valid.all():
+            rating = rating.to_numpy()
+        else:
+            rows = np.flatnonzero(valid)
+            index = pd.Index(rows)
+            rating = rating.to_numpy()[rows]
+
+    def _rows(values):
+        return values if rows is None else _take(values, rows)
+
+    # transaction columns
+    tx_cols = []
+    for c in tx.columns:
+        tx_cols.append((c, rating if c == "Rating" and rating is not None else _rows(tx[c].array)))
+    if "VisitMode" in tx.columns:
+        mode_names = _rows(_lookup(tx["VisitMode"].to_numpy(), mode, "VisitModeId", "VisitMode"))
+        tx_cols = [(n, v) for n, v in tx_cols if n != "VisitModeName"] + [("VisitModeName", mode_names)]
+
+    # users: derived name columns computed on the (small) user table, then gathered per visit
+    user_cols = []
+    if not users.empty and "UserId" in users.columns:
+        derived = []
         if "CityId" in users.columns:
-            users["UserCityName"] = users["CityId"].map(city_name)
+            derived.append(("UserCityName", _lookup(users["CityId"].to_numpy(), city, "CityId", "CityName")))
         if "CountryId" in users.columns:
-            users["UserCountry"] = users["CountryId"].map(country_name)
+            derived.append(("UserCountry", _lookup(users["CountryId"].to_numpy(), country, "CountryId", "Country")))
         if "RegionId" in users.columns:
-            users["UserRegion"] = users["RegionId"].map(region_name)
+            derived.append(("UserRegion", _lookup(users["RegionId"].to_numpy(), region, "RegionId", "Region")))
         if "ContinentId" in users.columns:
-            users["UserContinent"] = users["ContinentId"].map(continent_name)
+            derived.append(("UserContinent", _lookup(users["ContinentId"].to_numpy(), continent, "ContinentId", "Continent")))
+        names = {n for n, _ in derived}
+        pos = _rows(_key_positions(tx["UserId"].to_numpy(), users, "UserId", keep="first"))
+        user_cols = [(c, _take(users[c].array, pos)) for c in users.columns if c != "UserId" and c not in names]
+        user_cols += [(n, _take(v, pos)) for n, v in derived]
 
-    # items mapping
-    if not items.empty:
+    # items: same pattern
+    item_cols = []
+    if not items.empty and "AttractionId" in items.columns:
+        derived = []
         if "AttractionCityId" in items.columns:
-            items["AttractionCityName"] = items["AttractionCityId"].map(city_name)
-            items["AttractionCountryId"] = items["AttractionCityId"].map(city_to_country)
-            items["AttractionCountry"] = items["AttractionCountryId"].map(country_name)
+            city_ids = items["AttractionCityId"].to_numpy()
+            country_ids = _lookup(city_ids, city, "CityId", "CountryId")
+            derived.append(("AttractionCityName", _lookup(city_ids, city, "CityId", "CityName")))
+            derived.append(("AttractionCountryId", country_ids))
+            derived.append(("AttractionCountry", _lookup(np.asarray(country_ids), country, "CountryId", "Country")))
         if "AttractionTypeId" in items.columns:
-            items["AttractionType"] = items["AttractionTypeId"].map(atype_map)
-
-    if "VisitMode" in tx.columns:
-        tx["VisitModeName"] = tx["VisitMode"].map(mode_map)
+            derived.append(("AttractionType", _lookup(items["AttractionTypeId"].to_numpy(), atype, "AttractionTypeId", "AttractionType")))
+        names = {n for n, _ in derived}
+        pos = _rows(_key_positions(tx["AttractionId"].to_numpy(), items, "AttractionId", keep="first"))
+        item_cols = [(c, _take(items[c].array, pos)) for c in items.columns if c != "AttractionId" and c not in names]
+        item_cols += [(n, _take(v, pos)) for n, v in derived]
 
-    df = tx.merge(users, on="UserId", how="left")
-    df = df.merge(items, on="AttractionId", how="left")
+    cols = _append_columns(_append_columns(tx_cols, user_cols), item_cols)
+    # copy=False keeps each gathered column as its own block instead of consolidating (a second copy)
+    df = pd.DataFrame(dict(cols), index=index, copy=False)
+    return df
 
-    if "Rating" in df.columns:
-        df = df.dropna(subset=["UserId", "AttractionId", "Rating"])
-        df["Rating"] = pd.to_numeric(df["Rating"], errors="coerce")
-        df = df.dropna(subset=["Rating"])
+def main():
+    parser = argparse.ArgumentParser(description="Prebuild the columnar cache for the raw workbooks.")
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--cache-dir", default=None)
+    parser.add_argument("--jobs", type=int, default=None, help="parser processes (default: one per CPU)")
+    parser.add_argument("--stream-tx", action="store_true", help="read Transaction.xlsx in read-only streaming mode")
+    args = parser.parse_args()
+    built = build_cache(args.data_dir, args.cache_dir, n_jobs=args.jobs, stream_tx=args.stream_tx)
+    print(f"Cached {len(built)} workbook(s):", ", ".join(built) if built else "-")
 
-    return df
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,288 @@
 # src/eval.py
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
+import pandas as pd
 from sklearn.metrics import mean_squared_error
+from src.recommenders import SVDRecommender, ItemSimilarityIndex, sparse_user_item_matrix
 
 def rmse(y_true, y_pred):
     return mean_squared_error(y_true, y_pred, squared=False)
 
 def precision_at_k(recommended, actual, k=10):
+    # single-list version; evaluate_recommenders scores all users at once
+    actual = set(actual)
     recommended_k = recommended[:k]
     hits = sum([1 for r in recommended_k if r in actual])
     return hits / k
+
+def temporal_split(df: pd.DataFrame, test_fraction: float = 0.2):
+    """
+    Split visits in time: the latest VisitYear/VisitMonth periods holding about
+    test_fraction of the rows are held out. Rows without a period are dropped.
+    Returns (train, test).
+    """
+    period = pd.to_numeric(df["VisitYear"], errors="coerce") * 12 + pd.to_numeric(df["VisitMonth"], errors="coerce") - 1
+    known = period.notna().to_numpy()
+    values = period.to_numpy(dtype=np.float64)[known]
+    if values.size == 0:
+        raise ValueError("no rows with VisitYear/VisitMonth to split on")
+    cutoff = np.quantile(values, 1.0 - test_fraction, method="higher")
+    is_test = period.to_numpy(dtype=np.float64) >= cutoff
+    train, test = df[known & ~is_test], df[known & is_test]
+    if train.empty:
+        raise ValueError("temporal split left no training rows; lower test_fraction or add periods")
+    return train, test
+
+def ranking_metrics(hits: np.ndarray, n_relevant: np.ndarray):
+    """
+    Per-user precision@k, recall@k, NDCG@k and AP@k from a (users x k) boolean hit
+    matrix (hits[u, r] = the item ranked r+1 for user u is relevant) and each user's
+    number of relevant items. Returns a dict of arrays, one value per user.
+    """
+    hits = np.asarray(hits, dtype=bool)
+    n_users, k = hits.shape
+    n_relevant = np.asarray(n_relevant, dtype=np.float64)
+    n_hits = hits.sum(axis=1)
+    discount = 1.0 / np.log2(np.arange(k) + 2)
+    ideal = np.cumsum(discount)
+    capped = np.minimum(n_relevant, k).astype(np.int64)
+    idcg = np.where(capped > 0, ideal[np.maximum(capped - 1, 0)], 1.0)
+    precision_at_rank = np.cumsum(hits, axis=1) / np.arange(1, k + 1)
+    safe = np.maximum(n_relevant, 1)
+    return {
+        "precision": n_hits / k,
+        "recall": n_hits / safe,
+        "ndcg": (hits * discount).sum(axis=1) / idcg,
+        "map": (precision_at_rank * hits).sum(axis=1) / np.maximum(capped, 1),
+    }
+
+class _SVDTopK:
+    # top-k item positions (in the evaluation's item universe) from a fitted SVDRecommender
+    def __init__(self, recommender, items):
+        self.recommender = recommender
+        self.items = items
+
+    def __call__(self, user_ids, k):
+        top = np.full((len(user_ids), k), -1, dtype=np.int64)
+        row_of = pd.Index(user_ids)
+        for chunk in self.recommender.recommend_batch(user_ids, top_k=k, exclude_seen=True, chunk_size=len(user_ids)):
+            rows = row_of.get_indexer(chunk["UserId"].to_numpy())
+            top[rows, chunk["Rank"].to_numpy() - 1] = self.items.get_indexer(chunk["AttractionId"].to_numpy())
+        return top
+
+class _ContentTopK:
+    """
+    Content-KNN for users: a user's profile is the normalized sum of the feature vectors
+    of the attractions they visited in training; candidates are ranked by cosine to it.
+    """
+
+    def __init__(self, index, history, user_ids, item_ids, items):
+        self.index = index
+        self.items = items
+        self.history = (history != 0).astype(np.float64).tocsr()
+        self.user_rows = pd.Index(user_ids)
+        # history column -> index row (-1 when the attraction has no feature vector)
+        self.col_to_vec = pd.Index(index.item_ids).get_indexer(item_ids)
+        vecs = np.zeros((len(item_ids), index.vectors.shape[1]))
+        has = self.col_to_vec >= 0
+        vecs[has] = index.vectors[self.col_to_vec[has]]
+        self.history_vectors = vecs
+        self.index_to_universe = items.get_indexer(index.item_ids)
+
+    def __call__(self, user_ids, k):
+        H = self.history[self.user_rows.get_indexer(user_ids)]
+        profile = np.asarray(H @ self.history_vectors)
+        norms = np.linalg.norm(profile, axis=1, keepdims=True)
+        scores = (profile / np.where(norms == 0, 1.0, norms)) @ self.index.vectors.T
+        r, c = H.nonzero()
+        c = self.col_to_vec[c]
+        scores[r[c >= 0], c[c >= 0]] = -np.inf
+        k = min(k, scores.shape[1])
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind="stable")
+        top = np.take_along_axis(top, order, axis=1)
+        out = np.where(np.isfinite(np.take_along_axis(top_scores, order, axis=1)), self.index_to_universe[top], -1)
+        return out
+
+_WORKER = {}
+
+def _init_worker(scorer, rel_keys, n_items, k):
+    _WORKER.update(scorer=scorer, rel_keys=rel_keys, n_items=n_items, k=k)
+
+def _eval_chunk(args):
+    """Top-k and hit matrix for one chunk of users; runs in a worker process."""
+    user_ids, user_pos = args
+    w = _WORKER
+    top = w["scorer"](user_ids, w["k"])
+    if top.shape[1] < w["k"]:
+        top = np.hstack([top, np.full((len(top), w["k"] - top.shape[1]), -1)])
+    keys = user_pos[:, None] * w["n_items"] + top
+    rel = w["rel_keys"]
+    at = np.minimum(np.searchsorted(rel, keys), max(len(rel) - 1, 0))
+    hits = (top >= 0) & (rel[at] == keys) if len(rel) else np.zeros(top.shape, dtype=bool)
+    return hits, np.unique(top[top >= 0])
+
+def _run(scorer, eval_users, rel_keys, n_items, k, n_jobs, chunk_size):
+    chunks = [(eval_users[s:s + chunk_size], np.arange(s, min(s + chunk_size, len(eval_users))))
+              for s in range(0, len(eval_users), chunk_size)]
+    workers = min(len(chunks), n_jobs or os.cpu_count() or 1)
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(scorer, rel_keys, n_items, k)) as pool:
+            results = list(pool.map(_eval_chunk, chunks))
+    else:
+        _init_worker(scorer, rel_keys, n_items, k)
+        results = [_eval_chunk(c) for c in chunks]
+    hits = np.vstack([h for h, _ in results]) if results else np.zeros((0, k), dtype=bool)
+    covered = np.unique(np.concatenate([c for _, c in results])) if results else np.array([])
+    return hits, covered
+
+def default_item_features(df: pd.DataFrame, cols=("AttractionType", "AttractionCountry", "AttractionCityName")):
+    # one row per attraction, one-hot encoded descriptive columns for ItemSimilarityIndex
+    cols = [c for c in cols if c in df.columns]
+    items = df.drop_duplicates("AttractionId")[["AttractionId"] + cols]
+    dummies = pd.get_dummies(items[cols].astype(str), dtype=np.float64)
+    return pd.concat([items[["AttractionId"]].reset_index(drop=True), dummies.reset_index(drop=True)], axis=1)
+
+def evaluate_recommenders(df: pd.DataFrame, k: int = 10, test_fraction: float = 0.2, min_rating=None,
+                          n_components: int = 50, item_features: pd.DataFrame = None,
+                          n_jobs: int = None, chunk_size: int = 2048):
+    """
+    Offline top-k comparison of the SVD and content-KNN recommenders.
+
+    Both are fitted on a temporal_split training set and asked for top-k unseen
+    attractions for every held-out user that also appears in training (cold users are
+    counted but not scored). Relevant items are the user's held-out attractions (with
+    Rating >= min_rating if given). Users are scored in chunks of chunk_size on a process
+    pool; hits are found with one sorted-key search per chunk and the metrics are
+    computed on the hit matrix with array operations.
+
+    Returns a report DataFrame with one row per model: users, cold_users,
+    precision@k, recall@k, ndcg@k, map@k, catalog coverage and wall time.
+    """
+    train, test = temporal_split(df, test_fraction)
+    if min_rating is not None:
+        test = test[pd.to_numeric(test["Rating"], errors="coerce") >= min_rating]
+    test = test[test["UserId"].notna() & test["AttractionId"].notna()]
+
+    items = pd.Index(pd.unique(df["AttractionId"].dropna().to_numpy()))
+    history, train_users, train_items = sparse_user_item_matrix(train)
+    test_users = pd.unique(test["UserId"].to_numpy())
+    known = pd.Index(train_users).get_indexer(test_users) >= 0
+    eval_users = np.asarray(test_users[known])
+
+    # relevant (user position, item position) pairs as sorted flat keys
+    user_pos = pd.Index(eval_users).get_indexer(test["UserId"].to_numpy())
+    item_pos = items.get_indexer(test["AttractionId"].to_numpy())
+    ok = user_pos >= 0
+    rel_keys = np.unique(user_pos[ok].astype(np.int64) * len(items) + item_pos[ok])
+    n_relevant = np.bincount(rel_keys // len(items), minlength=len(eval_users))
+
+    if item_features is None:
+        item_features = default_item_features(df)
+    feature_cols = [c for c in item_features.columns if c != "AttractionId"]
+    models = {
+        "svd": lambda: _SVDTopK(SVDRecommender(n_components=n_components).fit(train), items),
+        "content_knn": lambda: _ContentTopK(ItemSimilarityIndex(feature_cols).fit(item_features),
+                                            history, train_users, train_items, items),
+    }
+    rows = []
+    for name, build in models.items():
+        t0 = time.perf_counter()
+        scorer = build()
+        hits, covered = _run(scorer, eval_users, rel_keys, len(items), k, n_jobs, chunk_size)
+        metrics = ranking_metrics(hits, n_relevant)
+        rows.append({
+            "model": name, "k": k, "users": len(eval_users), "cold_users": int((~known).sum()),
+            **{f"{m}@{k}": float(v.mean()) if len(v) else float("nan") for m, v in metrics.items()},
+            "coverage": len(covered) / max(len(items), 1),
+            "wall_s": time.perf_counter() - t0,
+        })
+    return pd.DataFrame(rows)
+
+def evaluate_incremental(df: pd.DataFrame, k: int = 10, test_fraction: float = 0.2, update_fraction: float = 0.1,
+                         min_rating=None, n_components: int = 50, sweeps: int = 0,
+                         n_jobs: int = None, chunk_size: int = 2048):
+    """
+    Drift check for SVDRecommender.update(): the temporal training set is split again
+    in time, a model fitted on the older part has the newest update_fraction folded in,
+    and it is scored on the held-out users next to a full refit on the whole training
+    set. Returns the same report as evaluate_recommenders for both models plus a
+    "drift" row (incremental minus full for every metric; wall_s compares update vs fit).
+    """
+    train, test = temporal_split(df, test_fraction)
+    base, delta = temporal_split(train, update_fraction)
+    if min_rating is not None:
+        test = test[pd.to_numeric(test["Rating"], errors="coerce") >= min_rating]
+    test = test[test["UserId"].notna() & test["AttractionId"].notna()]
+
+    items = pd.Index(pd.unique(df["AttractionId"].dropna().to_numpy()))
+    train_users = pd.unique(train["UserId"].dropna().to_numpy())
+    test_users = pd.unique(test["UserId"].to_numpy())
+    known = pd.Index(train_users).get_indexer(test_users) >= 0
+    eval_users = np.asarray(test_users[known])
+    user_pos = pd.Index(eval_users).get_indexer(test["UserId"].to_numpy())
+    item_pos = items.get_indexer(test["AttractionId"].to_numpy())
+    ok = user_pos >= 0
+    rel_keys = np.unique(user_pos[ok].astype(np.int64) * len(items) + item_pos[ok])
+    n_relevant = np.bincount(rel_keys // len(items), minlength=len(eval_users))
+
+    base_model = SVDRecommender(n_components=n_components).fit(base)
+    models = {
+        "svd_full": lambda: SVDRecommender(n_components=n_components).fit(train),
+        "svd_incremental": lambda: base_model.update(delta, sweeps=sweeps),
+    }
+    rows = []
+    for name, build in models.items():
+        t0 = time.perf_counter()
+        model = build()
+        built = time.perf_counter() - t0
+        hits, covered = _run(_SVDTopK(model, items), eval_users, rel_keys, len(items), k, n_jobs, chunk_size)
+        metrics = ranking_metrics(hits, n_relevant)
+        rows.append({
+            "model": name, "k": k, "users": len(eval_users), "cold_users": int((~known).sum()),
+            **{f"{m}@{k}": float(v.mean()) if len(v) else float("nan") for m, v in metrics.items()},
+            "coverage": len(covered) / max(len(items), 1),
+            "wall_s": built,
+        })
+    report = pd.DataFrame(rows)
+    cols = [c for c in report.columns if c not in ("model", "k", "users", "cold_users")]
+    drift = report.loc[1, cols] - report.loc[0, cols]
+    drift_row = {"model": "drift", "k": k, "users": len(eval_users), "cold_users": int((~known).sum()), **drift.to_dict()}
+    return pd.concat([report, pd.DataFrame([drift_row])], ignore_index=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline top-k evaluation of the SVD and content-KNN recommenders.")
+    parser.add_argument("--data", default="data/cleaned_small.csv", help="cleaned visit table (.csv or .parquet)")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--test-fraction", type=float, default=0.2)
+    parser.add_argument("--min-rating", type=float, default=None, help="only held-out visits rated at least this count as relevant")
+    parser.add_argument("--jobs", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=2048)
+    parser.add_argument("--out", default=None, help="write the report to this .csv or .json file")
+    parser.add_argument("--incremental", action="store_true",
+                        help="compare SVDRecommender.update() against a full refit instead (drift check)")
+    parser.add_argument("--update-fraction", type=float, default=0.1, help="with --incremental: newest share of training folded in")
+    args = parser.parse_args()
+
+    df = pd.read_parquet(args.data) if args.data.endswith(".parquet") else pd.read_csv(args.data)
+    if args.incremental:
+        report = evaluate_incremental(df, k=args.k, test_fraction=args.test_fraction, update_fraction=args.update_fraction,
+                                      min_rating=args.min_rating, n_jobs=args.jobs, chunk_size=args.chunk_size)
+    else:
+        report = evaluate_recommenders(df, k=args.k, test_fraction=args.test_fraction, min_rating=args.min_rating,
+                                       n_jobs=args.jobs, chunk_size=args.chunk_size)
+    print(report.to_string(index=False))
+    if args.out:
+        if args.out.endswith(".json"):
+            report.to_json(args.out, orient="records", indent=2)
+        else:
+            report.to_csv(args.out, index=False)
+        print(f"Saved evaluation report to {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -2,63 +2,247 @@
 import pandas as pd
 from sklearn.preprocessing import OneHotEncoder
 import numpy as np
+import scipy.sparse as sp
+import joblib
 
 def add_aggregates(df: pd.DataFrame) -> pd.DataFrame:
-    # user aggregates
-    user_agg = df.groupby("UserId").agg(
-        user_total_visits=("TransactionId", "count"),
-        user_avg_rating=("Rating", "mean")
-    ).reset_index()
-    df = df.merge(user_agg, on="UserId", how="left")
-
-    # attraction aggregates
-    attr_agg = df.groupby(["AttractionId", "Attraction"]).agg(
-        attraction_total_visits=("TransactionId", "count"),
-        attraction_avg_rating=("Rating", "mean")
-    ).reset_index()
-    df = df.merge(attr_agg, on=["AttractionId", "Attraction"], how="left")
+    # one-shot use of AggregateStore; keep the store around to update it incrementally
+    return AggregateStore.from_frame(df).attach(df)
+
+def partial_aggregates(df: pd.DataFrame) -> dict:
+    """
+    Mergeable per-chunk state behind add_aggregates: visit count, rating sum and rating
+    count per UserId and per AttractionId. Combine chunks with merge_partial_aggregates
+    and turn the result into the aggregate columns with finalize_aggregates.
+    """
+    rating = pd.to_numeric(df["Rating"], errors="coerce")
+    parts = pd.DataFrame({
+        "visits": df["TransactionId"].notna().astype("int64"),
+        "rating_sum": rating.fillna(0.0),
+        "rating_count": rating.notna().astype("int64"),
+    }, index=df.index)
+    return {
+        "user": parts.groupby(df["UserId"]).sum(),
+        "attraction": parts.groupby(df["AttractionId"]).sum(),
+    }
+
+def merge_partial_aggregates(a: dict, b: dict) -> dict:
+    if a is None:
+        return b
+    return {k: a[k].add(b[k], fill_value=0) for k in ("user", "attraction")}
+
+def finalize_aggregates(state: dict) -> dict:
+    # same column names add_aggregates produces
+    u, a = state["user"], state["attraction"]
+    user_agg = pd.DataFrame({
+        "user_total_visits": u["visits"].astype("int64"),
+        "user_avg_rating": u["rating_sum"] / u["rating_count"].where(u["rating_count"] > 0),
+    })
+    attr_agg = pd.DataFrame({
+        "attraction_total_visits": a["visits"].astype("int64"),
+        "attraction_avg_rating": a["rating_sum"] / a["rating_count"].where(a["rating_count"] > 0),
+    })
+    return {"user": user_agg.rename_axis("UserId"), "attraction": attr_agg.rename_axis("AttractionId")}
+
+def attach_aggregates(df: pd.DataFrame, final: dict) -> pd.DataFrame:
+    df = df.merge(final["user"], left_on="UserId", right_index=True, how="left")
+    df = df.merge(final["attraction"], left_on="AttractionId", right_index=True, how="left")
     return df
 
-def create_basic_feature_matrix(df: pd.DataFrame, categorical_cols=None, numeric_cols=None):
+class AggregateStore:
     """
-    Returns X_df (pandas) and fitted OneHotEncoder.
-    This code is compatible with different sklearn versions (sparse vs sparse_output).
+    Persisted visit/rating aggregates per UserId and per AttractionId.
+
+    Holds visit count, rating sum and rating count (the mean is derived), so a batch of
+    new transactions is folded in with update() by touching only the keys it contains;
+    the full history is never re-aggregated. Each table is a dict of key -> row plus
+    preallocated arrays grown by doubling, so an update costs O(delta): known keys are
+    dict lookups and new keys are amortized appends. attach() adds the same columns as
+    the old add_aggregates, and user_stats()/attraction_stats() serve point lookups.
     """
-    df = df.copy()
-    categorical_cols = categorical_cols or ["AttractionType", "UserContinent", "UserCountry", "VisitModeName"]
-    numeric_cols = numeric_cols or ["VisitYear", "VisitMonth", "user_total_visits", "attraction_total_visits", "user_avg_rating", "attraction_avg_rating"]
 
-    # numeric part
-    X_num = pd.DataFrame()
+    COLUMNS = ["visits", "rating_sum", "rating_count"]
+    INDEX = {"user": "UserId", "attraction": "AttractionId"}
+
+    def __init__(self):
+        # per kind: key -> row, keys in row order, (capacity x 3) sums, rows in use
+        self._state = {kind: {"pos": {}, "keys": np.empty(0, dtype=object), "values": np.zeros((0, 3)), "n": 0}
+                       for kind in self.INDEX}
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame):
+        return cls().update(df)
+
+    def update(self, delta: pd.DataFrame):
+        if delta is None or delta.empty:
+            return self
+        for kind, part in partial_aggregates(delta).items():
+            st = self._state[kind]
+            pos_of = st["pos"]
+            keys = part.index.tolist()
+            rows = np.fromiter((pos_of.get(k, -1) for k in keys), dtype=np.int64, count=len(keys))
+            new = np.flatnonzero(rows < 0)
+            if len(new):
+                n, need = st["n"], st["n"] + len(new)
+                if need > len(st["values"]):
+                    cap = max(need, 2 * len(st["values"]), 1024)
+                    st["values"] = np.vstack([st["values"], np.zeros((cap - len(st["values"]), 3))])
+                    st["keys"] = np.concatenate([st["keys"], np.empty(cap - len(st["keys"]), dtype=object)])
+                rows[new] = np.arange(n, need)
+                for i in new:
+                    pos_of[keys[i]] = rows[i]
+                st["keys"][n:need] = part.index[new].to_numpy(dtype=object)
+                st["n"] = need
+            # groupby keys are unique, so a fancy-indexed += is safe
+            st["values"][rows] += part[self.COLUMNS].to_numpy(dtype=np.float64)
+        return self
+
+    @property
+    def tables(self) -> dict:
+        # DataFrame view of the sums (copies the store; used for final()/attach)
+        out = {}
+        for kind, st in self._state.items():
+            v = st["values"][:st["n"]]
+            index = pd.Index(st["keys"][:st["n"]].tolist(), name=self.INDEX[kind])
+            out[kind] = pd.DataFrame({"visits": v[:, 0].astype("int64"), "rating_sum": v[:, 1],
+                                      "rating_count": v[:, 2].astype("int64")}, index=index)
+        return out
+
+    def __setstate__(self, state):
+        # stores pickled before the array layout held a "tables" dict of DataFrames
+        if "tables" in state:
+            tables = state.pop("tables")
+            self.__init__()
+            self.__dict__.update(state)
+            for kind, table in tables.items():
+                st = self._state[kind]
+                st["pos"] = {k: i for i, k in enumerate(table.index.tolist())}
+                st["keys"] = table.index.to_numpy(dtype=object)
+                st["values"] = table[self.COLUMNS].to_numpy(dtype=np.float64)
+                st["n"] = len(table)
+        else:
+            self.__dict__.update(state)
+
+    def final(self) -> dict:
+        return finalize_aggregates(self.tables)
+
+    def attach(self, df: pd.DataFrame) -> pd.DataFrame:
+        return attach_aggregates(df, self.final())
+
+    def _stats(self, kind, ids, prefix):
+        st = self._state[kind]
+        ids = pd.Index(ids)
+        rows = np.fromiter((st["pos"].get(k, -1) for k in ids.tolist()), dtype=np.int64, count=len(ids))
+        v = np.where((rows >= 0)[:, None], st["values"][np.maximum(rows, 0)] if len(st["values"]) else 0.0, np.nan)
+        count = v[:, 2]
+        return pd.DataFrame({
+            f"{prefix}_total_visits": np.nan_to_num(v[:, 0]).astype("int64"),
+            f"{prefix}_avg_rating": np.divide(v[:, 1], count, out=np.full(len(ids), np.nan), where=count > 0),
+        }, index=ids)
+
+    def user_stats(self, user_ids):
+        return self._stats("user", user_ids, "user")
+
+    def attraction_stats(self, attraction_ids):
+        return self._stats("attraction", attraction_ids, "attraction")
+
+    def save(self, path):
+        joblib.dump(self, path)
+
+    @staticmethod
+    def load(path):
+        return joblib.load(path)
+
+DEFAULT_CATEGORICAL_COLS = ["AttractionType", "UserContinent", "UserCountry", "VisitModeName"]
+DEFAULT_NUMERIC_COLS = ["VisitYear", "VisitMonth", "user_total_visits", "attraction_total_visits", "user_avg_rating", "attraction_avg_rating"]
+
+def _make_onehot(sparse: bool):
+    # Create OneHotEncoder in a sklearn-version resilient way
+    try:
+        # sklearn >= 1.2
+        return OneHotEncoder(handle_unknown="ignore", sparse_output=sparse)
+    except TypeError:
+        # older sklearn
+        return OneHotEncoder(handle_unknown="ignore", sparse=sparse)
+
+def _numeric_block(df: pd.DataFrame, numeric_cols):
+    X_num = pd.DataFrame(index=df.index)
     for c in numeric_cols:
         if c in df.columns:
             X_num[c] = pd.to_numeric(df[c].fillna(0), errors="coerce").astype(float)
         else:
             X_num[c] = 0.0
+    return X_num
+
+def _category_strings(df: pd.DataFrame, cols):
+    # encoder input: every value as str, missing as "NA"; categoricals (see
+    # cleaning.optimize_dtypes) are mapped once per category rather than once per row
+    out = {}
+    for c in cols:
+        s = df[c]
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            labels = np.append(s.cat.categories.astype(str).to_numpy(dtype=object), "NA")
+            out[c] = labels[s.cat.codes.to_numpy()]
+        else:
+            out[c] = s.fillna("NA").astype(str)
+    return pd.DataFrame(out, index=df.index)
+
+def create_basic_feature_matrix(df: pd.DataFrame, categorical_cols=None, numeric_cols=None, sparse=False):
+    """
+    Returns X_df (pandas) and fitted OneHotEncoder.
+    This code is compatible with different sklearn versions (sparse vs sparse_output).
+    With sparse=True, X is a scipy CSR matrix [numeric | one-hot] instead; column names
+    come from feature_names(numeric_cols, enc) and new rows go through transform_features.
+    """
+    categorical_cols = categorical_cols or DEFAULT_CATEGORICAL_COLS
+    numeric_cols = numeric_cols or DEFAULT_NUMERIC_COLS
+
+    # numeric part
+    X_num = _numeric_block(df, numeric_cols)
 
     # categorical part
     # defensive: keep only columns that exist
     categorical_cols = [c for c in (categorical_cols or []) if c in df.columns]
-    if categorical_cols:
-        cat_df = df[categorical_cols].fillna("NA").astype(str)
-        # Create OneHotEncoder in a sklearn-version resilient way
-        try:
-            # sklearn >= 1.2
-            enc = OneHotEncoder(handle_unknown="ignore", sparse_output=False)
-        except TypeError:
-            # older sklearn
-            enc = OneHotEncoder(handle_unknown="ignore", sparse=False)
-
-        enc_arr = enc.fit_transform(cat_df)
-        enc_cols = enc.get_feature_names_out(categorical_cols)
-        X_cat = pd.DataFrame(enc_arr, columns=enc_cols, index=df.index)
-        X = pd.concat([X_num, X_cat], axis=1)
-    else:
-        enc = None
-        X = X_num
+    if not categorical_cols:
+        return (sp.csr_matrix(X_num.to_numpy()) if sparse else X_num), None
 
+    cat_df = _category_strings(df, categorical_cols)
+    enc = _make_onehot(sparse)
+    enc_arr = enc.fit_transform(cat_df)
+    if sparse:
+        return sp.hstack([sp.csr_matrix(X_num.to_numpy()), enc_arr], format="csr"), enc
+
+    enc_cols = enc.get_feature_names_out(categorical_cols)
+    X_cat = pd.DataFrame(enc_arr, columns=enc_cols, index=df.index)
+    X = pd.concat([X_num, X_cat], axis=1)
     return X, enc
 
+def transform_features(df: pd.DataFrame, enc, numeric_cols=None, sparse=True):
+    """
+    Build the feature matrix for new rows with an already fitted encoder, in the same
+    column order create_basic_feature_matrix produced. Unseen categories encode as zeros.
+    """
+    numeric_cols = numeric_cols or DEFAULT_NUMERIC_COLS
+    X_num = _numeric_block(df, numeric_cols)
+    if enc is None:
+        return sp.csr_matrix(X_num.to_numpy()) if sparse else X_num
+    cat_cols = list(enc.feature_names_in_)
+    cat_df = pd.DataFrame({c: df[c] if c in df.columns else pd.NA for c in cat_cols}, index=df.index)
+    enc_arr = enc.transform(_category_strings(cat_df, cat_cols))
+    if sp.issparse(enc_arr):
+        X = sp.hstack([sp.csr_matrix(X_num.to_numpy()), enc_arr], format="csr")
+        return X if sparse else pd.DataFrame(X.toarray(), columns=feature_names(numeric_cols, enc), index=df.index)
+    if sparse:
+        return sp.hstack([sp.csr_matrix(X_num.to_numpy()), sp.csr_matrix(enc_arr)], format="csr")
+    X_cat = pd.DataFrame(enc_arr, columns=enc.get_feature_names_out(cat_cols), index=df.index)
+    return pd.concat([X_num, X_cat], axis=1)
+
+def feature_names(numeric_cols, enc):
+    names = list(numeric_cols)
+    if enc is not None:
+        names += list(enc.get_feature_names_out())
+    return names
+
 def label_encode_visitmode(df):
     from sklearn.preprocessing import LabelEncoder
     df = df.copy()
@@ -0,0 +1,165 @@
+# src/model_selection.py
+import itertools
+import math
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor, RandomForestClassifier
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import KFold, StratifiedKFold
+from src.modeling import _safe_rmse
+
+try:
+    import lightgbm
+except ImportError:
+    lightgbm = None
+try:
+    import xgboost
+except ImportError:
+    xgboost = None
+
+def default_search_space(task="regression"):
+    """
+    Candidate models and parameter grids as {name: (estimator class, grid)}.
+    LightGBM / XGBoost entries are only included when the package is installed.
+    """
+    reg = task == "regression"
+    space = {
+        "random_forest": (RandomForestRegressor if reg else RandomForestClassifier,
+                          {"n_estimators": [100, 200], "max_depth": [None, 16], "min_samples_leaf": [1, 5],
+                           "random_state": [42], "n_jobs": [1]}),
+    }
+    if lightgbm is not None:
+        space["lightgbm"] = (lightgbm.LGBMRegressor if reg else lightgbm.LGBMClassifier,
+                             {"n_estimators": [200, 500], "learning_rate": [0.05, 0.1], "num_leaves": [31, 127],
+                              "random_state": [42], "n_jobs": [1], "verbose": [-1]})
+    if xgboost is not None:
+        space["xgboost"] = (xgboost.XGBRegressor if reg else xgboost.XGBClassifier,
+                            {"n_estimators": [200, 500], "learning_rate": [0.05, 0.1], "max_depth": [6, 10],
+                             "tree_method": ["hist"], "random_state": [42], "n_jobs": [1]})
+    return space
+
+def _expand(space):
+    for name, (cls, grid) in space.items():
+        keys = list(grid)
+        for values in itertools.product(*(grid[k] for k in keys)):
+            yield name, cls, dict(zip(keys, values))
+
+def _score(task, y_true, y_pred):
+    # loss: lower is better for both tasks
+    if task == "regression":
+        return _safe_rmse(y_true, y_pred)
+    return 1.0 - accuracy_score(y_true, y_pred)
+
+def _eval_fold(args):
+    """Fit one config on one fold; runs in a worker process against the memory-mapped fold cache."""
+    cache_dir, task, cls, params, fold = args
+    X_train, y_train, X_test, y_test = joblib.load(Path(cache_dir) / f"fold_{fold}.pkl", mmap_mode="r")
+    model = cls(**params)
+    t0 = time.perf_counter()
+    model.fit(X_train, y_train)
+    fit_s = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    preds = model.predict(X_test)
+    predict_s = time.perf_counter() - t0
+    return {"loss": _score(task, y_test, preds), "fit_s": fit_s,
+            "predict_ms_per_1k": predict_s / max(len(y_test), 1) * 1e6}
+
+def search(X, y, task="regression", space=None, n_splits=5, eta=3, n_jobs=None, cache_dir=None, random_state=42):
+    """
+    Cross-validated comparison of candidate models, run on a process pool.
+
+    Each fold's train/test matrices (dense or CSR, as given: pass what the final fit
+    will see) are sliced once and written to a joblib cache; workers memory-map them,
+    so no fold matrix is rebuilt or pickled per config. Early stopping is successive
+    halving: every config is scored on the first fold, only the best 1/eta go on to
+    the remaining folds; the rest are reported as pruned with their single-fold score.
+
+    Returns the leaderboard DataFrame sorted by mean loss (RMSE, or 1 - accuracy for
+    classification) with fit time and prediction time per 1k rows.
+    """
+    space = space or default_search_space(task)
+    configs = list(_expand(space))
+    y = np.asarray(y)
+    if task == "regression":
+        splitter = KFold(n_splits=n_splits, shuffle=True, random_state=random_state)
+    else:
+        splitter = StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=random_state)
+    folds = list(splitter.split(np.zeros(len(y)), y))
+
+    tmp = None
+    if cache_dir is None:
+        tmp = tempfile.TemporaryDirectory(prefix="model_selection_")
+        cache_dir = tmp.name
+    Path(cache_dir).mkdir(parents=True, exist_ok=True)
+    for f, (train_idx, test_idx) in enumerate(folds):
+        joblib.dump((X[train_idx], y[train_idx], X[test_idx], y[test_idx]), Path(cache_dir) / f"fold_{f}.pkl")
+
+    results = {i: [] for i in range(len(configs))}
+    try:
+        with ProcessPoolExecutor(max_workers=n_jobs or os.cpu_count()) as pool:
+            # rung 0: every config on fold 0
+            jobs = [(cache_dir, task, cls, params, 0) for _, cls, params in configs]
+            for i, res in enumerate(pool.map(_eval_fold, jobs)):
+                results[i].append(res)
+            # rung 1: survivors on the remaining folds
+            n_keep = max(1, math.ceil(len(configs) / eta))
+            survivors = sorted(results, key=lambda i: results[i][0]["loss"])[:n_keep]
+            jobs = [(i, (cache_dir, task, configs[i][1], configs[i][2], f))
+                    for i in survivors for f in range(1, len(folds))]
+            for (i, _), res in zip(jobs, pool.map(_eval_fold, [j for _, j in jobs])):
+                results[i].append(res)
+    finally:
+        if tmp is not None:
+            tmp.cleanup()
+
+    rows = []
+    for i, (name, _, params) in enumerate(configs):
+        r = pd.DataFrame(results[i])
+        rows.append({
+            "model": name,
+            "params": {k: v for k, v in params.items() if k not in ("random_state", "n_jobs", "verbose")},
+            "loss_mean": r["loss"].mean(),
+            "loss_std": r["loss"].std(ddof=0),
+            "folds": len(r),
+            "pruned": len(r) < len(folds),
+            "fit_s": r["fit_s"].mean(),
+            "predict_ms_per_1k": r["predict_ms_per_1k"].mean(),
+        })
+    board = pd.DataFrame(rows).sort_values(["pruned", "loss_mean"]).reset_index(drop=True)
+    board.insert(2, "metric", "rmse" if task == "regression" else "1-accuracy")
+    return board
+
+def select_fastest(board, max_loss):
+    """
+    Cheapest fully evaluated config (fit + predict time) whose mean loss is within max_loss.
+    Returns the leaderboard row, or None when nothing meets the target.
+    """
+    ok = board[(~board["pruned"]) & (board["loss_mean"] <= max_loss)]
+    if ok.empty:
+        return None
+    cost = ok["fit_s"] + ok["predict_ms_per_1k"] / 1e3
+    return ok.loc[cost.idxmin()]
+
+def build_model(row, task="regression", space=None):
+    # estimator for a leaderboard row, with all cores for the final fit
+    space = space or default_search_space(task)
+    cls, grid = space[row["model"]]
+    params = {k: v[0] for k, v in grid.items() if k in ("random_state", "verbose")}
+    params.update(row["params"])
+    params["n_jobs"] = -1
+    return cls(**params)
+
+def family_model(name, task="regression", space=None):
+    # estimator of one search-space family at its first grid values, for training a chosen
+    # family without a search (train.py --model)
+    space = space or default_search_space(task)
+    if name not in space:
+        raise ValueError(f"unknown or not installed model family {name!r}; available: {sorted(space)}")
+    cls, grid = space[name]
+    return build_model({"model": name, "params": {k: v[0] for k, v in grid.items()}}, task, space)
@@ -5,6 +5,7 @@ from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_squared_error, accuracy_score, classification_report
 import math
 import numpy as np
+import scipy.sparse as sp
 
 def _safe_rmse(y_true, y_pred):
     # handle multioutput shapes gracefully
@@ -17,9 +18,20 @@ def _safe_rmse(y_true, y_pred):
         arr_pred = np.array(y_pred).ravel()
         return float(np.sqrt(np.mean((arr_true - arr_pred) ** 2)))
 
-def train_regression(X, y, save_path=None):
+def dense_for_trees(X):
+    # sklearn's sparse tree splitter is several times slower than the dense one, and
+    # fit() casts to float32 anyway: densify CSR straight to float32 (no float64 copy)
+    if sp.issparse(X):
+        return X.astype(np.float32).toarray()
+    return X
+
+def train_regression(X, y, save_path=None, model=None, dense=False):
+    # model: unfitted estimator to use instead of the default forest (e.g. from model_selection);
+    # dense=True densifies CSR to float32 first (faster forest fits; memory ~ rows x features)
+    if dense:
+        X = dense_for_trees(X)
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-    model = RandomForestRegressor(n_estimators=200, random_state=42, n_jobs=-1)
+    model = model if model is not None else RandomForestRegressor(n_estimators=200, random_state=42, n_jobs=-1)
     model.fit(X_train, y_train)
     preds = model.predict(X_test)
     rmse = _safe_rmse(y_test, preds)
@@ -27,9 +39,11 @@ def train_regression(X, y, save_path=None):
         joblib.dump(model, save_path)
     return model, rmse
 
-def train_classification(X, y, save_path=None):
+def train_classification(X, y, save_path=None, model=None, dense=False):
+    if dense:
+        X = dense_for_trees(X)
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-    clf = RandomForestClassifier(n_estimators=200, random_state=42, n_jobs=-1)
+    clf = model if model is not None else RandomForestClassifier(n_estimators=200, random_state=42, n_jobs=-1)
     clf.fit(X_train, y_train)
     preds = clf.predict(X_test)
     acc = accuracy_score(y_test, preds)
@@ -37,4 +51,3 @@ def train_classification(X, y, save_path=None):
     if save_path:
         joblib.dump(clf, save_path)
     return clf, acc, report
-
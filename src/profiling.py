@@ -0,0 +1,89 @@
+# src/profiling.py
+import json
+import platform
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+def _max_rss_mb():
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    return rss / 2**20 if platform.system() == "Darwin" else rss / 2**10
+
+def row_count(obj):
+    # rows of a DataFrame / ndarray / sparse matrix, None for anything else
+    shape = getattr(obj, "shape", None)
+    if shape:
+        return int(shape[0])
+    return None
+
+class StageProfiler:
+    """
+    Records wall time, CPU time, memory and row counts per pipeline stage.
+
+        prof = StageProfiler()
+        with prof.stage("basic_clean") as rec:
+            df = basic_clean(df)
+            rec["rows"] = len(df)
+        prof.write("reports/run.json")
+
+    max_rss_mb is the process high-water mark after the stage. With trace_memory=True
+    the stage's own peak Python/numpy allocation is recorded too (peak_traced_mb); that
+    is more precise but tracemalloc slows allocation-heavy code noticeably.
+    """
+
+    def __init__(self, trace_memory=False, meta=None):
+        self.trace_memory = trace_memory
+        self.meta = dict(meta or {})
+        self.stages = []
+        self.started_at = datetime.now(timezone.utc).isoformat()
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextmanager
+    def stage(self, name, rows=None):
+        rec = {"stage": name, "rows": rows}
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        wall0, cpu0 = time.perf_counter(), time.process_time()
+        try:
+            yield rec
+        finally:
+            rec["wall_s"] = time.perf_counter() - wall0
+            rec["cpu_s"] = time.process_time() - cpu0
+            rec["max_rss_mb"] = _max_rss_mb()
+            if self.trace_memory:
+                rec["peak_traced_mb"] = (tracemalloc.get_traced_memory()[1] - base) / 2**20
+            self.stages.append(rec)
+
+    def report(self):
+        return {
+            "started_at": self.started_at,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            **self.meta,
+            "total_wall_s": sum(s["wall_s"] for s in self.stages),
+            "total_cpu_s": sum(s["cpu_s"] for s in self.stages),
+            "stages": self.stages,
+        }
+
+    def write(self, path):
+        with open(path, "w") as fh:
+            json.dump(self.report(), fh, indent=2, default=str)
+
+    def summary(self):
+        lines = [f"{'stage':<28}{'rows':>12}{'wall s':>10}{'cpu s':>10}{'rss MiB':>10}"]
+        for s in self.stages:
+            rows = "" if s["rows"] is None else s["rows"]
+            rss = "" if s["max_rss_mb"] is None else f"{s['max_rss_mb']:.0f}"
+            lines.append(f"{s['stage']:<28}{rows:>12}{s['wall_s']:>10.2f}{s['cpu_s']:>10.2f}{rss:>10}")
+        return "\n".join(lines)
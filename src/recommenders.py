@@ -1,34 +1,624 @@
 # src/recommenders.py
 import pandas as pd
 import numpy as np
+import joblib
+import scipy.sparse as sp
 from sklearn.decomposition import TruncatedSVD
-from sklearn.neighbors import NearestNeighbors
 
 def user_item_matrix(df):
     piv = df.pivot_table(index="UserId", columns="AttractionId", values="Rating", aggfunc="mean").fillna(0)
     return piv
 
+def sparse_user_item_matrix(df, return_counts=False):
+    """
+    CSR equivalent of user_item_matrix without the dense users x items allocation.
+    Returns (R, user_ids, item_ids): row i of R is user_ids[i], column j is item_ids[j];
+    repeated (user, item) pairs are averaged like pivot_table(aggfunc="mean").
+    With return_counts=True the per-pair rating counts (same sparsity pattern) are
+    returned as a fourth element, which is what SVDRecommender.update() needs.
+    """
+    ratings = pd.to_numeric(df["Rating"], errors="coerce")
+    mask = ratings.notna() & df["UserId"].notna() & df["AttractionId"].notna()
+    u_codes, user_ids = pd.factorize(df.loc[mask, "UserId"], sort=True)
+    i_codes, item_ids = pd.factorize(df.loc[mask, "AttractionId"], sort=True)
+    shape = (len(user_ids), len(item_ids))
+    vals = ratings[mask].to_numpy(dtype=np.float64)
+
+    R = sp.csr_matrix((vals, (u_codes, i_codes)), shape=shape)
+    counts = sp.csr_matrix((np.ones_like(vals), (u_codes, i_codes)), shape=shape)
+    R.sum_duplicates()
+    counts.sum_duplicates()
+    # both share the same sparsity pattern, so the mean is an elementwise divide on .data
+    R.data /= counts.data
+    if return_counts:
+        return R, np.asarray(user_ids), np.asarray(item_ids), counts
+    return R, np.asarray(user_ids), np.asarray(item_ids)
+
+def top_k_indices(scores, k):
+    # indices of the k largest scores, best first
+    k = min(k, scores.shape[-1])
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    part = np.argpartition(-scores, k - 1)[:k]
+    return part[np.argsort(-scores[part], kind="stable")]
+
+class SVDRecommender:
+    """
+    Fit-once version of simple_svd_recommender.
+
+    The per-request score is a similarity-weighted average of all users' ratings,
+    with similarity = cosine in the SVD latent space. Because that is linear in the
+    normalized user vector u, it factorizes into
+        scores = (u @ item_factors) / (u @ sim_norm)
+    where item_factors = L_n.T @ R and sim_norm = L_n.sum(axis=0) are computed once
+    at fit time. Serving is then one row lookup plus a (k x n_items) product.
+    """
+
+    def __init__(self, n_components=50, random_state=42):
+        self.n_components = n_components
+        self.random_state = random_state
+
+    def fit(self, df):
+        R, self.user_ids, self.item_ids, self.counts = sparse_user_item_matrix(df, return_counts=True)
+        self.user_index = {u: i for i, u in enumerate(self.user_ids)}
+        self.item_index = {a: j for j, a in enumerate(self.item_ids)}
+
+        n_comp = min(self.n_components, max(2, R.shape[1]-1))
+        self.svd = TruncatedSVD(n_components=n_comp, random_state=self.random_state)
+        latent = self.svd.fit_transform(R)
+        norms = np.linalg.norm(latent, axis=1, keepdims=True)
+        latent_n = latent / np.where(norms == 0, 1.0, norms)
+
+        # user_factors hold the unit-norm latent rows; item_factors fold the rating matrix in.
+        # R stays sparse: (R.T @ latent_n).T is the same product without densifying R
+        self.user_factors = latent_n
+        self.item_factors = np.asarray((R.T @ latent_n).T)
+        self.sim_norm = latent_n.sum(axis=0)
+        # kept for excluding already-visited attractions
+        self.interactions = R
+        # ratings folded in by update() since this full fit (see needs_rebuild)
+        self.n_fit_ratings = int(self.counts.data.sum())
+        self.n_folded_ratings = 0
+        return self
+
+    # update() keeps the rows it changes in _pending ({user row: (item cols, means, counts)})
+    # instead of rebuilding the CSR; they are merged back once they reach this share of it
+    MERGE_FRACTION = 0.1
+
+    @property
+    def interactions(self):
+        # user x item mean ratings, with the rows changed by update() merged back in
+        if self._pending:
+            self._merge_pending()
+        return self._interactions
+
+    @interactions.setter
+    def interactions(self, R):
+        self._interactions = R
+        self._pending = {}
+        self._pending_nnz = 0
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # growth slack for the user arrays; reallocated by the next update()
+        state.pop("_buffers", None)
+        return state
+
+    def __setstate__(self, state):
+        # models saved before update() kept pending rows stored the matrix directly
+        if "interactions" in state:
+            state["_interactions"] = state.pop("interactions")
+        state.setdefault("_pending", {})
+        state.setdefault("_pending_nnz", 0)
+        self.__dict__.update(state)
+
+    def rated_items(self, row):
+        # item positions rated by the user at row `row`
+        pending = self._pending.get(row)
+        if pending is not None:
+            return pending[0]
+        R = self._interactions
+        if row >= R.shape[0]:
+            return np.empty(0, dtype=R.indices.dtype)
+        return R.indices[R.indptr[row]:R.indptr[row + 1]]
+
+    def _rows(self, rows, counts=False):
+        # means (and counts) CSR for the given user rows; costs their stored ratings only
+        R, C = self._interactions, self.counts
+        rows = np.asarray(rows, dtype=np.int64)
+        shape = (len(rows), len(self.item_ids))
+        if not self._pending and (not len(rows) or rows.max() < R.shape[0]):
+            out = [R[rows]] + ([C[rows]] if counts else [])
+            for m in out:
+                m.resize(shape)
+            return tuple(out) if counts else out[0]
+        indices, means, cnts = [], [], []
+        for r in rows.tolist():
+            pending = self._pending.get(r)
+            if pending is not None:
+                c, d, n = pending
+            elif r < R.shape[0]:
+                s, e = R.indptr[r], R.indptr[r + 1]
+                c, d, n = R.indices[s:e], R.data[s:e], (C.data[s:e] if counts else None)
+            else:
+                c, d, n = R.indices[:0], R.data[:0], (C.data[:0] if counts else None)
+            indices.append(c)
+            means.append(d)
+            cnts.append(n)
+        indptr = np.concatenate([[0], np.cumsum([len(c) for c in indices])])
+        indices = np.concatenate(indices)
+        out = sp.csr_matrix((np.concatenate(means), indices, indptr), shape=shape)
+        if not counts:
+            return out
+        return out, sp.csr_matrix((np.concatenate(cnts), indices.copy(), indptr.copy()), shape=shape)
+
+    def _merge_pending(self):
+        # one O(all ratings) rebuild: stored rows not in _pending, plus the pending rows
+        R, C = self._interactions, self.counts
+        shape = (len(self.user_ids), len(self.item_ids))
+        rows = np.fromiter(self._pending, dtype=np.int64, count=len(self._pending))
+        pending = list(self._pending.values())
+        keep = np.ones(R.shape[0], dtype=bool)
+        keep[rows[rows < R.shape[0]]] = False
+        base_rows = np.repeat(np.arange(R.shape[0]), np.diff(R.indptr))
+        m = keep[base_rows]
+        coords = (np.concatenate([base_rows[m], np.repeat(rows, [len(p[0]) for p in pending])]),
+                  np.concatenate([R.indices[m]] + [p[0] for p in pending]))
+        means = sp.csr_matrix((np.concatenate([R.data[m]] + [p[1] for p in pending]), coords), shape=shape)
+        counts = sp.csr_matrix((np.concatenate([C.data[m]] + [p[2] for p in pending]), coords), shape=shape)
+        self.interactions, self.counts = means, counts
+
+    def _append_users(self, new_users):
+        # user ids/factors live in doubling buffers so adding users does not copy all of them
+        n, k = len(self.user_ids), self.user_factors.shape[1]
+        m = n + len(new_users)
+        bufs = getattr(self, "_buffers", None)
+        if (bufs is None or len(bufs["ids"]) < m or self.user_ids.base is not bufs["ids"]
+                or self.user_factors.base is not bufs["factors"]
+                or np.result_type(bufs["ids"].dtype, new_users.dtype) != bufs["ids"].dtype):
+            cap = max(2 * n, m)
+            ids = np.empty(cap, dtype=np.result_type(self.user_ids.dtype, new_users.dtype))
+            ids[:n] = self.user_ids
+            factors = np.zeros((cap, k))
+            factors[:n] = self.user_factors
+            bufs = self._buffers = {"ids": ids, "factors": factors}
+        bufs["ids"][n:m] = new_users
+        bufs["factors"][n:m] = 0.0
+        self.user_ids, self.user_factors = bufs["ids"][:m], bufs["factors"][:m]
+
+    def update(self, delta, sweeps=0):
+        """
+        Fold a batch of new visits into the fitted model without refitting the SVD.
+
+        Ratings are merged into the per-pair means. New items get item vectors by
+        projecting their rating columns onto the user factors, then every user in
+        the batch is re-projected onto the (extended) item basis. Optionally, sweeps
+        rounds of alternating projections refine the touched items and users, like
+        ALS restricted to them. item_factors and sim_norm change only by the
+        contribution of the affected users.
+
+        The rows of the affected users are rebuilt aside (see MERGE_FRACTION) rather
+        than in the full CSR, so with sweeps=0 a call costs the batch plus those
+        users' stored ratings, plus an O(n_items x k) copy of the item basis; the
+        occasional merge into the CSR is amortized over the updates that fed it.
+        sweeps > 0 needs every rater of the touched items and merges first, so it
+        costs time proportional to all stored ratings. The basis itself drifts from a
+        full fit over time; see needs_rebuild() and eval.evaluate_incremental().
+        """
+        ratings = pd.to_numeric(delta["Rating"], errors="coerce")
+        mask = (ratings.notna() & delta["UserId"].notna() & delta["AttractionId"].notna()).to_numpy()
+        if not mask.any():
+            return self
+        users = delta["UserId"].to_numpy()[mask]
+        items = delta["AttractionId"].to_numpy()[mask]
+        vals = ratings.to_numpy(dtype=np.float64)[mask]
+
+        # append ids never seen before; positions of existing ids do not move
+        n_old_users, n_old_items = len(self.user_ids), len(self.item_ids)
+        new_users = pd.unique(users[np.fromiter((u not in self.user_index for u in users), dtype=bool, count=len(users))])
+        new_items = pd.unique(items[np.fromiter((a not in self.item_index for a in items), dtype=bool, count=len(items))])
+        for u in new_users:
+            self.user_index[u] = len(self.user_index)
+        for a in new_items:
+            self.item_index[a] = len(self.item_index)
+        old_user_factors = self.user_factors
+        if len(new_users):
+            self._append_users(new_users)
+        self.item_ids = np.concatenate([self.item_ids, new_items]) if len(new_items) else self.item_ids
+        n_items = len(self.item_ids)
+        rows = np.fromiter((self.user_index[u] for u in users), dtype=np.int64, count=len(users))
+        cols = np.fromiter((self.item_index[a] for a in items), dtype=np.int64, count=len(items))
+
+        if getattr(self, "counts", None) is None:
+            # fitted before counts were kept: treat every stored mean as a single rating
+            self.counts = self._interactions.copy()
+            self.counts.data[:] = 1.0
+        # current rows of the affected users (new users have none), old contribution removed below
+        affected = np.unique(rows)
+        old_aff = affected[affected < n_old_users]
+        old_R, old_C = self._rows(affected, counts=True)
+        old_n = old_user_factors[old_aff]
+
+        # merge the batch into those rows' sums/counts; both are built from the same coordinates
+        # so they share one sparsity pattern and the mean stays an elementwise divide
+        R0, C0 = old_R.tocoo(), old_C.tocoo()
+        coords = (np.concatenate([R0.row, np.searchsorted(affected, rows)]), np.concatenate([R0.col, cols]))
+        shape = (len(affected), n_items)
+        R_aff = sp.csr_matrix((np.concatenate([R0.data * C0.data, vals]), coords), shape=shape)
+        C_aff = sp.csr_matrix((np.concatenate([C0.data, np.ones_like(vals)]), coords), shape=shape)
+        R_aff.sum_duplicates()
+        C_aff.sum_duplicates()
+        R_aff.data /= C_aff.data
+        for i, r in enumerate(affected.tolist()):
+            s, e = R_aff.indptr[i], R_aff.indptr[i + 1]
+            prev = self._pending.get(r)
+            self._pending_nnz += (e - s) - (0 if prev is None else len(prev[0]))
+            self._pending[r] = (R_aff.indices[s:e], R_aff.data[s:e], C_aff.data[s:e])
+
+        sigma2 = np.maximum(self.svd.singular_values_, 1e-12) ** 2
+        V = np.vstack([self.svd.components_.T, np.zeros((len(new_items), self.svd.components_.shape[0]))])
+        # item vector = rating column projected onto the raters' latent rows / sigma^2
+        if len(new_items):
+            # every rating of a new item is in this batch, so its raters are all in R_aff
+            new_cols = np.arange(n_old_items, n_items)
+            V[new_cols] = (R_aff[:, new_cols].T @ (R_aff @ V)) / sigma2
+        latent = R_aff @ V
+        if sweeps:
+            R = self.interactions
+            touched = np.unique(cols)
+            for _ in range(sweeps):
+                Rc = R[:, touched].T.tocsr()
+                raters = np.unique(Rc.indices)
+                V[touched] = (Rc[:, raters] @ (R[raters] @ V)) / sigma2
+                latent = R_aff @ V
+        self.svd.components_ = V.T.copy()
+
+        norms = np.linalg.norm(latent, axis=1, keepdims=True)
+        new_n = latent / np.where(norms == 0, 1.0, norms)
+        k = self.user_factors.shape[1]
+        self.user_factors[affected] = new_n
+        old_R = old_R[:len(old_aff)]
+        self.item_factors = np.hstack([self.item_factors, np.zeros((k, len(new_items)))])
+        self.item_factors += np.asarray((R_aff.T @ new_n).T) - np.asarray((old_R.T @ old_n).T)
+        self.sim_norm = self.sim_norm + new_n.sum(axis=0) - old_n.sum(axis=0)
+        self.n_folded_ratings = getattr(self, "n_folded_ratings", 0) + len(vals)
+        if self._pending_nnz > self.MERGE_FRACTION * self._interactions.nnz:
+            self._merge_pending()
+        return self
+
+    def needs_rebuild(self, max_fraction=0.2):
+        # True once the folded-in ratings reach max_fraction of those seen at the last full fit
+        return getattr(self, "n_folded_ratings", 0) >= max_fraction * max(getattr(self, "n_fit_ratings", 0), 1)
+
+    def score(self, user_id):
+        idx = self.user_index.get(user_id)
+        if idx is None:
+            return None
+        u = self.user_factors[idx]
+        return (u @ self.item_factors) / ((u @ self.sim_norm) + 1e-9)
+
+    def recommend(self, user_id, top_k=10, exclude_seen=False):
+        scores = self.score(user_id)
+        if scores is None:
+            return []
+        if exclude_seen:
+            scores[self.rated_items(self.user_index[user_id])] = -np.inf
+        top = top_k_indices(scores, top_k)
+        return self.item_ids[top[np.isfinite(scores[top])]].tolist()
+
+    def recommend_batch(self, user_ids=None, top_k=10, exclude_seen=True, chunk_size=2048):
+        """
+        Yield top-k recommendations for many users, one DataFrame per chunk of users,
+        with columns UserId, Rank, AttractionId, Score. Memory is bounded by
+        chunk_size x n_items. user_ids=None means every known user; unknown ids are skipped.
+        """
+        if user_ids is None:
+            rows = np.arange(len(self.user_ids))
+        else:
+            rows = np.array([self.user_index[u] for u in user_ids if u in self.user_index], dtype=np.int64)
+        k = min(top_k, len(self.item_ids))
+        if k <= 0:
+            return
+        for start in range(0, len(rows), chunk_size):
+            idx = rows[start:start + chunk_size]
+            U = self.user_factors[idx]
+            scores = U @ self.item_factors
+            scores /= ((U @ self.sim_norm) + 1e-9)[:, None]
+            if exclude_seen:
+                seen_r, seen_c = self._rows(idx).nonzero()
+                scores[seen_r, seen_c] = -np.inf
+
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            top_scores = np.take_along_axis(scores, top, axis=1)
+            order = np.argsort(-top_scores, axis=1, kind="stable")
+            top = np.take_along_axis(top, order, axis=1)
+            top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+            keep = np.isfinite(top_scores).ravel()
+            yield pd.DataFrame({
+                "UserId": np.repeat(self.user_ids[idx], k)[keep],
+                "Rank": np.tile(np.arange(1, k + 1), len(idx))[keep],
+                "AttractionId": self.item_ids[top].ravel()[keep],
+                "Score": top_scores.ravel()[keep],
+            })
+
+    def save(self, path):
+        joblib.dump(self, path)
+
+    @staticmethod
+    def load(path):
+        return joblib.load(path)
+
+def write_batch_recommendations(recommender, path, user_ids=None, top_k=10, exclude_seen=True, chunk_size=2048):
+    """
+    Stream recommend_batch output to a .csv or .parquet file chunk by chunk.
+    Returns the number of rows written.
+    """
+    path = str(path)
+    chunks = recommender.recommend_batch(user_ids, top_k=top_k, exclude_seen=exclude_seen, chunk_size=chunk_size)
+    n_rows = 0
+    if path.endswith(".parquet"):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        writer = None
+        try:
+            for chunk in chunks:
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(path, table.schema)
+                writer.write_table(table)
+                n_rows += len(chunk)
+        finally:
+            if writer is not None:
+                writer.close()
+    else:
+        header = True
+        with open(path, "w", newline="") as fh:
+            for chunk in chunks:
+                chunk.to_csv(fh, index=False, header=header)
+                header = False
+                n_rows += len(chunk)
+    return n_rows
+
+# segment keyword -> column; segments are tried most specific first, () is the global list
+SEGMENT_COLS = {"country": "UserCountry", "continent": "UserContinent", "visit_mode": "VisitModeName"}
+SEGMENTS = [("country", "visit_mode"), ("country",), ("continent", "visit_mode"), ("continent",), ("visit_mode",), ()]
+
+class PopularityRecommender:
+    """
+    Cached top-N attractions per user segment (UserCountry / UserContinent x VisitModeName),
+    computed once from the consolidated data. recommend() is a dict lookup per segment:
+    the most specific segment the caller can describe comes first and coarser ones
+    (down to the global list) fill the remaining slots. Also keeps each known user's
+    segment (location and most frequent visit mode) so sparse users can be served too.
+    """
+
+    def __init__(self, top_n=50):
+        self.top_n = top_n
+
+    def fit(self, df):
+        df = df[df["AttractionId"].notna()]
+        rating = pd.to_numeric(df["Rating"], errors="coerce") if "Rating" in df.columns else pd.Series(np.nan, index=df.index)
+        base = pd.DataFrame({"AttractionId": df["AttractionId"].to_numpy(), "Rating": rating.to_numpy()})
+        self.segments = [s for s in SEGMENTS if all(SEGMENT_COLS[k] in df.columns for k in s)]
+        self.tables = {}
+        for seg in self.segments:
+            cols = [SEGMENT_COLS[k] for k in seg]
+            frame = base.assign(**{c: df[c].to_numpy() for c in cols})
+            stats = frame.groupby(cols + ["AttractionId"], observed=True)["Rating"].agg(["size", "mean"])
+            # most visited first, better rated breaks ties
+            stats = stats.sort_values(["size", "mean"], ascending=False)
+            top = stats.groupby(level=cols, observed=True).head(self.top_n) if cols else stats.head(self.top_n)
+            ids = top.index.get_level_values("AttractionId").to_numpy()
+            if not cols:
+                self.tables[seg] = {(): ids}
+                continue
+            keys = pd.MultiIndex.from_arrays([top.index.get_level_values(c) for c in cols])
+            codes, uniques = pd.factorize(keys)
+            order = np.argsort(codes, kind="stable")
+            bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+            self.tables[seg] = {tuple(k): ids[order[bounds[i]:bounds[i + 1]]] for i, k in enumerate(uniques)}
+
+        # per-user segment: location from the first visit, the user's most frequent visit mode
+        users = df[df["UserId"].notna()] if "UserId" in df.columns else df.iloc[:0]
+        loc = [c for c in ("UserCountry", "UserContinent") if c in users.columns]
+        profile = pd.DataFrame(index=pd.Index(pd.unique(users["UserId"]) if len(users) else [], name="UserId"))
+        if loc:
+            profile = users.drop_duplicates("UserId").set_index("UserId")[loc]
+        if "VisitModeName" in users.columns:
+            modes = users.groupby(["UserId", "VisitModeName"], observed=True).size().sort_values(ascending=False)
+            modes = modes.reset_index().drop_duplicates("UserId").set_index("UserId")["VisitModeName"]
+            profile = profile.assign(VisitModeName=modes.reindex(profile.index))
+        for c in profile.columns:
+            if isinstance(profile[c].dtype, pd.CategoricalDtype):
+                profile[c] = profile[c].astype(object)
+        self.user_segments = profile
+        # plain arrays for per-request lookups (DataFrame.loc costs ~100us per call)
+        self._user_pos = {u: i for i, u in enumerate(profile.index)}
+        self._user_cols = {k: profile[c].to_numpy(dtype=object) for k, c in SEGMENT_COLS.items() if c in profile.columns}
+        return self
+
+    def user_segment(self, user_id):
+        # {"country": ..., "continent": ..., "visit_mode": ...} for a known user, {} otherwise
+        i = self._user_pos.get(user_id)
+        if i is None:
+            return {}
+        return {k: v[i] for k, v in self._user_cols.items() if pd.notna(v[i])}
+
+    def recommend(self, top_k=10, exclude=None, **segment):
+        """
+        Top-k attractions for a segment given as country=, continent=, visit_mode=
+        (any subset; missing ones are skipped). Attractions in exclude are left out.
+        """
+        unknown = set(segment) - set(SEGMENT_COLS)
+        if unknown:
+            raise TypeError(f"unknown segment keys {sorted(unknown)}; expected {sorted(SEGMENT_COLS)}")
+        if top_k <= 0:
+            return []
+        out, taken = [], set() if exclude is None else set(np.asarray(exclude).tolist())
+        for seg in self.segments:
+            if any(segment.get(k) is None for k in seg):
+                continue
+            ids = self.tables[seg].get(tuple(segment[k] for k in seg))
+            if ids is None:
+                continue
+            # stop as soon as top_k is filled; usually within the first segment
+            for a in ids.tolist():
+                if a not in taken:
+                    taken.add(a)
+                    out.append(a)
+                    if len(out) >= top_k:
+                        return out
+        return out
+
+    def save(self, path):
+        joblib.dump(self, path)
+
+    @staticmethod
+    def load(path):
+        return joblib.load(path)
+
+class TieredRecommender:
+    """
+    SVD for users with enough history, cached popularity lists for everyone else.
+
+    The known-user check is a dict lookup and the history size is read off the
+    interaction matrix's row pointers (SVDRecommender.rated_items), so new or sparse users (fewer than min_history
+    rated attractions) never reach the latent-factor path. Their segment comes from
+    the arguments, or from the visits seen at fit time for known sparse users.
+    """
+
+    def __init__(self, svd=None, popular=None, min_history=3):
+        self.svd = svd
+        self.popular = popular
+        self.min_history = min_history
+
+    def fit(self, df, n_components=50, top_n=50):
+        self.svd = SVDRecommender(n_components=n_components).fit(df)
+        self.popular = PopularityRecommender(top_n=top_n).fit(df)
+        return self
+
+    def _history(self, user_id):
+        idx = None if self.svd is None else self.svd.user_index.get(user_id)
+        if idx is None:
+            return None, 0
+        return idx, len(self.svd.rated_items(idx))
+
+    def tier(self, user_id):
+        # "svd" or "popular": which path recommend() takes for this user
+        idx, n = self._history(user_id)
+        return "svd" if idx is not None and n >= self.min_history else "popular"
+
+    def recommend(self, user_id, top_k=10, exclude_seen=False, **segment):
+        idx, n = self._history(user_id)
+        if idx is not None and n >= self.min_history:
+            return self.svd.recommend(user_id, top_k=top_k, exclude_seen=exclude_seen)
+        if self.popular is None:
+            return []
+        # caller-supplied segment wins over what was seen for a known sparse user
+        seg = {**self.popular.user_segment(user_id), **{k: v for k, v in segment.items() if v is not None}}
+        seen = self.svd.item_ids[self.svd.rated_items(idx)] if exclude_seen and idx is not None else None
+        return self.popular.recommend(top_k=top_k, exclude=seen, **seg)
+
+    def recommend_batch(self, user_ids, top_k=10, exclude_seen=False, segments=None, chunk_size=2048):
+        """
+        recommend() for many users at once; returns one list per user, in order.
+        SVD-tier users are scored together through SVDRecommender.recommend_batch;
+        segments is an optional list of per-user segment dicts for the popularity tier.
+        """
+        tiers = [self.tier(u) for u in user_ids]
+        svd_users = pd.unique(np.array([u for u, t in zip(user_ids, tiers) if t == "svd"], dtype=object))
+        ranked = {}
+        if len(svd_users):
+            for chunk in self.svd.recommend_batch(svd_users.tolist(), top_k=top_k, exclude_seen=exclude_seen,
+                                                  chunk_size=chunk_size):
+                for u, ids in chunk.groupby("UserId", sort=False)["AttractionId"]:
+                    ranked[u] = ids.tolist()
+        out = []
+        for i, (u, t) in enumerate(zip(user_ids, tiers)):
+            if t == "svd":
+                out.append(ranked.get(u, []))
+            else:
+                seg = segments[i] if segments else {}
+                out.append(self.recommend(u, top_k=top_k, exclude_seen=exclude_seen, **seg))
+        return out
+
 def simple_svd_recommender(df, user_id, n_components=50, top_k=10):
-    piv = user_item_matrix(df)
-    if user_id not in piv.index:
+    # refits on every call; prefer a prebuilt TieredRecommender for serving
+    if not (df["UserId"] == user_id).any():
         return []
-    n_comp = min(n_components, max(2, piv.shape[1]-1))
-    svd = TruncatedSVD(n_components=n_comp, random_state=42)
-    latent = svd.fit_transform(piv)
-    user_idx = list(piv.index).index(user_id)
-    user_vec = latent[user_idx]
-    sims = np.dot(latent, user_vec) / (np.linalg.norm(latent, axis=1) * (np.linalg.norm(user_vec)+1e-9))
-    sim_series = pd.Series(sims, index=piv.index)
-    weighted = (sim_series.values.reshape(-1,1) * piv.values).sum(axis=0) / (sim_series.sum()+1e-9)
-    item_scores = pd.Series(weighted, index=piv.columns).sort_values(ascending=False)
-    return item_scores.head(top_k).index.tolist()
+    return SVDRecommender(n_components=n_components).fit(df).recommend(user_id, top_k=top_k)
+
+class ItemSimilarityIndex:
+    """
+    Reusable cosine-similarity index over attraction feature vectors.
+
+    Vectors are L2-normalized once at fit time, so similarity is a plain dot product
+    and batched queries are blocked matrix products. build_neighbor_table optionally
+    precomputes the exact top-k neighbours of every item for O(1) lookups.
+    """
+
+    def __init__(self, item_feature_cols):
+        self.item_feature_cols = list(item_feature_cols)
+        self.neighbors = None
+
+    def fit(self, df):
+        items = df[["AttractionId"] + self.item_feature_cols].drop_duplicates("AttractionId").set_index("AttractionId").fillna(0)
+        vecs = items.to_numpy(dtype=np.float64)
+        norms = np.linalg.norm(vecs, axis=1, keepdims=True)
+        self.vectors = vecs / np.where(norms == 0, 1.0, norms)
+        self.item_ids = items.index.to_numpy()
+        self.item_index = {a: j for j, a in enumerate(self.item_ids)}
+        self.neighbors = None
+        return self
+
+    def _query_block(self, rows, top_k):
+        # rows: item positions; returns (len(rows), <=top_k) neighbour positions, self excluded
+        sims = self.vectors[rows] @ self.vectors.T
+        sims[np.arange(len(rows)), rows] = -np.inf
+        k = min(top_k, len(self.item_ids) - 1)
+        if k <= 0:
+            return np.empty((len(rows), 0), dtype=np.int64)
+        top = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+        order = np.argsort(-np.take_along_axis(sims, top, axis=1), axis=1, kind="stable")
+        return np.take_along_axis(top, order, axis=1)
+
+    def similar(self, item_id, top_k=10):
+        idx = self.item_index.get(item_id)
+        if idx is None:
+            return []
+        if self.neighbors is not None and top_k <= self.neighbors.shape[1]:
+            return self.item_ids[self.neighbors[idx, :top_k]].tolist()
+        return self.item_ids[self._query_block(np.array([idx]), top_k)[0]].tolist()
+
+    def similar_batch(self, item_ids, top_k=10, block_size=1024):
+        """
+        Neighbours for many items at once; returns {item_id: [neighbour ids]}.
+        Unknown ids map to an empty list.
+        """
+        out = {a: [] for a in item_ids}
+        known = [a for a in item_ids if a in self.item_index]
+        rows = np.array([self.item_index[a] for a in known], dtype=np.int64)
+        for start in range(0, len(rows), block_size):
+            nbrs = self._query_block(rows[start:start + block_size], top_k)
+            for a, n in zip(known[start:start + block_size], nbrs):
+                out[a] = self.item_ids[n].tolist()
+        return out
+
+    def build_neighbor_table(self, top_k=20, block_size=1024):
+        # exact top-k for the whole catalog, computed block by block
+        rows = np.arange(len(self.item_ids))
+        blocks = [self._query_block(rows[s:s + block_size], top_k) for s in range(0, len(rows), block_size)]
+        self.neighbors = np.vstack(blocks) if blocks else np.empty((0, 0), dtype=np.int64)
+        return self
+
+    def save(self, path):
+        joblib.dump(self, path)
+
+    @staticmethod
+    def load(path):
+        return joblib.load(path)
 
 def content_knn_recommend(df, item_id, item_feature_cols, top_k=10):
-    items = df[[ "AttractionId"] + item_feature_cols].drop_duplicates("AttractionId").set_index("AttractionId").fillna(0)
-    if item_id not in items.index:
-        return []
-    knn = NearestNeighbors(n_neighbors=min(top_k+1, len(items)), metric="cosine").fit(items.values)
-    idx = list(items.index).index(item_id)
-    dists, idxs = knn.kneighbors([items.values[idx]])
-    recs = [items.index[i] for i in idxs[0] if items.index[i] != item_id][:top_k]
-    return recs
+    # builds a throwaway index; prefer a saved ItemSimilarityIndex for repeated queries
+    return ItemSimilarityIndex(item_feature_cols).fit(df).similar(item_id, top_k=top_k)
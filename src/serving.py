@@ -0,0 +1,382 @@
+# src/serving.py
+import argparse
+import json
+import queue
+import sys
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+import joblib
+import numpy as np
+import pandas as pd
+from src.artifacts import is_artifact, load_artifact
+from src.features import AggregateStore, DEFAULT_NUMERIC_COLS, transform_features
+from src.recommenders import SEGMENT_COLS, PopularityRecommender, SVDRecommender, TieredRecommender
+
+AGGREGATE_COLS = {
+    "UserId": ("user_stats", ["user_total_visits", "user_avg_rating"]),
+    "AttractionId": ("attraction_stats", ["attraction_total_visits", "attraction_avg_rating"]),
+}
+
+def _load(path: Path, mmap: bool):
+    if not path.exists():
+        return None
+    # mmap_mode only applies to uncompressed dumps; tree arrays are then paged in lazily
+    return joblib.load(path, mmap_mode="r" if mmap else None)
+
+class LatencyRecorder:
+    """Rolling window of per-request latencies (seconds) with percentile summaries."""
+
+    def __init__(self, window=100_000):
+        self.samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def add(self, seconds, n=1):
+        with self._lock:
+            self.samples.extend([seconds] * n)
+
+    def summary(self):
+        with self._lock:
+            arr = np.fromiter(self.samples, dtype=float)
+        if arr.size == 0:
+            return {"count": 0}
+        p50, p90, p99 = (float(v) for v in np.percentile(arr, [50, 90, 99]) * 1e3)
+        return {"count": int(arr.size), "p50_ms": p50, "p90_ms": p90, "p99_ms": p99, "max_ms": float(arr.max()) * 1e3}
+
+class PredictionService:
+    """
+    Loads the regressor, classifier and encoders once and scores batches of requests.
+
+    A request is a dict with a "task" ("rating" or "visit_mode") and the feature fields
+    (VisitYear, VisitMonth, the aggregate columns and the categorical columns). Missing
+    aggregate fields are filled from the AggregateStore when UserId/AttractionId are given.
+    A "recommend" request has a UserId, an optional top_k (default 10) and, for new
+    users, optional continent/country/visit_mode (or UserContinent/UserCountry/VisitModeName).
+    Models trained on the numeric columns only are fed just those columns.
+    Latencies of predict_batch() and submit() calls are kept in self.latency.
+
+    Models come from the artifact directories train.py writes (models/regressor,
+    models/classifier) when present, else (legacy=True) from the *_joblib.pkl /
+    label_encoder.pkl / onehot_enc.pkl files shipped in models/, which take the numeric
+    columns only. With neither, predictions raise "run `python train.py` first". Nothing
+    is loaded until first use; with mmap=True model arrays are memory-mapped rather than
+    read into memory.
+    """
+
+    LEGACY = {"reg": "regressor_joblib.pkl", "clf": "classifier_joblib.pkl"}
+    ARTIFACTS = {"reg": "regressor", "clf": "classifier"}
+
+    def __init__(self, models_dir="models", mmap=True, numeric_cols=None, legacy=True):
+        self.models_dir = Path(models_dir)
+        self.mmap = mmap
+        self.legacy = legacy
+        self._numeric_cols = numeric_cols
+        self._artifacts = {k: load_artifact(self.models_dir / d, mmap=mmap)
+                           for k, d in self.ARTIFACTS.items() if is_artifact(self.models_dir / d)}
+        self._cache = {}
+        self._lock = threading.Lock()
+        self.latency = LatencyRecorder()
+        self._batcher = None
+
+    def _lazy(self, name, loader):
+        if name not in self._cache:
+            with self._lock:
+                if name not in self._cache:
+                    self._cache[name] = loader()
+        return self._cache[name]
+
+    def has(self, kind):
+        # whether a model of this kind exists, without loading it
+        return kind in self._artifacts or (self.legacy and (self.models_dir / self.LEGACY[kind]).exists())
+
+    def _model(self, kind):
+        if kind in self._artifacts:
+            return self._artifacts[kind].model
+        if not self.legacy:
+            return None
+        return self._lazy(kind, lambda: _load(self.models_dir / self.LEGACY[kind], self.mmap))
+
+    @property
+    def reg(self):
+        return self._model("reg")
+
+    @property
+    def clf(self):
+        return self._model("clf")
+
+    @property
+    def le(self):
+        if "clf" in self._artifacts and self._artifacts["clf"].label_encoder is not None:
+            return self._artifacts["clf"].label_encoder
+        if not self.legacy:
+            return None
+        return self._lazy("le", lambda: _load(self.models_dir / "label_encoder.pkl", False))
+
+    def encoder(self, kind):
+        if kind in self._artifacts:
+            return self._artifacts[kind].encoder
+        if not self.legacy:
+            return None
+        return self._lazy("enc", lambda: _load(self.models_dir / "onehot_enc.pkl", False))
+
+    def numeric_cols(self, kind):
+        if self._numeric_cols:
+            return self._numeric_cols
+        if kind in self._artifacts and self._artifacts[kind].metadata.get("numeric_cols"):
+            return self._artifacts[kind].metadata["numeric_cols"]
+        return DEFAULT_NUMERIC_COLS
+
+    @property
+    def aggregates(self):
+        path = self.models_dir / "aggregates.pkl"
+        return self._lazy("aggregates", lambda: AggregateStore.load(path) if path.exists() else None)
+
+    @property
+    def recommender(self):
+        # SVD index + popularity tier saved by train.py; None when neither exists
+        def load():
+            svd_path, popular_path = self.models_dir / "svd_recommender.pkl", self.models_dir / "popular_recs.pkl"
+            svd = SVDRecommender.load(svd_path) if svd_path.exists() else None
+            popular = PopularityRecommender.load(popular_path) if popular_path.exists() else None
+            return None if svd is None and popular is None else TieredRecommender(svd, popular)
+        return self._lazy("recommender", load)
+
+    def _fill_aggregates(self, df):
+        if self.aggregates is None:
+            return df
+        for key, (method, cols) in AGGREGATE_COLS.items():
+            if key not in df.columns:
+                continue
+            missing = [c for c in cols if c not in df.columns or df[c].isna().any()]
+            if not missing:
+                continue
+            stats = getattr(self.aggregates, method)(df[key].to_numpy())
+            for c in missing:
+                looked_up = pd.Series(stats[c].to_numpy(), index=df.index)
+                df[c] = df[c].fillna(looked_up) if c in df.columns else looked_up
+        return df
+
+    def features(self, df, kind):
+        df = self._fill_aggregates(df.copy())
+        model = self._model(kind)
+        numeric_cols = self.numeric_cols(kind)
+        if getattr(model, "n_features_in_", None) == len(numeric_cols):
+            return transform_features(df, None, numeric_cols, sparse=False).to_numpy()
+        return transform_features(df, self.encoder(kind), numeric_cols, sparse=True)
+
+    def predict_rating(self, df: pd.DataFrame) -> np.ndarray:
+        if self.reg is None:
+            raise RuntimeError("No regressor model found; run `python train.py` first")
+        return self.reg.predict(self.features(df, "reg"))
+
+    def predict_visit_mode(self, df: pd.DataFrame) -> np.ndarray:
+        if self.clf is None or self.le is None:
+            raise RuntimeError("No classifier/label encoder found; run `python train.py` first")
+        return self.le.inverse_transform(self.clf.predict(self.features(df, "clf")))
+
+    def recommend(self, df: pd.DataFrame) -> list:
+        if self.recommender is None:
+            raise RuntimeError("No recommender found; run `python train.py` first")
+        n = len(df)
+        user_ids = df["UserId"].tolist() if "UserId" in df.columns else [None] * n
+        top_k = pd.to_numeric(df["top_k"], errors="coerce").fillna(10).astype(int).to_numpy() if "top_k" in df.columns \
+            else np.full(n, 10)
+        # segment fields: a short key given in a request wins over the column name
+        seg_cols = {}
+        for key, col in SEGMENT_COLS.items():
+            values = None
+            for name in (col, key):
+                if name in df.columns:
+                    values = df[name] if values is None else df[name].where(df[name].notna(), values)
+            if values is not None:
+                seg_cols[key] = values.astype(object).where(values.notna(), None).tolist()
+        segments = [{k: v[i] for k, v in seg_cols.items()} for i in range(n)]
+        # one batched call at the largest top_k, trimmed per request
+        ranked = self.recommender.recommend_batch(user_ids, top_k=int(top_k.max()) if n else 10, segments=segments)
+        return [r[:k] for r, k in zip(ranked, top_k)]
+
+    def predict(self, records):
+        """
+        Score a list of request dicts with one model call per task.
+        Returns one result dict per record, in input order.
+        """
+        df = pd.DataFrame.from_records(records)
+        tasks = df["task"].fillna("rating") if "task" in df.columns else pd.Series("rating", index=df.index)
+        results = [None] * len(records)
+        for task, rows in tasks.groupby(tasks).groups.items():
+            sub = df.loc[rows]
+            try:
+                if task == "rating":
+                    preds = [{"rating": float(v)} for v in self.predict_rating(sub)]
+                elif task == "visit_mode":
+                    preds = [{"visit_mode": str(v)} for v in self.predict_visit_mode(sub)]
+                elif task == "recommend":
+                    preds = [{"recommendations": [_native(a) for a in r]} for r in self.recommend(sub)]
+                else:
+                    preds = [{"error": f"unknown task {task!r}"}] * len(sub)
+            except Exception as e:
+                preds = [{"error": str(e)}] * len(sub)
+            for pos, pred in zip(df.index.get_indexer(rows), preds):
+                results[pos] = {"id": _native(records[pos].get("id")), "task": task, **pred}
+        return results
+
+    def predict_batch(self, records):
+        """
+        predict() plus latency bookkeeping. Every record in the batch is answered when
+        the whole batch is, so each one is recorded with the whole-batch wall time;
+        per-request latency from enqueue to result is what submit() records.
+        """
+        t0 = time.perf_counter()
+        results = self.predict(records)
+        self.latency.add(time.perf_counter() - t0, len(records))
+        return results
+
+    def submit(self, record) -> Future:
+        # single request from any thread; coalesced with concurrent ones into one batch
+        if self._batcher is None:
+            # concurrent first calls (e.g. Streamlit threads) must not start two batcher threads
+            with self._lock:
+                if self._batcher is None:
+                    self._batcher = MicroBatcher(self.predict, latency=self.latency)
+        return self._batcher.submit(record)
+
+class MicroBatcher:
+    """
+    Coalesces concurrent single-record calls into batches for a batch function.
+    A batch is flushed when it reaches max_batch or max_wait_ms after its first record.
+    Per-record latency (queueing included) goes to the optional LatencyRecorder.
+    """
+
+    def __init__(self, batch_fn, max_batch=256, max_wait_ms=2.0, latency=None):
+        self.batch_fn = batch_fn
+        self.latency = latency
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, record) -> Future:
+        fut = Future()
+        self._queue.put((record, fut, time.perf_counter()))
+        return fut
+
+    def _run(self):
+        while True:
+            items = [self._queue.get()]
+            deadline = time.perf_counter() + self.max_wait
+            while len(items) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    items.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                out = self.batch_fn([r for r, _, _ in items])
+            except Exception as e:
+                for _, fut, _ in items:
+                    fut.set_exception(e)
+                continue
+            done = time.perf_counter()
+            for (_, fut, t0), res in zip(items, out):
+                if self.latency is not None:
+                    self.latency.add(done - t0)
+                fut.set_result(res)
+
+def _native(value):
+    # numpy scalars (CSV input, model ids) -> plain Python for json.dumps
+    return value.item() if isinstance(value, np.generic) else value
+
+def iter_jsonl(path, batch_size):
+    batch = []
+    with open(path) as fh:
+        for line in fh:
+            if line.strip():
+                batch.append(json.loads(line))
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+    if batch:
+        yield batch
+
+def iter_csv(path, batch_size):
+    # same batches as iter_jsonl from a CSV with one request per row; empty cells are None
+    for chunk in pd.read_csv(path, chunksize=batch_size):
+        chunk = chunk.astype(object).where(chunk.notna(), None)
+        yield chunk.to_dict("records")
+
+def iter_requests(path, batch_size):
+    return iter_csv(path, batch_size) if str(path).endswith(".csv") else iter_jsonl(path, batch_size)
+
+_WORKER = {}
+
+def _init_worker(models_dir, mmap):
+    _WORKER["service"] = PredictionService(models_dir, mmap=mmap)
+
+def _score_batch(batch):
+    """Score one batch in a worker process; returns (results, seconds spent scoring)."""
+    t0 = time.perf_counter()
+    results = _WORKER["service"].predict(batch)
+    return results, time.perf_counter() - t0
+
+def score_stream(batches, models_dir="models", n_jobs=1, mmap=True, max_in_flight=None):
+    """
+    Score an iterable of request batches, yielding (results, seconds) per batch in
+    input order. With n_jobs > 1 batches go to worker processes, each holding its own
+    PredictionService (model arrays are memory-mapped, so workers share the pages);
+    at most max_in_flight batches (default 2 per worker) are read ahead, so input is
+    streamed rather than loaded up front.
+    """
+    if n_jobs <= 1:
+        _init_worker(models_dir, mmap)
+        for batch in batches:
+            yield _score_batch(batch)
+        return
+    max_in_flight = max_in_flight or 2 * n_jobs
+    with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker, initargs=(str(models_dir), mmap)) as pool:
+        pending = deque()
+        for batch in batches:
+            pending.append(pool.submit(_score_batch, batch))
+            if len(pending) >= max_in_flight:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+def main():
+    parser = argparse.ArgumentParser(description="Score a JSONL or CSV file of rating / visit-mode / recommend requests.")
+    parser.add_argument("requests", help="JSONL file (one request object per line) or .csv (one request per row)")
+    parser.add_argument("--out", default="-", help="output JSONL (default stdout)")
+    parser.add_argument("--models-dir", default="models")
+    parser.add_argument("--batch-size", type=int, default=1024)
+    parser.add_argument("--jobs", type=int, default=1, help="worker processes scoring batches in parallel")
+    parser.add_argument("--no-mmap", action="store_true", help="read model arrays into memory instead of memory-mapping")
+    args = parser.parse_args()
+
+    latency = LatencyRecorder()
+    tasks, errors = Counter(), 0
+    out = open(args.out, "w") if args.out != "-" else sys.stdout
+    n = 0
+    t0 = time.perf_counter()
+    try:
+        for results, seconds in score_stream(iter_requests(args.requests, args.batch_size), args.models_dir,
+                                             n_jobs=args.jobs, mmap=not args.no_mmap):
+            out.writelines(json.dumps(res) + "\n" for res in results)
+            latency.add(seconds, len(results))
+            tasks.update(res["task"] for res in results)
+            errors += sum("error" in res for res in results)
+            n += len(results)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    elapsed = time.perf_counter() - t0
+    # latency is per-batch scoring time (model loading on the first batch included)
+    stats = {"requests": n, "jobs": args.jobs, "elapsed_s": elapsed, "per_second": n / elapsed if elapsed else None,
+             "tasks": dict(tasks), "errors": errors, **latency.summary()}
+    print(json.dumps(stats), file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
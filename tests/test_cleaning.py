@@ -0,0 +1,24 @@
+# tests/test_cleaning.py
+import pandas as pd
+from src.cleaning import drop_low_information_cols
+
+def _frame(n, tail):
+    # "Flag" is constant in the first rows; only the tail decides whether it is dropped
+    return pd.DataFrame({"Id": range(n), "Flag": ["a"] * (n - len(tail)) + tail})
+
+def test_profile_not_reused_without_data_key(tmp_path):
+    path = tmp_path / "profile.json"
+    n = 5000
+    assert "Flag" not in drop_low_information_cols(_frame(n, []), profile_path=path).columns
+    # same shape and dtypes, different contents outside any probe of the first rows
+    changed = _frame(n, ["b"] * 1000)
+    assert "Flag" in drop_low_information_cols(changed, profile_path=path).columns
+
+def test_profile_reused_for_the_same_data_key(tmp_path):
+    path = tmp_path / "profile.json"
+    n = 5000
+    drop_low_information_cols(_frame(n, []), profile_path=path, data_key="v1")
+    changed = _frame(n, ["b"] * 1000)
+    # the caller vouches the data is unchanged, so the saved decision stands
+    assert "Flag" not in drop_low_information_cols(changed, profile_path=path, data_key="v1").columns
+    assert "Flag" in drop_low_information_cols(changed, profile_path=path, data_key="v2").columns
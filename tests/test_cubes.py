@@ -0,0 +1,40 @@
+# tests/test_cubes.py
+import numpy as np
+import pandas as pd
+from src.cubes import PopularityCubes
+
+def _visits():
+    return pd.DataFrame({
+        "AttractionId": [1, 1, 1, 1, 2],
+        "VisitYear": [2020, 2020, pd.NA, 2021, 2020],
+        "VisitMonth": [1, 1, 3, pd.NA, 2],
+        "VisitModeName": ["Family", "Couples", "Family", "Solo", "Family"],
+        "UserContinent": ["Asia", "Asia", "Europe", "Asia", "Asia"],
+        "Rating": [5, 3, 4, 2, 1],
+        "Attraction": ["A", "A", "A", "A", "B"],
+    })
+
+def test_trend_drops_visits_without_a_period():
+    trend = PopularityCubes.from_frame(_visits()).trend(1)
+    assert list(trend.index) == [(2020, 1)]
+    assert trend["visits"].tolist() == [2]
+    assert trend["avg_rating"].tolist() == [4.0]
+    # the app's chart labels must build for every remaining period
+    assert [f"{int(y)}-{int(m):02d}" for y, m in trend.index] == ["2020-01"]
+
+def test_top_attractions_counts_visits_without_a_period():
+    top = PopularityCubes.from_frame(_visits()).top_attractions(2)
+    assert top["AttractionId"].tolist() == [1, 2]
+    assert top["visits"].tolist() == [4, 1]
+
+def test_chunked_updates_match_one_pass():
+    visits = pd.concat([_visits()] * 3, ignore_index=True)
+    visits.loc[5, "Rating"] = np.nan
+    whole = PopularityCubes.from_frame(visits)
+    chunked = PopularityCubes()
+    for start in range(0, len(visits), 4):
+        chunked.update(visits.iloc[start:start + 4])
+    pd.testing.assert_frame_equal(chunked.cube, whole.cube)
+    pd.testing.assert_frame_equal(chunked.attractions, whole.attractions)
+    assert chunked.top_attractions(2)["visits"].tolist() == [12, 3]
+    assert chunked.levels("VisitModeName") == ["Couples", "Family", "Solo"]
@@ -0,0 +1,136 @@
+# tests/test_data_loader.py
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("pyarrow")
+from src.data_loader import ChunkedParquetWriter
+
+def test_chunked_writer_first_chunk_all_nan_string_column(tmp_path):
+    # an unmatched lookup leaves UserCityName all-NaN (float64) in the first chunk only
+    path = tmp_path / "out.parquet"
+    with ChunkedParquetWriter(path) as writer:
+        writer.write(pd.DataFrame({"UserId": [1, 2], "UserCityName": [np.nan, np.nan]}))
+        writer.write(pd.DataFrame({"UserId": [3], "UserCityName": ["Bali"]}))
+    out = pd.read_parquet(path)
+    assert out["UserId"].tolist() == [1.0, 2.0, 3.0]
+    assert out["UserCityName"].isna().tolist() == [True, True, False]
+    assert out["UserCityName"].iloc[2] == "Bali"
+
+def test_chunked_writer_explicit_string_cols(tmp_path):
+    path = tmp_path / "out.parquet"
+    with ChunkedParquetWriter(path, string_cols=["Code"]) as writer:
+        writer.write(pd.DataFrame({"Code": [1.5, np.nan]}))
+        writer.write(pd.DataFrame({"Code": ["x"]}))
+    assert pd.read_parquet(path)["Code"].tolist()[2] == "x"
+
+def _item_workbooks(d, updated_name):
+    pd.DataFrame({"AttractionId": [1, 2], "Attraction": ["Attraction 1", "Attraction 2"]}).to_excel(d / "Item.xlsx", index=False)
+    pd.DataFrame({"AttractionId": [1], "Attraction": [updated_name]}).to_excel(d / "Updated_Item.xlsx", index=False)
+
+def test_load_raw_ignores_item_merged_older_than_sources(tmp_path):
+    import os
+    from src.data_loader import load_raw
+    _item_workbooks(tmp_path, "Attraction 1 (upd)")
+    pd.DataFrame({"AttractionId": [1], "Attraction": ["Attraction 1 (old)"]}).to_excel(tmp_path / "Item_merged.xlsx", index=False)
+    past = (tmp_path / "Item.xlsx").stat().st_mtime - 60
+    os.utime(tmp_path / "Item_merged.xlsx", (past, past))
+    items = load_raw(tmp_path, include_tx=False)["items"]
+    assert items.set_index("AttractionId")["Attraction"].to_dict() == {2: "Attraction 2", 1: "Attraction 1 (upd)"}
+
+def test_load_raw_uses_item_merged_newer_than_sources(tmp_path):
+    import os
+    from src.data_loader import load_raw
+    _item_workbooks(tmp_path, "Attraction 1 (upd)")
+    pd.DataFrame({"AttractionId": [1], "Attraction": ["merged"]}).to_excel(tmp_path / "Item_merged.xlsx", index=False)
+    future = (tmp_path / "Updated_Item.xlsx").stat().st_mtime + 60
+    os.utime(tmp_path / "Item_merged.xlsx", (future, future))
+    assert load_raw(tmp_path, include_tx=False)["items"]["Attraction"].tolist() == ["merged"]
+
+def _transactions(d, n=25):
+    rating = np.arange(n) % 5 + 1.0
+    rating[22] = np.nan  # only the last chunk has a gap, so its column parses as float
+    tx = pd.DataFrame({"TransactionId": np.arange(n), "UserId": np.arange(n) % 7, "Rating": rating})
+    tx.to_excel(d / "Transaction.xlsx", index=False)
+    return tx
+
+def test_iter_transactions_writes_cache_chunk_by_chunk(tmp_path):
+    from src.data_loader import _cache_path, iter_transactions, load_raw
+    tx = _transactions(tmp_path)
+    target = _cache_path(tmp_path / "Transaction.xlsx", tmp_path / ".cache")
+    chunks = iter_transactions(tmp_path, chunk_size=10)
+    first = next(chunks)
+    # the first chunk is handed out before the rest of the workbook is parsed or cached
+    assert len(first) == 10 and not target.exists()
+    cold = pd.concat([first, *chunks], ignore_index=True)
+    assert target.exists()
+    warm = pd.concat(iter_transactions(tmp_path, chunk_size=10), ignore_index=True)
+    for out in (cold, warm, load_raw(tmp_path)["tx"]):
+        assert out["TransactionId"].tolist() == tx["TransactionId"].tolist()
+        np.testing.assert_array_equal(out["Rating"].to_numpy(dtype=float), tx["Rating"].to_numpy())
+
+def test_iter_transactions_abandoned_read_leaves_no_cache(tmp_path):
+    from src.data_loader import _cache_path, iter_transactions
+    _transactions(tmp_path)
+    chunks = iter_transactions(tmp_path, chunk_size=10)
+    next(chunks)
+    chunks.close()
+    assert not _cache_path(tmp_path / "Transaction.xlsx", tmp_path / ".cache").exists()
+    assert not list((tmp_path / ".cache").glob("*.tmp"))
+
+def test_load_raw_cache_invalidated_when_workbook_edited(tmp_path):
+    import os
+    from src.data_loader import _cache_path, load_raw
+    pd.DataFrame({"UserId": [1, 2], "CityId": [10, 20]}).to_excel(tmp_path / "User.xlsx", index=False)
+    first = load_raw(tmp_path, include_tx=False)["users"]
+    old_entry = _cache_path(tmp_path / "User.xlsx", tmp_path / ".cache")
+    assert first["CityId"].tolist() == [10, 20] and old_entry.exists()
+    pd.DataFrame({"UserId": [1, 2, 3], "CityId": [10, 21, 30]}).to_excel(tmp_path / "User.xlsx", index=False)
+    later = old_entry.stat().st_mtime + 60  # same-second edits must still change the key
+    os.utime(tmp_path / "User.xlsx", (later, later))
+    assert load_raw(tmp_path, include_tx=False)["users"]["CityId"].tolist() == [10, 21, 30]
+    # the stale entry is replaced, not kept alongside the new one
+    assert not old_entry.exists()
+    assert len(list((tmp_path / ".cache").glob("User-*.arrow"))) == 1
+
+def _merge_reference(dfs):
+    # the merge-based build_consolidated this module used before the array-indexed version
+    dfs = {k: v.copy() for k, v in dfs.items()}
+    tx, users, items = dfs["tx"], dfs["users"], dfs["items"]
+    city, country, atype, mode = dfs["city"], dfs["country"], dfs["type"], dfs["mode"]
+    users["UserCityName"] = users["CityId"].map(dict(zip(city["CityId"], city["CityName"])))
+    users["UserCountry"] = users["CountryId"].map(dict(zip(country["CountryId"], country["Country"])))
+    items["AttractionCityName"] = items["AttractionCityId"].map(dict(zip(city["CityId"], city["CityName"])))
+    items["AttractionCountryId"] = items["AttractionCityId"].map(dict(zip(city["CityId"], city["CountryId"])))
+    items["AttractionCountry"] = items["AttractionCountryId"].map(dict(zip(country["CountryId"], country["Country"])))
+    items["AttractionType"] = items["AttractionTypeId"].map(dict(zip(atype["AttractionTypeId"], atype["AttractionType"])))
+    tx["VisitModeName"] = tx["VisitMode"].map(dict(zip(mode["VisitModeId"], mode["VisitMode"])))
+    df = tx.merge(users, on="UserId", how="left").merge(items, on="AttractionId", how="left")
+    df = df.dropna(subset=["UserId", "AttractionId", "Rating"])
+    df["Rating"] = pd.to_numeric(df["Rating"], errors="coerce")
+    return df.dropna(subset=["Rating"])
+
+def test_build_consolidated_matches_merge_with_gaps_and_unmatched_ids():
+    from src.data_loader import build_consolidated
+    dfs = {
+        # NaN user, unknown user/item/mode ids, a NaN and an unparseable rating
+        "tx": pd.DataFrame({"TransactionId": range(7), "UserId": [1, 2, np.nan, 9, 1, 2, 3],
+                            "AttractionId": [100, 101, 100, 100, 999, 101, 100],
+                            "VisitMode": [1, 2, 1, 7, 2, np.nan, 1],
+                            "Rating": [5, "bad", 4, 3, 2, np.nan, 1]}),
+        "users": pd.DataFrame({"UserId": [1, 2, 3], "CityId": [10, 99, np.nan], "CountryId": [1, 2, 5]}),
+        "items": pd.DataFrame({"AttractionId": [100, 101], "AttractionCityId": [10, 11],
+                               "AttractionTypeId": [1, 8], "Attraction": ["Beach", "Temple"]}),
+        "city": pd.DataFrame({"CityId": [10, 11], "CityName": ["Bali", "Ubud"], "CountryId": [1, 3]}),
+        "country": pd.DataFrame({"CountryId": [1, 2], "Country": ["Indonesia", "France"]}),
+        "type": pd.DataFrame({"AttractionTypeId": [1], "AttractionType": ["Beaches"]}),
+        "mode": pd.DataFrame({"VisitModeId": [1, 2], "VisitMode": ["Business", "Couples"]}),
+    }
+    before = {k: v.copy() for k, v in dfs.items()}
+    out = build_consolidated(dfs)
+    expected = _merge_reference(dfs)
+    assert out["TransactionId"].tolist() == [0, 3, 4, 6]
+    pd.testing.assert_frame_equal(out, expected)
+    # inputs are not modified
+    for k, v in before.items():
+        pd.testing.assert_frame_equal(dfs[k], v)
@@ -0,0 +1,21 @@
+# tests/test_eval.py
+import numpy as np
+from src.eval import precision_at_k, ranking_metrics
+
+def test_ranking_metrics_hand_computed():
+    # k=3; user 0 hits ranks 1 and 3 of 2 relevant, user 1 misses, user 2 hits rank 2 of 5
+    hits = np.array([[1, 0, 1], [0, 0, 0], [0, 1, 0]], dtype=bool)
+    m = ranking_metrics(hits, np.array([2, 1, 5]))
+    np.testing.assert_allclose(m["precision"], [2 / 3, 0, 1 / 3])
+    np.testing.assert_allclose(m["recall"], [1.0, 0, 1 / 5])
+    # DCG / IDCG with the ideal list capped at min(n_relevant, k)
+    ndcg0 = (1 + 1 / np.log2(4)) / (1 + 1 / np.log2(3))
+    ndcg2 = (1 / np.log2(3)) / (1 + 1 / np.log2(3) + 1 / np.log2(4))
+    np.testing.assert_allclose(m["ndcg"], [ndcg0, 0, ndcg2])
+    # AP@k: precision at each hit, over min(n_relevant, k)
+    np.testing.assert_allclose(m["map"], [(1 + 2 / 3) / 2, 0, (1 / 2) / 3])
+
+def test_ranking_metrics_precision_matches_single_list_version():
+    recommended, actual = [5, 3, 9, 1], [9, 5, 7]
+    hits = np.isin(recommended, actual)[None, :]
+    assert ranking_metrics(hits, [len(actual)])["precision"][0] == precision_at_k(recommended, actual, k=4)
@@ -0,0 +1,17 @@
+# tests/test_features.py
+import numpy as np
+import pandas as pd
+from src.features import AggregateStore
+
+def _visits(users, items, ratings):
+    return pd.DataFrame({"TransactionId": np.arange(len(users)), "UserId": users, "AttractionId": items, "Rating": ratings})
+
+def test_aggregate_store_chunked_updates_match_full_build():
+    df = _visits([1, 2, 1, 3, 2, 4], [10, 10, 11, 12, 11, 10], [5, 4, np.nan, 3, 2, 1])
+    store = AggregateStore().update(df.iloc[:3]).update(df.iloc[3:])
+    full = AggregateStore.from_frame(df)
+    for kind in ("user", "attraction"):
+        pd.testing.assert_frame_equal(store.final()[kind].sort_index(), full.final()[kind].sort_index())
+    stats = store.user_stats([1, 99])
+    assert stats["user_total_visits"].tolist() == [2, 0]
+    assert stats["user_avg_rating"].iloc[0] == 5.0 and np.isnan(stats["user_avg_rating"].iloc[1])
@@ -0,0 +1,63 @@
+# tests/test_recommenders.py
+import numpy as np
+import pandas as pd
+from src.recommenders import SVDRecommender, TieredRecommender
+
+def _visits(n, n_users, n_items, seed):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "UserId": rng.integers(0, n_users, n),
+        "AttractionId": rng.integers(0, n_items, n),
+        "Rating": rng.integers(1, 6, n).astype(float),
+    })
+
+def test_update_matches_refolding_the_merged_matrix():
+    base = _visits(3000, 300, 40, seed=0)
+    svd = SVDRecommender(n_components=8).fit(base)
+    deltas = [_visits(30, 330, 45, seed=s) for s in range(1, 12)]
+    for d in deltas:
+        svd.update(d)
+    # rows still pending and the merged matrix agree with the means of all visits
+    seen = svd._rows(np.arange(len(svd.user_ids))).toarray()
+    means = pd.concat([base] + deltas).groupby(["UserId", "AttractionId"])["Rating"].mean()
+    expected = np.zeros_like(seen)
+    expected[[svd.user_index[u] for u in means.index.get_level_values(0)],
+             [svd.item_index[a] for a in means.index.get_level_values(1)]] = means.to_numpy()
+    np.testing.assert_allclose(seen, expected)
+    np.testing.assert_allclose(svd.interactions.toarray(), expected)
+    assert not svd._pending
+    # item_factors / sim_norm stay the fold of the full matrix onto the user factors
+    np.testing.assert_allclose(svd.item_factors, (svd.interactions.T @ svd.user_factors).T, atol=1e-9)
+    np.testing.assert_allclose(svd.sim_norm, svd.user_factors.sum(axis=0), atol=1e-9)
+
+def test_update_rows_are_served_before_a_merge():
+    svd = SVDRecommender(n_components=8).fit(_visits(3000, 300, 40, seed=0))
+    svd.update(pd.DataFrame({"UserId": [1000, 1000, 1000], "AttractionId": [3, 4, 99], "Rating": [5.0, 4.0, 5.0]}))
+    assert svd.user_index[1000] in svd._pending
+    assert sorted(svd.item_ids[svd.rated_items(svd.user_index[1000])].tolist()) == [3, 4, 99]
+    assert not {3, 4, 99} & set(svd.recommend(1000, top_k=10, exclude_seen=True))
+    assert TieredRecommender(svd=svd).tier(1000) == "svd"
+
+def _segmented_visits():
+    # users 0-9 in France with many visits each; user 20 is known but has one visit
+    rng = np.random.default_rng(3)
+    rows = [(u, a, "France", "Europe", "Couples") for u in range(10) for a in rng.choice(6, 4, replace=False)]
+    rows += [(u, 100 + u % 2, "Japan", "Asia", "Business") for u in range(10, 16)]
+    rows += [(20, 100, "Japan", "Asia", "Business")]
+    df = pd.DataFrame(rows, columns=["UserId", "AttractionId", "UserCountry", "UserContinent", "VisitModeName"])
+    return df.assign(Rating=4.0)
+
+def test_tiered_unknown_users_fall_back_to_popularity():
+    df = _segmented_visits()
+    rec = TieredRecommender(min_history=3).fit(df, n_components=2, top_n=5)
+    japan = rec.popular.recommend(top_k=3, country="Japan")
+    assert japan[:2] == [100, 101]
+    assert rec.tier(999) == "popular" and rec.tier(20) == "popular" and rec.tier(0) == "svd"
+    # unknown user: caller-supplied segment first, the global list fills the rest
+    assert rec.recommend(999, top_k=3, country="Japan") == japan
+    assert rec.recommend(999, top_k=3) == rec.popular.recommend(top_k=3)
+    # known sparse user: segment from fit time, and exclude_seen drops their visit
+    assert rec.recommend(20, top_k=3) == japan
+    assert 100 not in rec.recommend(20, top_k=3, exclude_seen=True)
+    batch = rec.recommend_batch([999, 20, 0], top_k=3, segments=[{"country": "Japan"}, {}, {}])
+    assert batch == [japan, japan, rec.recommend(0, top_k=3)]
@@ -0,0 +1,63 @@
+# tests/test_serving.py
+import json
+import threading
+import time
+import src.serving as serving
+from src.serving import PredictionService
+
+def test_submit_starts_one_batcher_under_concurrency(tmp_path, monkeypatch):
+    created = []
+    real = serving.MicroBatcher
+
+    class SlowBatcher(real):
+        def __init__(self, *args, **kwargs):
+            time.sleep(0.05)  # widen the race window
+            created.append(self)
+            super().__init__(*args, **kwargs)
+
+    monkeypatch.setattr(serving, "MicroBatcher", SlowBatcher)
+    service = PredictionService(tmp_path)
+    service.predict = lambda records: [{"id": r["id"]} for r in records]
+    futures = []
+    threads = [threading.Thread(target=lambda i=i: futures.append(service.submit({"id": i}))) for i in range(16)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(created) == 1
+    assert sorted(f.result(timeout=5)["id"] for f in futures) == list(range(16))
+
+REQUESTS = [
+    {"id": 1, "task": "rating", "VisitYear": 2022, "VisitMonth": 7, "user_total_visits": 3,
+     "attraction_total_visits": 120, "user_avg_rating": 4.0, "attraction_avg_rating": 4.2},
+    {"id": 2, "task": "visit_mode", "VisitYear": 2021, "VisitMonth": 1, "user_total_visits": 1,
+     "attraction_total_visits": 10, "user_avg_rating": 3.0, "attraction_avg_rating": 3.5},
+    {"id": 3, "task": "teleport"},
+    {"id": 4, "task": "rating", "VisitYear": 2020, "VisitMonth": 12, "user_total_visits": 8,
+     "attraction_total_visits": 40, "user_avg_rating": 2.5, "attraction_avg_rating": 3.9},
+]
+
+def _run_cli(monkeypatch, capsys, path, out, *extra):
+    from pathlib import Path
+    models = Path(__file__).resolve().parents[1] / "models"
+    monkeypatch.setattr("sys.argv", ["serving", str(path), "--out", str(out), "--models-dir", str(models),
+                                     "--batch-size", "3", *extra])
+    serving.main()
+    stats = json.loads(capsys.readouterr().err)
+    with open(out) as fh:
+        return [json.loads(line) for line in fh], stats
+
+def test_cli_scores_jsonl_and_csv_alike(tmp_path, monkeypatch, capsys):
+    import pandas as pd
+    jsonl, csv = tmp_path / "requests.jsonl", tmp_path / "requests.csv"
+    jsonl.write_text("".join(json.dumps(r) + "\n" for r in REQUESTS))
+    pd.DataFrame(REQUESTS).to_csv(csv, index=False)
+    from_jsonl, stats = _run_cli(monkeypatch, capsys, jsonl, tmp_path / "a.jsonl")
+    from_csv, _ = _run_cli(monkeypatch, capsys, csv, tmp_path / "b.jsonl", "--jobs", "2")
+    # one result per request, in input order, across batch boundaries
+    assert [(r["id"], r["task"]) for r in from_jsonl] == [(r["id"], r["task"]) for r in REQUESTS]
+    assert isinstance(from_jsonl[0]["rating"], float) and isinstance(from_jsonl[1]["visit_mode"], str)
+    assert "error" in from_jsonl[2]
+    assert from_csv == from_jsonl
+    assert stats["requests"] == 4 and stats["errors"] == 1
+    assert stats["tasks"] == {"rating": 2, "visit_mode": 1, "teleport": 1}
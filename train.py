@@ -1,45 +1,207 @@
 # train.py
-from src.data_loader import load_raw, build_consolidated, merge_updated_item
-from src.cleaning import basic_clean
-from src.features import add_aggregates, create_basic_feature_matrix, label_encode_visitmode
-from src.modeling import train_regression, train_classification
+from src.data_loader import load_raw, build_consolidated, merge_updated_item, iter_transactions, ChunkedParquetWriter
+from src.cleaning import basic_clean, optimize_dtypes, memory_usage_mb
+from src.features import AggregateStore, attach_aggregates, create_basic_feature_matrix, feature_names, label_encode_visitmode
+from src.modeling import train_regression, train_classification, dense_for_trees
+from src.recommenders import SVDRecommender, PopularityRecommender
+from src.profiling import StageProfiler, row_count
+from src import model_selection
+from src.artifacts import data_hash, save_artifact
+from src.cubes import PopularityCubes
+import pandas as pd
+import argparse
 import joblib
 from pathlib import Path
 import os
 
+NUMERIC_COLS = ["VisitYear", "VisitMonth", "user_total_visits", "attraction_total_visits", "user_avg_rating", "attraction_avg_rating"]
+CATEGORICAL_COLS = ["AttractionType", "UserContinent", "UserCountry", "VisitModeName"]
+
+AGGREGATES_PATH = "models/aggregates.pkl"
+CUBES_PATH = "models/cubes.pkl"
+POPULAR_PATH = "models/popular_recs.pkl"
+
+def stream_clean(data_dir, out_path, chunk_size):
+    """
+    Chunked version of load_raw -> build_consolidated -> basic_clean -> add_aggregates.
+    Pass 1 cleans each transaction chunk, spills it to a temporary Parquet file and folds
+    it into an AggregateStore and PopularityCubes. Pass 2 re-reads the spill one row group
+    at a time, attaches the final aggregates and writes out_path. Peak memory follows
+    chunk_size. Returns (store, cubes).
+    """
+    import pyarrow.parquet as pq
+    lookups = load_raw(data_dir, include_tx=False, n_jobs=None)
+    spill = Path(str(out_path) + ".partial")
+    store = AggregateStore()
+    cubes = PopularityCubes()
+    with ChunkedParquetWriter(spill) as writer:
+        for tx in iter_transactions(data_dir, chunk_size=chunk_size):
+            chunk = basic_clean(build_consolidated({**lookups, "tx": tx}))
+            if chunk.empty:
+                continue
+            store.update(chunk)
+            cubes.update(chunk)
+            writer.write(chunk)
+    if writer.rows == 0:
+        spill.unlink(missing_ok=True)
+        raise RuntimeError(f"No transactions found in {data_dir}")
+
+    final = store.final()
+    with ChunkedParquetWriter(out_path) as writer:
+        for batch in pq.ParquetFile(spill).iter_batches(batch_size=chunk_size):
+            writer.write(attach_aggregates(batch.to_pandas(), final))
+    spill.unlink()
+    return store, cubes
+
+def _optimize(df, prof):
+    # narrow ids/ratings and categorize repeated strings; before/after MiB go to the profile
+    with prof.stage("optimize_dtypes", rows=len(df)) as rec:
+        rec["memory_before_mb"] = memory_usage_mb(df)
+        df = optimize_dtypes(df)
+        rec["memory_after_mb"] = memory_usage_mb(df)
+    print(f"Frame memory: {rec['memory_before_mb']:.1f} MiB -> {rec['memory_after_mb']:.1f} MiB "
+          f"({rec['memory_before_mb'] / max(rec['memory_after_mb'], 1e-9):.1f}x smaller)")
+    return df
+
+def _select(task, X, y, max_loss, args, prof):
+    """
+    Run model_selection.search for one task and save its leaderboard under models/.
+    Returns the estimator to train, or None to keep the --model choice.
+    """
+    with prof.stage(f"model_selection_{task}", rows=row_count(X)):
+        # search on the layout the final fit will get
+        board = model_selection.search(dense_for_trees(X) if args.dense else X, y, task=task, n_splits=args.cv)
+    path = f"models/leaderboard_{task}.csv"
+    board.to_csv(path, index=False)
+    print(board.to_string())
+    print(f"Saved leaderboard to {path}")
+    if max_loss is None:
+        return None
+    row = model_selection.select_fastest(board, max_loss)
+    if row is None:
+        print(f"No {task} configuration meets the target; keeping --model {args.model}")
+        return None
+    print(f"Selected {row['model']} {row['params']} ({row['metric']} {row['loss_mean']:.4f})")
+    return model_selection.build_model(row, task)
+
+def _family(task, args):
+    # --model: None keeps the default random forest in train_regression/train_classification
+    return None if args.model == "random_forest" else model_selection.family_model(args.model, task)
+
 def main():
+    parser = argparse.ArgumentParser(description="Clean the raw data and train the models.")
+    parser.add_argument("--stream", action="store_true", help="process transactions in chunks (larger-than-RAM data)")
+    parser.add_argument("--chunk-size", type=int, default=500_000)
+    parser.add_argument("--profile", default=None, help="write a per-stage JSON timing/memory report to this path")
+    parser.add_argument("--trace-memory", action="store_true", help="also record per-stage traced peak memory (slower)")
+    parser.add_argument("--model", choices=["random_forest", "lightgbm", "xgboost"], default="random_forest",
+                        help="model family to train when --select does not pick one (lightgbm/xgboost fit the CSR directly)")
+    parser.add_argument("--dense", action="store_true",
+                        help="densify the feature matrix to float32 before fitting (faster forests, memory ~ rows x features)")
+    parser.add_argument("--compact", action="store_true",
+                        help="save random forests as memory-mapped node arrays (fast load, slower bulk predict)")
+    parser.add_argument("--select", action="store_true", help="cross-validate RF/LightGBM/XGBoost grids and write leaderboards")
+    parser.add_argument("--cv", type=int, default=5, help="folds for --select")
+    parser.add_argument("--target-rmse", type=float, default=None, help="with --select: train the fastest config within this RMSE")
+    parser.add_argument("--target-accuracy", type=float, default=None, help="with --select: same for the visit-mode classifier")
+    args = parser.parse_args()
+
+    prof = StageProfiler(trace_memory=args.trace_memory, meta={"mode": "stream" if args.stream else "memory"})
     data_dir = "data"
     Path("models").mkdir(exist_ok=True)
     # Ensure merged items
-    merge_updated_item(data_dir)
-    dfs = load_raw(data_dir)
-    df = build_consolidated(dfs)
-    df = basic_clean(df)
-    df = add_aggregates(df)
-
-    # Save cleaned dataset
-    df.to_csv(Path(data_dir)/"cleaned_tourism_with_updated_items.csv", index=False)
-    print("Saved cleaned dataset to data/cleaned_tourism_with_updated_items.csv")
-
-    # Features for regression (simple starter)
-    numeric_cols = ["VisitYear", "VisitMonth", "user_total_visits", "attraction_total_visits", "user_avg_rating", "attraction_avg_rating"]
-    categorical_cols = ["AttractionType", "UserContinent", "UserCountry", "VisitModeName"]
-    X, enc = create_basic_feature_matrix(df, categorical_cols=categorical_cols, numeric_cols=numeric_cols)
+    with prof.stage("merge_updated_item") as rec:
+        rec["rows"] = row_count(merge_updated_item(data_dir))
+    numeric_cols = NUMERIC_COLS
+    categorical_cols = CATEGORICAL_COLS
+
+    if args.stream:
+        out_path = Path(data_dir)/"cleaned_tourism_with_updated_items.parquet"
+        with prof.stage("stream_clean") as rec:
+            store, cubes = stream_clean(data_dir, out_path, args.chunk_size)
+        print(f"Saved cleaned dataset to {out_path}")
+        # training only needs a handful of columns; never load the full cleaned frame
+        with prof.stage("read_cleaned") as rec:
+            df = pd.read_parquet(out_path, columns=["UserId", "AttractionId", "Rating"] + numeric_cols + categorical_cols)
+            rec["rows"] = len(df)
+        df = _optimize(df, prof)
+    else:
+        with prof.stage("load_raw") as rec:
+            # one parser process per CPU on a cold cache
+            dfs = load_raw(data_dir, n_jobs=None)
+            rec["rows"] = row_count(dfs["tx"])
+        with prof.stage("build_consolidated") as rec:
+            df = build_consolidated(dfs)
+            rec["rows"] = len(df)
+        with prof.stage("basic_clean", rows=len(df)):
+            df = basic_clean(df)
+        df = _optimize(df, prof)
+        with prof.stage("add_aggregates", rows=len(df)):
+            store = AggregateStore.from_frame(df)
+            df = store.attach(df)
+        with prof.stage("build_cubes", rows=len(df)) as rec:
+            cubes = PopularityCubes.from_frame(df)
+            rec["cells"] = len(cubes.cube)
+
+        # Save cleaned dataset
+        with prof.stage("save_cleaned", rows=len(df)):
+            df.to_csv(Path(data_dir)/"cleaned_tourism_with_updated_items.csv", index=False)
+        print("Saved cleaned dataset to data/cleaned_tourism_with_updated_items.csv")
+
+    # aggregates are served from this store by the app; later batches can update() it
+    store.save(AGGREGATES_PATH)
+    print(f"Saved aggregate store to {AGGREGATES_PATH}")
+    # popularity / trend cubes and attraction metadata for the dashboard
+    cubes.save(CUBES_PATH)
+    print(f"Saved popularity cubes to {CUBES_PATH}")
+
+    # Features: one sparse [numeric | one-hot] matrix shared by both tasks
+    with prof.stage("create_basic_feature_matrix", rows=len(df)):
+        X, enc = create_basic_feature_matrix(df, categorical_cols=categorical_cols, numeric_cols=numeric_cols, sparse=True)
     y = df["Rating"]
 
+    reg_choice = (_select("regression", X, y, args.target_rmse, args, prof) if args.select else None) or _family("regression", args)
+
     # train regression
-    reg_model, reg_rmse = train_regression(X, y, save_path="models/regressor_joblib.pkl")
+    with prof.stage("train_regression", rows=row_count(X)):
+        reg_model, reg_rmse = train_regression(X, y, model=reg_choice, dense=args.dense)
     print("Regression RMSE:", reg_rmse)
+    # artifact dirs (mmap-able model + encoder + metadata) are what the app and serving load
+    names = feature_names(numeric_cols, enc)
+    with prof.stage("save_regressor"):
+        save_artifact(reg_model, "models/regressor", feature_names=names, encoder=enc, numeric_cols=numeric_cols,
+                      train_hash=data_hash(X, y.to_numpy()), extra={"rmse": reg_rmse}, compact=args.compact)
 
-    # classification (VisitMode)
+    # classification (VisitMode): same rows label_encode_visitmode keeps, taken from X
     df_mode, le = label_encode_visitmode(df)
-    Xc, enc2 = create_basic_feature_matrix(df_mode, categorical_cols=categorical_cols, numeric_cols=numeric_cols)
+    Xc = X[df["VisitModeName"].notna().to_numpy()]
     yc = df_mode["visit_mode_label"]
-    clf, acc, report = train_classification(Xc, yc, save_path="models/classifier_joblib.pkl")
+    target_loss = None if args.target_accuracy is None else 1.0 - args.target_accuracy
+    clf_choice = (_select("classification", Xc, yc, target_loss, args, prof) if args.select else None) or _family("classification", args)
+    with prof.stage("train_classification", rows=row_count(Xc)):
+        clf, acc, report = train_classification(Xc, yc, model=clf_choice, dense=args.dense)
+    with prof.stage("save_classifier"):
+        save_artifact(clf, "models/classifier", feature_names=names, encoder=enc, numeric_cols=numeric_cols,
+                      label_encoder=le, train_hash=data_hash(Xc, yc.to_numpy()), extra={"accuracy": acc}, compact=args.compact)
     joblib.dump(le, "models/label_encoder.pkl")
     joblib.dump(enc, "models/onehot_enc.pkl")
     print("Classification accuracy:", acc)
     print(report)
 
+    # recommender index, fitted once and served from models/
+    with prof.stage("fit_recommender", rows=len(df)):
+        SVDRecommender().fit(df).save("models/svd_recommender.pkl")
+    print("Saved recommender index to models/svd_recommender.pkl")
+    # cold-start tier: cached top-N per segment for new / sparse users
+    with prof.stage("fit_popularity", rows=len(df)):
+        PopularityRecommender().fit(df).save(POPULAR_PATH)
+    print(f"Saved popularity recommender to {POPULAR_PATH}")
+
+    if args.profile:
+        prof.meta.update({"regression_rmse": reg_rmse, "classification_accuracy": acc})
+        prof.write(args.profile)
+        print(prof.summary())
+        print(f"Saved stage profile to {args.profile}")
+
 if __name__ == "__main__":
     main()
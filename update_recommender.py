@@ -0,0 +1,35 @@
+# update_recommender.py
+from src.recommenders import SVDRecommender
+import argparse
+import time
+import pandas as pd
+
+def _read_frame(path):
+    return pd.read_parquet(path) if str(path).endswith(".parquet") else pd.read_csv(path)
+
+def main():
+    parser = argparse.ArgumentParser(description="Fold new visits into a saved SVD recommender; rebuild it when it has drifted.")
+    parser.add_argument("delta", help="new visits (.csv or .parquet) with UserId, AttractionId, Rating")
+    parser.add_argument("--model", default="models/svd_recommender.pkl")
+    parser.add_argument("--full", default=None, help="full visit history; used for a full refit once a rebuild is due")
+    parser.add_argument("--rebuild-fraction", type=float, default=0.2,
+                        help="rebuild once folded ratings reach this share of the last full fit")
+    parser.add_argument("--sweeps", type=int, default=0, help="extra alternating projection rounds per update")
+    args = parser.parse_args()
+
+    model = SVDRecommender.load(args.model)
+    t0 = time.perf_counter()
+    model.update(_read_frame(args.delta), sweeps=args.sweeps)
+    print(f"Folded {model.n_folded_ratings} ratings since the last full fit in {time.perf_counter() - t0:.2f} s")
+    if model.needs_rebuild(args.rebuild_fraction):
+        if args.full:
+            t0 = time.perf_counter()
+            model = SVDRecommender(n_components=model.n_components, random_state=model.random_state).fit(_read_frame(args.full))
+            print(f"Rebuilt from {args.full} in {time.perf_counter() - t0:.2f} s")
+        else:
+            print("Rebuild due: rerun with --full (or train.py) to refit from the full history")
+    model.save(args.model)
+    print(f"Saved recommender index to {args.model}")
+
+if __name__ == "__main__":
+    main()